@@ -0,0 +1,99 @@
+"""Time "Text To Emoji" on a large note full of :shortcodes:.
+
+Run from the repository root:
+    python benchmarks/bench_emoji.py [size in MB]
+"""
+import os
+import random
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from prompt_toolkit.buffer import Buffer  # noqa: E402
+from prompt_toolkit.document import Document  # noqa: E402
+
+from application.edit_tracker import (  # noqa: E402
+    EditTracker,
+    combine_edits,
+    shift_position,
+)
+from application.emoji_converter import EmojiConverter, find_emoji  # noqa: E402
+from application.undo import UndoHistory  # noqa: E402
+
+SIZE_MB = 5
+SHORTCODES = [":smile:", ":rocket:", ":thumbsup:", ":tada:", ":not_an_emoji:", "10:30:"]
+
+
+def make_note(size: int) -> str:
+    """Lines of words, with a shortcode every few lines."""
+    rng = random.Random(0)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "note", "idea", "todo"]
+    lines = []
+    length = 0
+    while length < size:
+        line = " ".join(rng.choices(words, k=12))
+        if rng.random() < 0.2:
+            line += " " + rng.choice(SHORTCODES)
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def timed(label: str, function: Callable, *args: object) -> object:
+    """Call function with args, printing how long it took."""
+    start = time.perf_counter()
+    result = function(*args)
+    print(f"{label:<48} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else SIZE_MB
+    text = make_note(int(size * 1024 * 1024))
+    print(
+        f"{len(text) / 1024 / 1024:.1f} MB, {text.count(':') // 2} candidate shortcodes"
+    )
+
+    edits = timed("find_emoji, whole note", find_emoji, text)
+    print(f"{len(edits)} shortcodes converted")
+
+    # Each conversion runs in an editor whose note has a shortcode just typed at the end.
+    def editor() -> tuple:
+        """(buffer, edit tracker, undo history, emoji converter) of a fresh editor."""
+        buffer = Buffer(document=Document(text, len(text)))
+        edit_tracker = EditTracker(buffer)
+        undo_history = UndoHistory(buffer, edit_tracker)
+        converter = EmojiConverter()
+        edit_tracker.add_listener(converter.track)
+        converter.converted()
+        buffer.insert_text(" :tada:")
+        return buffer, edit_tracker, undo_history, converter
+
+    def convert_everything(buffer: Buffer, *_) -> None:
+        """What Ctrl-E used to do"""
+        from emoji import emojize
+
+        buffer.text = emojize(buffer.text, use_aliases=True, variant="emoji_type")
+
+    def convert_changed(
+        buffer: Buffer,
+        edit_tracker: EditTracker,
+        undo_history: UndoHistory,
+        converter: EmojiConverter,
+    ) -> None:
+        """What Ctrl-E does now"""
+        text = buffer.text
+        edits = converter.edits(text)
+        edit = combine_edits(text, edits)
+        undo_history.save()
+        edit_tracker.expect(edit)
+        buffer.document = Document(
+            text[: edit.start] + edit.inserted + text[edit.end :],
+            shift_position(buffer.cursor_position, edits),
+        )
+        converter.converted()
+
+    timed("emoji.emojize and replace the text", convert_everything, *editor())
+    timed("convert what was typed, in place", convert_changed, *editor())
@@ -0,0 +1,109 @@
+"""Scroll a 100k-line Markdown note and time how long highlighting each frame takes.
+
+A frame is what the editor's BufferControl does when drawing: lex the document, once
+per version of its text, and get the highlighted lines on screen.
+
+Run from the repository root:
+    python benchmarks/bench_markdown_lexer.py [number of lines]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from prompt_toolkit.document import Document  # noqa: E402
+from prompt_toolkit.formatted_text import StyleAndTextTuples  # noqa: E402
+from prompt_toolkit.lexers import Lexer, PygmentsLexer  # noqa: E402
+from pygments.lexers.markup import MarkdownLexer  # noqa: E402
+
+from application.markdown_lexer import CachedMarkdownLexer  # noqa: E402
+
+LINES = 100_000
+HEIGHT = 50
+# Frames drawn while paging through the note, spread evenly over it. Fewer with pygments'
+# own lexer, it lexes up to the end of the note every time it can't reuse its last position.
+FRAMES = 200
+BASELINE_FRAMES = 20
+WORDS = [
+    "note",
+    "idea",
+    "*emphasis*",
+    "**bold**",
+    "`code`",
+    "[link](x)",
+    "#tag",
+    "todo",
+]
+
+
+def make_note(count: int) -> str:
+    """Paragraphs, lists, headings and fenced code."""
+    rng = random.Random(0)
+    lines = []
+    while len(lines) < count:
+        kind = rng.random()
+        if kind < 0.05:
+            lines += ["", f"## Heading {len(lines)}", ""]
+        elif kind < 0.1:
+            lines += (
+                ["```python"] + [f"    x = {i}  # code" for i in range(8)] + ["```"]
+            )
+        elif kind < 0.3:
+            lines.append("- " + " ".join(rng.choices(WORDS, k=8)))
+        else:
+            lines.append(" ".join(rng.choices(WORDS, k=14)))
+    return "\n".join(lines[:count])
+
+
+def frame(
+    lexer: Lexer,
+    document: Document,
+    get_line: Optional[Callable[[int], StyleAndTextTuples]],
+    top: int,
+) -> Callable[[int], StyleAndTextTuples]:
+    """Highlight the lines of one screen, starting at line top. Returns the lexer's get_line for document."""
+    if get_line is None:
+        get_line = lexer.lex_document(document)
+    for i in range(top, min(top + HEIGHT, document.line_count)):
+        get_line(i)
+    return get_line
+
+
+def scroll(
+    name: str, lexer: Lexer, text: str, edit: bool, frames: int = FRAMES
+) -> None:
+    """Page through the note from top to bottom. With edit, type a character on every page first."""
+    document = Document(text, 0)
+    get_line = None
+    times = []
+    step = document.line_count // frames
+    for top in range(0, document.line_count, step):
+        if edit:
+            position = document.translate_row_col_to_index(top, 0)
+            text = text[:position] + "x" + text[position:]
+            document = Document(text, position + 1)
+            get_line = None
+        start = time.perf_counter()
+        get_line = frame(lexer, document, get_line, top)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(
+        f"{name:<36} {'typing' if edit else 'reading':<8}"
+        f" p50 {statistics.median(times) * 1000:7.2f} ms"
+        f"  max {times[-1] * 1000:8.2f} ms"
+        f"  total {sum(times):6.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else LINES
+    text = make_note(count)
+    print(f"{count} lines, {len(text) / 1024 / 1024:.1f} MB")
+    for edit in (False, True):
+        baseline = PygmentsLexer(MarkdownLexer)
+        scroll("PygmentsLexer(MarkdownLexer)", baseline, text, edit, BASELINE_FRAMES)
+        scroll("CachedMarkdownLexer", CachedMarkdownLexer(), text, edit)
@@ -0,0 +1,112 @@
+"""Type into a 20 MB note, with the piece table and with plain strings.
+
+The piece table is timed on its own, and through a prompt_toolkit Buffer with the
+editor's EditTracker, UndoHistory and LineTracker attached, which is what typing
+in the editor goes through. The baseline is a plain Buffer with prompt_toolkit's
+own undo stack, which keeps a copy of the text per keystroke. Either Buffer still
+rebuilds its text on every keystroke, which makes up most of their time.
+
+Run from the repository root:
+    python benchmarks/bench_piece_table.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from prompt_toolkit.buffer import Buffer  # noqa: E402
+from prompt_toolkit.document import Document  # noqa: E402
+
+from application.edit_tracker import EditTracker  # noqa: E402
+from application.line_index import LineTracker  # noqa: E402
+from application.piece_table import PieceTable  # noqa: E402
+from application.undo import UndoHistory  # noqa: E402
+
+NOTE_SIZE = 20 * 1024 * 1024
+KEYSTROKES = 10_000
+# A Buffer is far too slow to type all 10k characters, so only sample some.
+BUFFER_KEYSTROKES = 500
+# A plain Buffer also needs a copy of the note per keystroke.
+PLAIN_BUFFER_KEYSTROKES = 20
+
+
+def make_note() -> str:
+    """A 20 MB note made of short lines."""
+    line = "The quick brown fox jumps over the lazy dog. 0123456789\n"
+    return line * (NOTE_SIZE // len(line))
+
+
+def bench_piece_table(note: str) -> None:
+    """Type KEYSTROKES characters in the middle of the note, taking an undo snapshot per keystroke."""
+    table = PieceTable(note)
+    position = len(note) // 2
+    snapshots = []
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(KEYSTROKES):
+        table.insert(position + i, "x")
+        snapshots.append(table.snapshot())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report("piece table", elapsed / KEYSTROKES, peak)
+
+
+def bench_editor_buffer(note: str) -> None:
+    """Type in the middle of the note through a Buffer set up like the editor's."""
+    buffer = Buffer(document=Document(note, len(note) // 2))
+    edit_tracker = EditTracker(buffer)
+    undo_history = UndoHistory(buffer, edit_tracker)
+    line_tracker = LineTracker(buffer, edit_tracker)
+    type_into(
+        buffer, BUFFER_KEYSTROKES, f"editor buffer ({BUFFER_KEYSTROKES} keystrokes)"
+    )
+    # Like the status bar, the cursor row is looked up after typing.
+    line_tracker.row_col(buffer.cursor_position)
+    undo_history.undo()
+
+
+def bench_plain_buffer(note: str) -> None:
+    """What prompt_toolkit does: rebuild the string and keep it on the undo stack."""
+    buffer = Buffer(document=Document(note, len(note) // 2))
+    type_into(
+        buffer,
+        PLAIN_BUFFER_KEYSTROKES,
+        f"plain buffer ({PLAIN_BUFFER_KEYSTROKES} keystrokes)",
+    )
+
+
+def type_into(buffer: Buffer, keystrokes: int, name: str) -> None:
+    """Type keystrokes characters at the cursor, saving undo state like the key processor does."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(keystrokes):
+        buffer.save_to_undo_stack()
+        buffer.insert_text("x")
+        # What the status bar and the rendering ask for on every frame.
+        buffer.document.cursor_position_row
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report(name, elapsed / keystrokes, peak)
+
+
+def report(name: str, per_keystroke: float, peak: int) -> None:
+    """Print one result line."""
+    print(
+        f"{name:<36} {per_keystroke * 1e6:>10.1f} us/keystroke"
+        f" {peak / 1024 / 1024:>10.1f} MB peak"
+    )
+
+
+if __name__ == "__main__":
+    note = make_note()
+    print(f"note: {len(note) / 1024 / 1024:.1f} MB")
+    bench_piece_table(note)
+    bench_editor_buffer(note)
+    bench_plain_buffer(note)
@@ -0,0 +1,68 @@
+"""Index a synthetic tree of notes and time quick-open queries typed one key at a time.
+
+Run from the repository root:
+    python benchmarks/bench_quick_open.py [number of notes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from constants import QUICK_OPEN_RESULTS  # noqa: E402
+from storage.path_index import PathIndex  # noqa: E402
+
+NOTES = 100_000
+WORDS = (
+    "meeting notes project alpha beta journal ideas draft todo review plan daily weekly "
+    "recipes travel books work home"
+).split()
+QUERIES = ["meetnot", "weekly review 99", "prjalpha12", "draft/ideas", "zzz"]
+
+
+def make_tree(root: str, count: int) -> None:
+    """Create count empty notes, named and nested up to three folders deep at random."""
+    rng = random.Random(0)
+    for i in range(count):
+        folders = [
+            rng.choice(WORDS) + str(rng.randrange(20)) for _ in range(rng.randrange(4))
+        ]
+        folder = os.path.join(root, *folders)
+        os.makedirs(folder, exist_ok=True)
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}.md"
+        open(os.path.join(folder, name), "w").close()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else NOTES
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, count)
+        index = PathIndex(root)
+
+        start = time.perf_counter()
+        index.refresh().result()
+        print(f"indexed {len(index)} notes in {time.perf_counter() - start:.1f} s")
+
+        for query in QUERIES:
+            # Time every key press: the first run of the search and listing the results,
+            # then how long the search took to finish, over as many frames as it needed.
+            search = None
+            slowest = total = 0.0
+            frames = 0
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                search = index.search(query[:end], search)
+                search.run()
+                search.results(QUICK_OPEN_RESULTS)
+                slowest = max(slowest, time.perf_counter() - start)
+                while not search.done:
+                    search.run()
+                    search.results(QUICK_OPEN_RESULTS)
+                    frames += 1
+                total += time.perf_counter() - start
+            print(
+                f"{query!r:<20} slowest key {slowest * 1000:5.1f} ms, "
+                f"{frames} extra frames, {total / len(query) * 1000:5.1f} ms per key"
+            )
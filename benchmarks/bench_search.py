@@ -0,0 +1,55 @@
+"""Index a synthetic corpus of notes and time "Search all notes" queries.
+
+Run from the repository root:
+    python benchmarks/bench_search.py [number of notes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from storage.search_index import SearchIndex  # noqa: E402
+
+NOTES = 50_000
+WORDS_PER_NOTE = 200
+VOCABULARY = [f"word{i}" for i in range(20_000)]
+QUERIES = ["word1", "word17 word42", "word19999", "word5 word6 word7", "missing"]
+
+
+def make_corpus(root: str, count: int) -> None:
+    """Write count notes of random words, with a Zipf-like word distribution."""
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    for i in range(count):
+        folder = os.path.join(root, f"folder{i % 100}")
+        os.makedirs(folder, exist_ok=True)
+        words = rng.choices(VOCABULARY, weights, k=WORDS_PER_NOTE)
+        with open(os.path.join(folder, f"note{i}.md"), "w") as f:
+            f.write(" ".join(words))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else NOTES
+    with tempfile.TemporaryDirectory() as root:
+        notes = os.path.join(root, "notes")
+        make_corpus(notes, count)
+        index = SearchIndex(os.path.join(root, "index.sqlite3"), root=notes)
+
+        start = time.perf_counter()
+        index.refresh().result()
+        print(f"indexed {count} notes in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        index.refresh().result()
+        print(
+            f"refresh with nothing changed: {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+        for query in QUERIES:
+            start = time.perf_counter()
+            hits = index.search(query).result()
+            elapsed = time.perf_counter() - start
+            print(f"{query!r:<24} {len(hits):>3} hits {elapsed * 1000:>8.1f} ms")
@@ -0,0 +1,479 @@
+"""Scripted editing sessions of ThoughtBox, driven headlessly, timed per operation.
+
+Each scenario runs the real application in a fresh interpreter, reading keys from a pipe
+and rendering to a dummy output. An operation is timed from the moment it's triggered
+(keys sent, menu action called) to the end of the first frame rendered after it.
+Results are latency percentiles per operation and the peak memory of each scenario,
+written as JSON so runs on different commits can be compared.
+
+Run from the repository root:
+    python benchmarks/bench_sessions.py [--output results.json] [--compare baseline.json]
+        [scenario ...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess  # noqa: S404 # nosec: only runs this interpreter and git, see main and git_commit
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    # Only imported by the child interpreter, with src/ on the path.
+    from prompt_toolkit.application import Application
+    from prompt_toolkit.input import PipeInput
+    from prompt_toolkit.key_binding import KeyProcessor
+
+    from application.editor import ThoughtBox
+    from custom_types import PopUpDialog
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+NOTES_DIR = ".thought_box"
+
+LARGE_NOTE_SIZE = 20 * 1024 * 1024
+MEDIUM_NOTE_SIZE = 1024 * 1024
+ARCHIVE_NOTES = 10_000
+# Seconds an operation may take before the scenario is considered stuck.
+TIMEOUT = 30
+# Slower than this compared to the baseline is reported as a regression.
+REGRESSION = 1.2
+
+WORDS = (
+    "idea note meeting plan draft todo garden travel recipe budget book "
+    "project review summary question answer python music weekend family"
+).split()
+KEYS = {
+    "down": "\x1b[B",
+    "page_down": "\x1b[6~",
+    "page_up": "\x1b[5~",
+    "enter": "\r",
+    "undo": "\x1a",
+}
+
+
+def make_text(size: int, seed: int) -> str:
+    """Markdown-ish text of about size characters."""
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.05:
+            line = f"## {rng.choice(WORDS).title()} {len(lines)}"
+        elif kind < 0.1:
+            line = f"- [ ] {' '.join(rng.choices(WORDS, k=6))}"
+        else:
+            line = " ".join(rng.choices(WORDS, k=rng.randint(4, 16)))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def make_fixtures(root: str) -> None:
+    """Notes directory shared by every scenario."""
+    notes = os.path.join(root, NOTES_DIR)
+    os.makedirs(os.path.join(root, "src"))
+    os.symlink(os.path.join(SRC_DIR, "assets"), os.path.join(root, "src", "assets"))
+    os.makedirs(os.path.join(notes, "archive"))
+
+    medium = make_text(MEDIUM_NOTE_SIZE, 1)
+    with open(os.path.join(notes, "medium.md"), "w") as f:
+        f.write(medium)
+    with open(os.path.join(notes, "large.md"), "w") as f:
+        f.write(medium * (LARGE_NOTE_SIZE // MEDIUM_NOTE_SIZE))
+    with open(os.path.join(notes, "emoji.md"), "w") as f:
+        f.write(make_text(200 * 1024, 2).replace(" idea ", " :bulb: "))
+    rng = random.Random(3)
+    for i in range(ARCHIVE_NOTES):
+        with open(os.path.join(notes, "archive", f"Note {i}.md"), "w") as f:
+            f.write(" ".join(rng.choices(WORDS, k=40)))
+
+
+############ INSIDE THE CHILD INTERPRETER ############
+class Driver:
+    """Sends input to a running ThoughtBox and times how long until it's on screen."""
+
+    def __init__(self, tb: "ThoughtBox", pipe: "PipeInput"):
+        self.tb = tb
+        self.app = tb.application
+        self.pipe = pipe
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self._done: Optional[asyncio.Future] = None
+        self._until: Callable[[], bool] = lambda: True
+        self._keys_pending = 0
+        self.app.after_render += self._rendered
+        self.app.key_processor.after_key_press += self._key_pressed
+        # Dialogs on screen, most recent last.
+        self.dialogs: list = []
+        show_dialog_as_float = tb.show_dialog_as_float
+
+        async def show_dialog(dialog: "PopUpDialog") -> Optional[Union[str, bool]]:
+            """Show the dialog as the app does, keeping track of it while it's shown."""
+            self.dialogs.append(dialog)
+            try:
+                return await show_dialog_as_float(dialog)
+            finally:
+                self.dialogs.remove(dialog)
+
+        tb.show_dialog_as_float = show_dialog
+
+    def _rendered(self, app: "Application") -> None:
+        if self._done and not self._done.done() and self._until():
+            self._done.set_result(time.perf_counter())
+
+    def _key_pressed(self, key_processor: "KeyProcessor") -> None:
+        self._keys_pending -= 1
+
+    async def measure(
+        self, name: str, action: Callable, until: Callable[[], bool] = lambda: True
+    ) -> None:
+        """Time action up to the first frame rendered once until() is true."""
+        self._done = asyncio.get_running_loop().create_future()
+        self._until = until
+        start = time.perf_counter()
+        result = action()
+        if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+            await result
+        self.app.invalidate()
+        end = await asyncio.wait_for(self._done, TIMEOUT)
+        self.timings[name].append(end - start)
+
+    async def press(
+        self, name: str, keys: str, until: Callable[[], bool] = None
+    ) -> None:
+        """Time a single key press, or an escape sequence for one key."""
+        self._keys_pending = 1
+
+        def processed() -> bool:
+            return self._keys_pending <= 0 and (until is None or until())
+
+        await self.measure(name, lambda: self.pipe.send_text(keys), processed)
+
+    async def settle(self) -> None:
+        """Let background work (autosave, lexer, watcher) catch up between operations."""
+        await asyncio.sleep(0.05)
+
+    def dialog_shown(self, dialog_type: type) -> Callable[[], bool]:
+        """Condition for a dialog of dialog_type being on screen."""
+        return lambda: any(isinstance(dialog, dialog_type) for dialog in self.dialogs)
+
+
+def note(name: str) -> str:
+    """Path of the note called name in the notes directory."""
+    return os.path.join(NOTES_DIR, name)
+
+
+async def scenario_open(driver: Driver) -> None:
+    """Open notes from disk, then switch between notes that are already open."""
+    tb = driver.tb
+    for _ in range(5):
+        tb.open_notes.clear()
+        tb._switch_to_note(note("welcome.md"))
+        for name in ("medium.md", "large.md"):
+            tb.open_notes.clear()
+            await driver.measure(f"open {name}", lambda: tb._switch_to_note(note(name)))
+            await driver.settle()
+    for _ in range(20):
+        for name in ("medium.md", "large.md"):
+            await driver.measure(
+                "switch to open note", lambda: tb._switch_to_note(note(name))
+            )
+
+
+async def scenario_type(driver: Driver) -> None:
+    """Type in the middle of a 1 MB note and at the start of a 20 MB one."""
+    tb = driver.tb
+    for name in ("medium.md", "large.md"):
+        tb._switch_to_note(note(name))
+        tb.text_field.buffer.cursor_position = len(tb.text_field.text) // 2
+        for char in "the quick brown fox jumps over the lazy dog\r" * 5:
+            await driver.press(f"type in {name}", char)
+        await driver.settle()
+
+
+async def scenario_scroll(driver: Driver) -> None:
+    """Page through a 1 MB note, and into the part of a 20 MB one that isn't decoded yet."""
+    tb = driver.tb
+    for name in ("medium.md", "large.md"):
+        tb._switch_to_note(note(name))
+        tb.text_field.buffer.cursor_position = 0
+        for _ in range(150):
+            await driver.press(f"page down in {name}", KEYS["page_down"])
+        for _ in range(50):
+            await driver.press(f"page up in {name}", KEYS["page_up"])
+
+
+async def scenario_search(driver: Driver) -> None:
+    """Search every note of the 10k-note archive, and find words in the open note."""
+    from custom_types import SearchResultsDialog, TextInputDialog
+    from storage import text_index
+
+    tb = driver.tb
+    await asyncio.wrap_future(text_index.refresh())
+    for query in ("garden", "budget plan", "python music weekend", "recipe"):
+        for _ in range(5):
+            await driver.measure(
+                "open search dialog",
+                tb.do_search_notes,
+                driver.dialog_shown(TextInputDialog),
+            )
+            # Enter moves from the text to the OK button, which the timed Enter presses.
+            driver.pipe.send_text(query + KEYS["enter"])
+            await driver.settle()
+            await driver.press(
+                "search all notes",
+                KEYS["enter"],
+                driver.dialog_shown(SearchResultsDialog),
+            )
+            await driver.press("open search result", KEYS["enter"])
+            await driver.settle()
+
+    tb._switch_to_note(note("medium.md"))
+    tb.text_field.buffer.cursor_position = 0
+    for _ in range(5):
+        tb.do_find()
+        for char in "weekend":
+            await driver.press("find in note", char)
+        await driver.press("find in note", KEYS["enter"])
+
+
+async def scenario_emoji(driver: Driver) -> None:
+    """Convert the shortcodes of a 200 KB note, undo it, and complete shortcodes while typing."""
+    tb = driver.tb
+    tb._switch_to_note(note("emoji.md"))
+    for _ in range(5):
+        await driver.measure("convert emoji", tb.do_convert_to_emoji)
+        await driver.press("undo emoji conversion", KEYS["undo"])
+    tb.text_field.buffer.cursor_position = len(tb.text_field.text)
+    for _ in range(10):
+        for char in " :smi":
+            await driver.press("type with emoji completion", char)
+        await driver.settle()
+
+
+async def scenario_browse(driver: Driver) -> None:
+    """Open a folder of 10k notes in the Open Note dialog and move through it."""
+    from custom_types import ScrollMenuDialog
+
+    tb = driver.tb
+    tb._switch_to_note(note(os.path.join("archive", "Note 0.md")))
+    for _ in range(5):
+        await driver.measure(
+            "open 10k-note folder",
+            tb.do_scroll_menu,
+            driver.dialog_shown(ScrollMenuDialog),
+        )
+        for _ in range(100):
+            await driver.press("move in 10k-note folder", KEYS["down"])
+        driver.dialogs[-1].future.set_result(None)
+        await driver.settle()
+
+
+async def scenario_save(driver: Driver) -> None:
+    """Save after an edit, in a 1 MB note and in a 20 MB one."""
+    tb = driver.tb
+    for name in ("medium.md", "large.md"):
+        tb._switch_to_note(note(name))
+        for _ in range(5):
+            driver.pipe.send_text("x")
+            await driver.settle()
+            await driver.measure(f"save {name}", tb.do_save_file)
+
+
+SCENARIOS = {
+    "open": scenario_open,
+    "type": scenario_type,
+    "scroll": scenario_scroll,
+    "search": scenario_search,
+    "emoji": scenario_emoji,
+    "browse": scenario_browse,
+    "save": scenario_save,
+}
+
+
+def prepare() -> None:
+    """Index the notes, so that no scenario pays for it in the background."""
+    sys.path.insert(0, SRC_DIR)
+    from storage import text_index
+
+    text_index.refresh().result()
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process, None where it can't be measured."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_scenario(name: str) -> dict:
+    """Run one scenario in this interpreter, with the notes directory as working directory."""
+    sys.path.insert(0, SRC_DIR)
+    from prompt_toolkit.application import create_app_session
+    from prompt_toolkit.input import create_pipe_input
+    from prompt_toolkit.output import DummyOutput
+
+    with create_pipe_input() as pipe, create_app_session(
+        input=pipe, output=DummyOutput()
+    ):
+        from application.editor import ThoughtBox
+
+        tb = ThoughtBox()
+        # Keep the notes as generated, saves are timed explicitly.
+        tb.application_state.autosave = False
+        driver = Driver(tb, pipe)
+
+        async def main() -> None:
+            app_task = asyncio.ensure_future(tb.application.run_async())
+            # Wait for what is loaded after the first frame, like the Markdown lexer.
+            while tb.text_field.lexer is None or not tb.first_render_done:
+                await asyncio.sleep(0.05)
+            try:
+                await SCENARIOS[name](driver)
+            finally:
+                tb.watcher.stop()
+                tb.application.exit()
+                await app_task
+
+        asyncio.run(main())
+    return {
+        "peak_memory_mb": peak_memory_mb(),
+        "operations": {
+            operation: summarize(times) for operation, times in driver.timings.items()
+        },
+    }
+
+
+############ IN THE PARENT ############
+def percentile(times: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted times."""
+    return times[min(len(times) - 1, int(fraction * len(times)))]
+
+
+def summarize(times: List[float]) -> dict:
+    """Count, percentiles, max and mean of times, in milliseconds."""
+    times = sorted(times)
+    return {
+        "count": len(times),
+        "p50_ms": percentile(times, 0.5) * 1000,
+        "p90_ms": percentile(times, 0.9) * 1000,
+        "p99_ms": percentile(times, 0.99) * 1000,
+        "max_ms": times[-1] * 1000,
+        "mean_ms": sum(times) / len(times) * 1000,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Short hash of the checked out commit, None outside a git checkout."""
+    git = shutil.which("git")
+    if git is None:
+        return None
+    try:
+        # git found on the PATH, with constant arguments and no shell.
+        return subprocess.check_output(  # noqa: S603 # nosec
+            [git, "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print p50 and p90 against a baseline run, flagging regressions."""
+    print(f"\ncompared to {baseline.get('commit') or 'baseline'}:")
+    for scenario, result in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(scenario)
+        if not old:
+            continue
+        for operation, stats in result["operations"].items():
+            old_stats = old["operations"].get(operation)
+            if not old_stats:
+                continue
+            ratios = [
+                stats[key] / old_stats[key] if old_stats[key] else 1.0
+                for key in ("p50_ms", "p90_ms")
+            ]
+            flag = "  REGRESSION" if max(ratios) > REGRESSION else ""
+            print(
+                f"  {scenario:7} {operation:32} p50 x{ratios[0]:5.2f}  p90 x{ratios[1]:5.2f}{flag}"
+            )
+        if result["peak_memory_mb"] and old.get("peak_memory_mb"):
+            ratio = result["peak_memory_mb"] / old["peak_memory_mb"]
+            flag = "  REGRESSION" if ratio > REGRESSION else ""
+            print(f"  {scenario:7} {'peak memory':32} x{ratio:5.2f}{flag}")
+
+
+def main() -> None:
+    """Run the scenarios, each in a child interpreter, and report or compare the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        help=f"scenarios to run: {', '.join(SCENARIOS)} (all by default)",
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child)))
+        return
+    if args.prepare:
+        prepare()
+        return
+    if unknown := set(args.scenarios) - set(SCENARIOS):
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as root:
+        make_fixtures(root)
+        # The children are this interpreter running this file, without a shell.
+        subprocess.run(  # noqa: S603 # nosec
+            [sys.executable, os.path.abspath(__file__), "--prepare"],
+            cwd=root,
+            check=True,
+        )
+        for name in args.scenarios or SCENARIOS:
+            output = subprocess.run(  # noqa: S603 # nosec
+                [sys.executable, os.path.abspath(__file__), "--child", name],
+                cwd=root,
+                stdout=subprocess.PIPE,
+                text=True,
+                check=True,
+            ).stdout
+            result = results["scenarios"][name] = json.loads(output.splitlines()[-1])
+            print(f"{name}: peak memory {result['peak_memory_mb']:.0f} MB")
+            for operation, stats in result["operations"].items():
+                print(
+                    f"  {operation:32} n={stats['count']:<4} p50 {stats['p50_ms']:8.2f} ms"
+                    f"  p90 {stats['p90_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms"
+                    f"  max {stats['max_ms']:8.2f} ms"
+                )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Time from launching ThoughtBox to its first rendered frame.
+
+Every run starts a fresh interpreter with an empty notes directory, like a cold launch.
+Exits with status 1 if the median is over budget, or if a module that should be loaded
+on first use was imported before the first frame.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py [budget in seconds] [runs]
+"""
+import os
+import statistics
+import subprocess  # noqa: S404 # nosec: only used to start this interpreter on CHILD
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"
+)
+BUDGET = 0.5
+RUNS = 7
+# Imported on first use only, none of them should be needed to draw the first frame.
+LAZY_MODULES = ["emoji", "webbrowser", "pygments.lexers.markup"]
+
+# Runs in the child interpreter, with the notes directory as working directory.
+CHILD = f"""
+import sys
+
+sys.path.insert(0, {SRC_DIR!r})
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+with create_pipe_input() as pipe, create_app_session(input=pipe, output=DummyOutput()):
+    from application.editor import ThoughtBox
+
+    def first_render(app):
+        loaded = [name for name in {LAZY_MODULES!r} if name in sys.modules]
+        print("rendered", *loaded, flush=True)
+        app.after_render -= first_render
+        app.exit()
+
+    tb = ThoughtBox()
+    tb.application.after_render += first_render
+    tb.run()
+"""
+
+
+def time_to_first_render() -> tuple:
+    """(seconds, lazy modules already imported) of one cold start."""
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "src"))
+        os.symlink(os.path.join(SRC_DIR, "assets"), os.path.join(root, "src", "assets"))
+        start = time.perf_counter()
+        # This interpreter on the constant CHILD script, without a shell: nothing untrusted.
+        child = subprocess.Popen(  # noqa: S603 # nosec
+            [sys.executable, "-c", CHILD],
+            cwd=root,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        line = child.stdout.readline()
+        elapsed = time.perf_counter() - start
+        child.wait()
+    if not line.startswith("rendered"):
+        sys.exit("ThoughtBox exited before rendering its first frame")
+    return elapsed, line.split()[1:]
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else RUNS
+
+    times = []
+    eager = set()
+    for _ in range(runs):
+        elapsed, loaded = time_to_first_render()
+        times.append(elapsed)
+        eager.update(loaded)
+
+    median = statistics.median(times)
+    print(
+        f"time to first render: median {median * 1000:.0f} ms, min {min(times) * 1000:.0f} ms, "
+        f"max {max(times) * 1000:.0f} ms over {runs} runs (budget {budget * 1000:.0f} ms)"
+    )
+    failed = False
+    if eager:
+        print(f"FAIL: imported before the first frame: {', '.join(sorted(eager))}")
+        failed = True
+    if median > budget:
+        print("FAIL: startup is over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
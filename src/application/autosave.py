@@ -0,0 +1,34 @@
+import asyncio
+from typing import Callable, Optional
+
+from constants import AUTOSAVE_DELAY
+
+
+class AutoSaver:
+    """Debounces edits and saves the note once the user stops typing for a moment."""
+
+    def __init__(self, save: Callable[[], None], delay: float = AUTOSAVE_DELAY):
+        """Initialize the auto saver
+
+        Args:
+            save (Callable[[], None]): Called when it's time to save
+            delay (float): Seconds without edits before saving
+        """
+        self._save = save
+        self.delay = delay
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def schedule(self) -> None:
+        """Restart the countdown. Must be called from the event loop."""
+        self.cancel()
+        self._handle = asyncio.get_event_loop().call_later(self.delay, self._fire)
+
+    def cancel(self) -> None:
+        """Stop the countdown without saving."""
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    def _fire(self) -> None:
+        self._handle = None
+        self._save()
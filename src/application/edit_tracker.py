@@ -0,0 +1,148 @@
+import functools
+from typing import Callable, List, Optional
+
+from prompt_toolkit.buffer import Buffer
+
+from application.piece_table import TextEdit
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Length of the common prefix of a and b.
+
+    Compares halving slices so that the work is done by C string comparison
+    instead of a Python loop over characters.
+    """
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix_length(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix of a and b, at most limit."""
+    low, high = 0, min(len(a), len(b), limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle : len(a) - low] == b[len(b) - middle : len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def diff_text(old: str, new: str) -> TextEdit:
+    """Smallest single TextEdit turning old into new."""
+    prefix = common_prefix_length(old, new)
+    suffix = common_suffix_length(old, new, min(len(old), len(new)) - prefix)
+    return TextEdit(
+        prefix, old[prefix : len(old) - suffix], new[prefix : len(new) - suffix]
+    )
+
+
+def combine_edits(text: str, edits: List[TextEdit]) -> TextEdit:
+    """Single TextEdit making all of edits, which are in order and don't overlap, to text."""
+    start, end = edits[0].start, edits[-1].end
+    parts = []
+    position = start
+    for edit in edits:
+        parts.append(text[position : edit.start])
+        parts.append(edit.inserted)
+        position = edit.end
+    return TextEdit(start, text[start:end], "".join(parts))
+
+
+def shift_position(position: int, edits: List[TextEdit]) -> int:
+    """Where position ends up after edits, which are in order and don't overlap."""
+    shift = 0
+    for edit in edits:
+        if edit.start >= position:
+            break
+        if edit.end > position:
+            # Inside the edit, move to the end of its new text.
+            return edit.start + len(edit.inserted) + shift
+        shift += len(edit.inserted) - len(edit.removed)
+    return position + shift
+
+
+class EditTracker:
+    """Reports every change of a Buffer's text as a TextEdit.
+
+    Typing goes through insert_text, delete and delete_before_cursor, whose edits
+    are recorded exactly and cost O(size of the edit). Anything else falls back
+    to diffing the old and new text.
+    """
+
+    def __init__(self, buffer: Buffer):
+        self.buffer = buffer
+        self.listeners: List[Callable[[TextEdit], None]] = []
+        self._text = buffer.text
+        self._expected: Optional[TextEdit] = None
+
+        buffer.on_text_changed += self._text_changed
+        self._wrap(buffer, "insert_text", self._expect_insert)
+        self._wrap(buffer, "delete", self._expect_delete)
+        self._wrap(buffer, "delete_before_cursor", self._expect_delete_before_cursor)
+
+    def add_listener(self, listener: Callable[[TextEdit], None]) -> None:
+        """Call listener with every TextEdit made to the buffer."""
+        self.listeners.append(listener)
+
+    def expect(self, edit: TextEdit) -> None:
+        """Announce the edit that the next text change makes, so that it doesn't have to be diffed."""
+        self._expected = edit
+
+    ############ INTERNALS ############
+    def _wrap(
+        self, buffer: Buffer, name: str, expect: Callable[..., Optional[TextEdit]]
+    ) -> None:
+        """Replace a Buffer method with one that announces its edit first."""
+        method = getattr(buffer, name)
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs) -> object:
+            self._expected = expect(*args, **kwargs)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._expected = None
+
+        setattr(buffer, name, wrapper)
+
+    def _expect_insert(
+        self, data: str, overwrite: bool = False, *args, **kwargs
+    ) -> Optional[TextEdit]:
+        if overwrite:
+            return None
+        return TextEdit(self.buffer.cursor_position, "", data)
+
+    def _expect_delete(self, count: int = 1) -> Optional[TextEdit]:
+        position = self.buffer.cursor_position
+        return TextEdit(position, self._text[position : position + count], "")
+
+    def _expect_delete_before_cursor(self, count: int = 1) -> Optional[TextEdit]:
+        position = self.buffer.cursor_position
+        start = max(0, position - count)
+        return TextEdit(start, self._text[start:position], "")
+
+    def _text_changed(self, _: Buffer) -> None:
+        """Work out the edit that was made and notify the listeners."""
+        old, new = self._text, self.buffer.text
+        self._text = new
+
+        edit, self._expected = self._expected, None
+        if not (edit and self._matches(edit, old, new)):
+            edit = diff_text(old, new)
+        for listener in self.listeners:
+            listener(edit)
+
+    @staticmethod
+    def _matches(edit: TextEdit, old: str, new: str) -> bool:
+        """Cheap sanity check that an announced edit is the one that happened."""
+        return (
+            len(new) == len(old) - len(edit.removed) + len(edit.inserted)
+            and new[edit.start : edit.start + len(edit.inserted)] == edit.inserted
+        )
@@ -1,11 +1,14 @@
+import asyncio
 import os
 import os.path
 from shutil import copyfile
+from typing import Optional
 
 from prompt_toolkit.application import Application
 from prompt_toolkit.filters import Condition
 from prompt_toolkit.layout.containers import (
     ConditionalContainer,
+    Float,
     HSplit,
     VSplit,
     Window,
@@ -13,18 +16,42 @@ from prompt_toolkit.layout.containers import (
 )
 from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.layout.layout import Layout
-from prompt_toolkit.lexers import PygmentsLexer
+from prompt_toolkit.lexers import Lexer
 from prompt_toolkit.shortcuts import set_title
-from prompt_toolkit.styles import Style
+from prompt_toolkit.styles import DynamicStyle
 from prompt_toolkit.widgets import SearchToolbar, TextArea
-from pygments.lexers.markup import MarkdownLexer
 
+from application.autosave import AutoSaver
+from application.edit_tracker import EditTracker
+from application.emoji_completer import EmojiCompleter
+from application.emoji_converter import EmojiConverter
+from application.line_index import LineTracker
+from application.open_notes import OpenNotes
+from application.piece_table import TextEdit
+from application.render_stats import RenderStats
 from application.state import ApplicationState
-from constants import ASSETS_DIR, NOTES_DIR, WELCOME_PAGE
+from application.style_manager import style_manager
+from application.undo import UndoHistory
+from constants import ASSETS_DIR, LAZY_LOAD_MARGIN, NOTES_DIR, WELCOME_PAGE
 from navigation.menu_bar import MenuNav
+from storage import (
+    BackgroundWriter,
+    FileOperations,
+    NotesWatcher,
+    notes_index,
+    path_index,
+    text_index,
+)
 from utils import display_path
 
 
+def markdown_lexer() -> Lexer:
+    """Markdown syntax highlighting. Imports pygments, which is slow, so it's called off the main thread."""
+    from application.markdown_lexer import CachedMarkdownLexer
+
+    return CachedMarkdownLexer()
+
+
 class ThoughtBox(MenuNav):
     """Thought Box - The minimalist note-taking app"""
 
@@ -39,25 +66,62 @@ class ThoughtBox(MenuNav):
             )
 
         self.application_state = ApplicationState()
+        # Catch up with notes changed while the app wasn't running, in the background.
+        # The notes are walked once, by the path index, and the text index reads its paths.
+        text_index.refresh(path_index.refresh())
+
+        # Title last written to the terminal.
+        self.title: Optional[str] = None
+        # Set when the open note is large enough to be decoded lazily.
+        self.lazy_loader = None
 
         self.search_toolbar = SearchToolbar()
         # Define the area where users enter text.
+        # Typing :sm pops up emoji whose shortcode starts with it.
+        self.emoji_completer = EmojiCompleter(
+            os.path.join(NOTES_DIR, ".emoji_index.json")
+        )
+        # The Markdown lexer is attached after the first frame, see after_first_render.
         self.text_field = TextArea(
-            lexer=PygmentsLexer(MarkdownLexer),
             scrollbar=True,
+            completer=self.emoji_completer,
+            complete_while_typing=True,
             search_field=self.search_toolbar,
         )
+        # Every edit of the note is reported as a TextEdit, and mirrored in a piece table
+        # that backs the undo history.
+        self.edit_tracker = EditTracker(self.text_field.buffer)
+        self.undo_history = UndoHistory(self.text_field.buffer, self.edit_tracker)
+        # Line starts of the note, shared with the status bar, searching and the lexer.
+        self.line_tracker = LineTracker(self.text_field.buffer, self.edit_tracker)
+        self.edit_tracker.add_listener(self.on_edit)
+        self.emoji_converter = EmojiConverter()
+        self.edit_tracker.add_listener(self.emoji_converter.track)
+        # Set while the editor itself loads a note into the buffer, which isn't a user edit.
+        self.loading_note = False
+        self.file_writer = BackgroundWriter()
+        self.autosaver = AutoSaver(self._autosave)
+        # Moves and deletes files on a worker thread.
+        self.file_operations = FileOperations()
+        # Notices notes changed outside the app, started after the first frame.
+        self.watcher = NotesWatcher()
+        # Set while the user is asked whether to reload the open note.
+        self.reload_pending = False
+        # Notes the user switched away from, kept in memory to switch back instantly.
+        self.open_notes = OpenNotes()
         # If the application state has a path saved, we open the file to that path on boot up.
         # If saved path is invalid, open a new file.
         if self.application_state.current_path:
             try:
-                with open(self.application_state.current_path, "r") as f:
-                    self.text_field.text = f.read()
-            except IOError:
+                self._open_note(self.application_state.current_path)
+                self._restore_session(self.application_state.current_path)
+            except (OSError, UnicodeDecodeError):
                 self.application_state.current_path = None
 
         # style of menu can def play around here
-        self.style = Style.from_dict(self.application_state.user_settings["style"])
+        # The style manager compiles the style, and swaps it when colors are changed.
+        style_manager.set_base(self.application_state.user_settings["style"])
+        self.style = DynamicStyle(lambda: style_manager.style)
 
         # Define the UI elements to appear on the screen.
         # 1. The text field where users write and read notes.
@@ -91,6 +155,23 @@ class ThoughtBox(MenuNav):
         # Initialize super class to get self.root_container
         super().__init__()
 
+        # Frame times, bytes written and redraw causes, shown in a corner when turned on.
+        self.render_stats = RenderStats()
+        self.root_container.floats.append(
+            Float(
+                top=1,
+                right=1,
+                content=ConditionalContainer(
+                    content=Window(
+                        FormattedTextControl(self.render_stats.summary),
+                        style="class:status",
+                        dont_extend_width=True,
+                    ),
+                    filter=Condition(lambda: self.render_stats.enabled),
+                ),
+            )
+        )
+
         self.layout = Layout(self.root_container, focused_element=self.text_field)
 
         # Main application here
@@ -102,6 +183,10 @@ class ThoughtBox(MenuNav):
             full_screen=True,
             after_render=self.set_title_bar,
         )
+        self.application.after_render += self.load_visible_window
+        self.first_render_done = False
+        self.application.after_render += self.after_first_render
+        self.render_stats.attach(self.application)
 
     def get_statusbar_middle_text(self) -> None:
         """Display a shortcut for opening the menu in the status bar."""
@@ -109,17 +194,57 @@ class ThoughtBox(MenuNav):
 
     def get_statusbar_right_text(self) -> None:
         """Display the current position of the cursor."""
-        return " {}:{}  ".format(
-            self.text_field.document.cursor_position_row + 1,
-            self.text_field.document.cursor_position_col + 1,
-        )
+        row, col = self.line_tracker.row_col(self.text_field.buffer.cursor_position)
+        return " {}:{}  ".format(row + 1, col + 1)
 
     def set_title_bar(self, app: Application) -> None:
-        """Set the title bar to the current file as soon as the app starts"""
+        """Show the current file in the title bar, and whether it's modified, moved or deleted, when that changed"""
+        modified = " *" if self.application_state.dirty else ""
         if path := self.application_state.current_path:
-            set_title(f"ThoughtBox - {display_path(path)}")
+            title = f"ThoughtBox - {display_path(path)}{modified}"
+        elif removed := self.application_state.note.removed:
+            path, reason = removed
+            title = f"ThoughtBox - {display_path(path)} ({reason}){modified}"
         else:
-            set_title("ThoughtBox - Untitled")
+            title = f"ThoughtBox - Untitled{modified}"
+        if title != self.title:
+            set_title(title)
+            self.title = title
+
+    def on_edit(self, edit: TextEdit) -> None:
+        """Keep track of unsaved changes and schedule an autosave"""
+        if not self.loading_note:
+            self.application_state.record_change()
+            if self.application_state.autosave:
+                self.autosaver.schedule()
+
+    def load_visible_window(self, app: Application) -> None:
+        """Decode more of a large note once the user scrolls close to the end of what is loaded"""
+        if not self.lazy_loader:
+            return
+        render_info = self.text_field.window.render_info
+        if render_info is None:
+            return
+        loaded_lines = self.text_field.document.line_count
+        if render_info.last_visible_line() + LAZY_LOAD_MARGIN >= loaded_lines:
+            self._load_more()
+
+    def after_first_render(self, app: Application) -> None:
+        """Load what isn't needed to draw the first frame in the background, so it doesn't delay startup"""
+        if self.first_render_done:
+            return
+        self.first_render_done = True
+
+        async def coroutine() -> None:
+            loop = asyncio.get_event_loop()
+            self.watcher.start(self._files_changed)
+            notes_index.watched = self.watcher.uses_inotify
+            # Warm the emoji index, so the first completion doesn't wait for it.
+            loop.run_in_executor(None, self.emoji_completer.load)
+            self.text_field.lexer = await loop.run_in_executor(None, markdown_lexer)
+            app.invalidate()
+
+        asyncio.ensure_future(coroutine())
 
     def run(self) -> None:
         """Run the application"""
@@ -0,0 +1,91 @@
+import bisect
+import json
+import re
+from importlib.metadata import PackageNotFoundError, version
+from typing import Iterable, List, Optional
+
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+
+from application.emoji_converter import emoji_table
+from utils import atomic_write
+
+# A shortcode being typed, with at least two characters after the colon.
+TYPED_SHORTCODE_RE = re.compile(r":[\w\-&.’”“()!#*+?–]{2,}$")
+# Shortcodes are short, no need to look further back on the line than this.
+LOOKBEHIND = 64
+MAX_COMPLETIONS = 30
+
+
+def _emoji_version() -> str:
+    """Version of the emoji package, so that the index on disk is rebuilt when it's upgraded."""
+    try:
+        return version("emoji")
+    except PackageNotFoundError:
+        return ""
+
+
+class EmojiCompleter(Completer):
+    """Completes :shortcodes: with their emoji while typing.
+
+    Shortcodes are kept in a sorted list, so the ones starting with what was typed
+    are found with a binary search. The list is built once and cached on disk.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._shortcodes: Optional[List[str]] = None
+        self._emoji: List[str] = []
+
+    def load(self) -> None:
+        """Load the index, from the cache if it's up to date. Slow the first time, call it ahead of typing."""
+        if self._shortcodes is not None:
+            return
+        emoji_version = _emoji_version()
+        try:
+            with open(self.cache_path, "r") as f:
+                cached = json.load(f)
+            if cached["version"] != emoji_version:
+                raise ValueError("outdated emoji index")
+            shortcodes, emoji = cached["shortcodes"], cached["emoji"]
+        except (OSError, ValueError, KeyError):
+            table = emoji_table()
+            shortcodes = sorted(table)
+            emoji = [table[shortcode] for shortcode in shortcodes]
+            cached = {
+                "version": emoji_version,
+                "shortcodes": shortcodes,
+                "emoji": emoji,
+            }
+            try:
+                atomic_write(self.cache_path, json.dumps(cached))
+            except OSError:
+                # Only a cache, it gets rebuilt next time.
+                pass
+        self._emoji = emoji
+        self._shortcodes = shortcodes
+
+    def complete(self, prefix: str) -> Iterable[Completion]:
+        """Completions of the shortcodes starting with prefix, in alphabetical order."""
+        self.load()
+        shortcodes = self._shortcodes
+        index = bisect.bisect_left(shortcodes, prefix)
+        end = min(len(shortcodes), index + MAX_COMPLETIONS)
+        while index < end and shortcodes[index].startswith(prefix):
+            shortcode = shortcodes[index]
+            yield Completion(
+                self._emoji[index],
+                start_position=-len(prefix),
+                display=f"{self._emoji[index]} {shortcode}",
+            )
+            index += 1
+
+    def get_completions(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> Iterable[Completion]:
+        """Emoji for the shortcode being typed right before the cursor."""
+        text = document.text
+        position = document.cursor_position
+        match = TYPED_SHORTCODE_RE.search(text, max(0, position - LOOKBEHIND), position)
+        if match:
+            yield from self.complete(match.group())
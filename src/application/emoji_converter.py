@@ -0,0 +1,91 @@
+import functools
+import re
+from typing import Dict, List, Optional, Tuple
+
+from application.piece_table import TextEdit
+
+# Anything that looks like a :shortcode:, with the characters used in emoji names.
+SHORTCODE_RE = re.compile(r":[\w\-&.’”“()!#*+?–]+:")
+# Variation selector asking terminals to draw the emoji in color.
+EMOJI_VARIANT = "️"
+
+
+@functools.lru_cache(maxsize=None)
+def emoji_table() -> Dict[str, str]:
+    """Emoji of every :shortcode: and alias. Imports the emoji package, so it's only built when first needed."""
+    from emoji.unicode_codes import EMOJI_ALIAS_UNICODE_ENGLISH
+
+    return {
+        shortcode: emoji if emoji.endswith(EMOJI_VARIANT) else emoji + EMOJI_VARIANT
+        for shortcode, emoji in EMOJI_ALIAS_UNICODE_ENGLISH.items()
+    }
+
+
+def find_emoji(text: str, start: int = 0, end: Optional[int] = None) -> List[TextEdit]:
+    """Edits replacing every known :shortcode: in text[start:end] with its emoji, in order.
+
+    One compiled regex finds the candidates and a dict lookup checks them. When a
+    candidate isn't a known shortcode, its closing colon may open the next one.
+    """
+    table = emoji_table()
+    end = len(text) if end is None else end
+    edits = []
+    search = SHORTCODE_RE.search
+    while match := search(text, start, end):
+        shortcode = match.group()
+        emoji = table.get(shortcode)
+        if emoji is None:
+            start = match.end() - 1
+        else:
+            edits.append(TextEdit(match.start(), shortcode, emoji))
+            start = match.end()
+    return edits
+
+
+class EmojiConverter:
+    """Converts :shortcodes: in the editor into emoji.
+
+    Keeps track of the part of the note changed since the last conversion,
+    so that only that part is searched for shortcodes.
+    """
+
+    def __init__(self):
+        # (start, end) of the text that may contain unconverted shortcodes.
+        self.changed: Optional[Tuple[int, int]] = None
+
+    def track(self, edit: TextEdit) -> None:
+        """Follow an edit of the note."""
+        inserted_end = edit.start + len(edit.inserted)
+        if self.changed is None:
+            self.changed = (edit.start, inserted_end)
+            return
+        start, end = self.changed
+        delta = len(edit.inserted) - len(edit.removed)
+        # Positions after the edit move with it, positions inside it collapse to its start.
+        if start >= edit.end:
+            start += delta
+        elif start > edit.start:
+            start = edit.start
+        if end >= edit.end:
+            end += delta
+        elif end > edit.start:
+            end = edit.start
+        self.changed = (min(start, edit.start), max(end, inserted_end))
+
+    def converted(self) -> None:
+        """Forget the changes, e.g. once they have been converted."""
+        self.changed = None
+
+    def edits(
+        self, text: str, selection: Optional[Tuple[int, int]] = None
+    ) -> List[TextEdit]:
+        """Edits converting the shortcodes in the selection, or else in the changed part of text."""
+        if selection is None:
+            if self.changed is None:
+                return []
+            selection = self.changed
+        start, end = selection
+        # Shortcodes never span lines, extend the range to whole lines to catch those on its edges.
+        start = text.rfind("\n", 0, start) + 1
+        end = text.find("\n", end)
+        return find_emoji(text, start, len(text) if end == -1 else end)
@@ -0,0 +1,137 @@
+import codecs
+import mmap
+import os
+from typing import BinaryIO
+
+from constants import LAZY_LOAD_CHUNK_SIZE
+
+
+class UnreadBytes:
+    """The bytes of a file that a LazyFileLoader hasn't decoded, to copy them as they are.
+
+    Holds its own handle on the file, so they can be copied on another thread, after the
+    loader is closed and after the file at the note's path was replaced by a save.
+    """
+
+    def __init__(self, file: BinaryIO, start: int, size: int, mtime_ns: int):
+        self.start = start
+        self.size = size
+        self._mtime_ns = mtime_ns
+        self._file = os.fdopen(os.dup(file.fileno()), "rb")
+
+    def copy_to(self, destination: BinaryIO) -> None:
+        """Write the bytes to destination, raising OSError if the file changed since it was mapped."""
+        stat = os.fstat(self._file.fileno())
+        if stat.st_size != self.size or stat.st_mtime_ns != self._mtime_ns:
+            raise OSError(f"{self._file.name} was changed while it was being read")
+        self._file.seek(self.start)
+        remaining = self.size - self.start
+        while remaining:
+            data = self._file.read(min(remaining, LAZY_LOAD_CHUNK_SIZE))
+            if not data:
+                raise OSError(f"{self._file.name} was changed while it was being read")
+            destination.write(data)
+            remaining -= len(data)
+
+    def close(self) -> None:
+        """Release the handle on the file."""
+        self._file.close()
+
+
+class LazyFileLoader:
+    """Decodes a large note in chunks from a memory-mapped file.
+
+    Only the part of the file that has been requested is decoded, so the time
+    to open a note doesn't depend on its size. Like opening a small note, bytes that
+    aren't UTF-8 raise UnicodeDecodeError rather than being replaced, so saving the
+    note can't corrupt it.
+    """
+
+    def __init__(self, path: str, chunk_size: int = LAZY_LOAD_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.offset = 0
+
+        self._decoder = codecs.getincrementaldecoder("utf8")()
+        self._file = open(path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        self._mtime_ns = stat.st_mtime_ns
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._map = None
+            self.close()
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the whole file has been decoded."""
+        return self.offset >= self.size
+
+    def read_chunk(self) -> str:
+        """Decode the next chunk of the file, ending on a line boundary when possible."""
+        if self.exhausted:
+            return ""
+        self._check_unchanged()
+
+        end = min(self.offset + self.chunk_size, self.size)
+        if end < self.size:
+            newline = self._map.rfind(b"\n", self.offset, end)
+            if newline != -1:
+                end = newline + 1
+            elif self._map[end - 1] == ord("\r") and end - 1 > self.offset:
+                # Keep a "\r\n" in one chunk, for the newline translation.
+                end -= 1
+        return self._decode(end)
+
+    def read_all(self) -> str:
+        """Decode everything that has not been read yet."""
+        if self.exhausted:
+            return ""
+        self._check_unchanged()
+        return self._decode(self.size)
+
+    def unread(self) -> UnreadBytes:
+        """The bytes not decoded yet, to save the note without decoding the rest of it.
+
+        The caller closes them. They start with those of a character cut by the end of the
+        last chunk, and keep their line endings as they are.
+        """
+        pending, _ = self._decoder.getstate()
+        return UnreadBytes(
+            self._file, self.offset - len(pending), self.size, self._mtime_ns
+        )
+
+    def close(self) -> None:
+        """Release the memory map and the file handle."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _check_unchanged(self) -> None:
+        """Raise OSError if the file was truncated or rewritten in place since it was mapped.
+
+        Reading a mapped page past the new end of a truncated file would crash with SIGBUS.
+        """
+        stat = os.fstat(self._file.fileno())
+        if stat.st_size != self.size or stat.st_mtime_ns != self._mtime_ns:
+            self.close()
+            raise OSError(f"{self.path} was changed while it was being read")
+
+    def _decode(self, end: int) -> str:
+        """Decode the bytes from the current offset up to end.
+
+        The incremental decoder holds on to a character split between two chunks.
+        """
+        data = self._map[self.offset : end]
+        self.offset = end
+        try:
+            text = self._decoder.decode(data, final=self.exhausted)
+        except UnicodeDecodeError:
+            self.close()
+            raise
+        if self.exhausted:
+            self.close()
+        # Match the universal newlines behaviour of opening the file in text mode.
+        return text.replace("\r\n", "\n")
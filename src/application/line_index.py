@@ -0,0 +1,213 @@
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.document import Document
+
+from application.edit_tracker import EditTracker
+from application.piece_table import TextEdit
+
+# Lines per block of a LineIndex. An edit rebuilds the blocks it touches.
+LINE_INDEX_BLOCK_SIZE = 256
+
+
+def _line_lengths(text: str) -> List[int]:
+    """Length of every line of text, newline included."""
+    lengths = [len(line) + 1 for line in text.split("\n")]
+    lengths[-1] -= 1
+    return lengths
+
+
+class LineIndex(Sequence[int]):
+    """Start offset of every line of a text, updated edit by edit instead of rescanning the text.
+
+    Line starts are kept in blocks, relative to the start of their block. An edit
+    only rebuilds the blocks it touches and the offsets of the blocks, and finding
+    a line or a position is a bisection over the blocks, then within one.
+    Instances are immutable, apply returns a new index sharing the untouched blocks.
+    """
+
+    def __init__(self, blocks: List[Tuple[int, ...]], lengths: List[int]):
+        self._blocks = blocks
+        # Number of characters in each block.
+        self._lengths = lengths
+        self._block_starts = [0, *accumulate(lengths)]
+        self._block_rows = [0, *accumulate(map(len, blocks))]
+
+    @classmethod
+    def from_text(cls, text: str) -> "LineIndex":
+        """Index of text, in O(n)."""
+        return cls._from_lengths(_line_lengths(text))
+
+    @property
+    def length(self) -> int:
+        """Length of the indexed text."""
+        return self._block_starts[-1]
+
+    def __len__(self) -> int:
+        return self._block_rows[-1]
+
+    def __getitem__(self, row: Union[int, slice]) -> Union[int, List[int]]:
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("line index out of range")
+        block = bisect_right(self._block_rows, row) - 1
+        return (
+            self._block_starts[block]
+            + self._blocks[block][row - self._block_rows[block]]
+        )
+
+    def row_col(self, position: int) -> Tuple[int, int]:
+        """Row and column of position, both 0-based."""
+        block = min(bisect_right(self._block_starts, position), len(self._blocks)) - 1
+        offset = position - self._block_starts[block]
+        starts = self._blocks[block]
+        i = bisect_right(starts, offset) - 1
+        return self._block_rows[block] + i, offset - starts[i]
+
+    def apply(self, edit: TextEdit) -> "LineIndex":
+        """Index of the text after edit, in O(size of the edit + number of blocks)."""
+        first_row, column = self.row_col(edit.start)
+        last_row, _ = self.row_col(edit.end)
+        first_block = bisect_right(self._block_rows, first_row) - 1
+        last_block = bisect_right(self._block_rows, last_row) - 1
+
+        lengths: List[int] = []
+        for block in range(first_block, last_block + 1):
+            starts = self._blocks[block]
+            lengths.extend(
+                end - start
+                for start, end in zip(starts, (*starts[1:], self._lengths[block]))
+            )
+        first = first_row - self._block_rows[first_block]
+        last = last_row - self._block_rows[first_block]
+        # What's left of the last line after the edit, its newline included.
+        suffix = self[last_row] + lengths[last] - edit.end
+
+        inserted = _line_lengths(edit.inserted)
+        inserted[0] += column
+        inserted[-1] += suffix
+        lengths[first : last + 1] = inserted
+
+        changed = LineIndex._from_lengths(lengths)
+        return LineIndex(
+            self._blocks[:first_block]
+            + changed._blocks
+            + self._blocks[last_block + 1 :],
+            self._lengths[:first_block]
+            + changed._lengths
+            + self._lengths[last_block + 1 :],
+        )
+
+    @classmethod
+    def _from_lengths(cls, lengths: List[int]) -> "LineIndex":
+        """Index of lines of the given lengths, in blocks of about the same size."""
+        count = -(-len(lengths) // LINE_INDEX_BLOCK_SIZE)
+        size = -(-len(lengths) // count)
+        blocks = []
+        block_lengths = []
+        for i in range(0, len(lengths), size):
+            chunk = lengths[i : i + size]
+            blocks.append((0, *accumulate(chunk[:-1])))
+            block_lengths.append(sum(chunk))
+        return cls(blocks, block_lengths)
+
+
+class TextLines(Sequence[str]):
+    """The lines of a text, sliced out of it when they're asked for.
+
+    Stands in for Document.lines, which splits the whole text.
+    """
+
+    def __init__(self, text: str, index: LineIndex):
+        self._text = text
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, row: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(row, slice):
+            start, stop, step = row.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            return self._text[self._index[start] : self._end(stop - 1)].split("\n")
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("line index out of range")
+        return self._text[self._index[row] : self._end(row)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._text.split("\n"))
+
+    def _end(self, row: int) -> int:
+        """End of the line, without its newline."""
+        if row + 1 < len(self._index):
+            return self._index[row + 1] - 1
+        return len(self._text)
+
+
+def _line_cache(document: Document) -> Optional[object]:
+    """The cache of document's lines, None if prompt_toolkit doesn't keep one as LineTracker expects."""
+    cache = getattr(document, "_cache", None)
+    attributes = getattr(cache, "__dict__", {})
+    if "lines" in attributes and "line_indexes" in attributes:
+        return cache
+    return None
+
+
+class LineTracker:
+    """Keeps a LineIndex of a buffer's text up to date, and shares it with its Documents.
+
+    prompt_toolkit's Document splits the whole text to find lines, once per version of
+    the text, so after every edit. The Documents of the buffer are handed the index
+    instead, so the cursor row, the lines on screen and searching don't rescan the text.
+    That goes through the private cache of Document. If it isn't laid out as expected,
+    the Documents are left to compute their lines themselves.
+    """
+
+    def __init__(self, buffer: Buffer, edit_tracker: EditTracker):
+        self.buffer = buffer
+        self.index = LineIndex.from_text(buffer.text)
+        # The text the index is of.
+        self._text = buffer.text
+        self._cache = None
+        edit_tracker.add_listener(self._apply_edit)
+        self._share()
+
+    def row_col(self, position: int) -> Tuple[int, int]:
+        """Row and column of position in the buffer, both 0-based, in O(log n)."""
+        if self.buffer.text is not self._text:
+            self._share()
+        return self.index.row_col(position)
+
+    def _apply_edit(self, edit: TextEdit) -> None:
+        self.index = self.index.apply(edit)
+        self._text = self.buffer.text
+        self._share()
+
+    def _share(self) -> None:
+        """Hand the index to the Documents of the current text."""
+        document = self.buffer.document
+        text = document.text
+        if text is not self._text:
+            if text != self._text:
+                # The text was changed without telling the edit tracker, start over.
+                self.index = LineIndex.from_text(text)
+            self._text = text
+        cache = _line_cache(document)
+        if cache is None:
+            return
+        if cache.line_indexes is None:
+            cache.line_indexes = self.index
+        if cache.lines is None:
+            cache.lines = TextLines(text, self.index)
+        # Documents with the same text share this cache, but only while one of them is alive.
+        self._cache = cache
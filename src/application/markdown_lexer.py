@@ -0,0 +1,181 @@
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prompt_toolkit.document import Document
+from prompt_toolkit.formatted_text import StyleAndTextTuples
+from prompt_toolkit.formatted_text.utils import split_lines
+from prompt_toolkit.lexers import Lexer
+from prompt_toolkit.styles.pygments import pygments_token_to_classname
+from pygments.lexers.markup import MarkdownLexer
+
+# Opening and closing lines of a fenced code block, as matched by pygments' MarkdownLexer.
+# Fenced code is the only Markdown block spanning many lines.
+FENCE_OPEN_RE = re.compile(r"[^\S\n]*```(?:[\w\-]+(?:[^\S\n]+.*)?)?")
+FENCE_CLOSE_RE = re.compile(r"[^\S\n]*```")
+ATX_HEADING_RE = re.compile(r"#{1,6}[^#]")
+SETEXT_UNDERLINE_RE = re.compile(r"=+|-+")
+# Number of lexed blocks to remember. A block is a line, except for fenced code and Setext headings.
+LEXED_BLOCKS_CACHE_SIZE = 50_000
+# Lines not in the cache are lexed this many at a time, each pygments call has a cost of its own.
+LEX_AHEAD = 64
+
+
+def find_fences(document: Document) -> Tuple[List[int], List[int]]:
+    """First and last lines of every fenced code block of the document.
+
+    Looking for ``` is a fast substring search, only the lines containing it are
+    matched against the fence patterns. Their rows come from the document's line index.
+    """
+    text = document.text
+    lines = document.lines
+    starts: List[int] = []
+    ends: List[int] = []
+    opening: Optional[int] = None
+    position = text.find("```")
+    while position != -1:
+        row, _ = document.translate_index_to_position(position)
+        line = lines[row]
+        if opening is None:
+            if FENCE_OPEN_RE.fullmatch(line):
+                opening = row
+        elif FENCE_CLOSE_RE.fullmatch(line):
+            starts.append(opening)
+            ends.append(row)
+            opening = None
+        # Next line.
+        position = text.find("\n", position)
+        position = -1 if position == -1 else text.find("```", position)
+    return starts, ends
+
+
+class CachedMarkdownLexer(Lexer):
+    """Markdown highlighting that only lexes what changed.
+
+    A note is split into blocks that pygments lexes independently: fenced code
+    blocks, Setext headings with their underline, and single lines. Outside of
+    fenced code every line start is a sync point, so the lines on screen are
+    lexed without going back to the top of the note. Lexed blocks are cached by
+    content and shared between versions of the note, so after an edit only the
+    block that changed is lexed again.
+    """
+
+    def __init__(self, cache_size: int = LEXED_BLOCKS_CACHE_SIZE):
+        self.pygments_lexer = MarkdownLexer()
+        self.cache_size = cache_size
+        self._blocks: "OrderedDict[str, List[StyleAndTextTuples]]" = OrderedDict()
+        self._styles: Dict[object, str] = {}
+
+    def lex_document(self, document: Document) -> Callable[[int], StyleAndTextTuples]:
+        """Function returning the highlighted fragments of each line of document."""
+        lines = document.lines
+        # Lines of this version of the note that were already looked up.
+        lexed_lines: Dict[int, StyleAndTextTuples] = {}
+        # First and last lines of every fenced code block, found on first use.
+        fences: Optional[Tuple[List[int], List[int]]] = None
+
+        def fence_around(i: int) -> Optional[Tuple[int, int]]:
+            """First and last lines of the fenced code block containing line i, if any."""
+            nonlocal fences
+            if fences is None:
+                fences = find_fences(document)
+            starts, ends = fences
+            k = bisect_right(starts, i) - 1
+            if k >= 0 and ends[k] >= i:
+                return starts[k], ends[k]
+            return None
+
+        def could_be_setext(i: int) -> bool:
+            """Whether line i could be a Setext heading, underlined by the next line."""
+            if i < 0 or i + 1 >= len(lines):
+                return False
+            return bool(
+                lines[i]
+                and not ATX_HEADING_RE.match(lines[i])
+                and SETEXT_UNDERLINE_RE.fullmatch(lines[i + 1])
+                and fence_around(i) is None
+                and fence_around(i + 1) is None
+            )
+
+        def is_setext(i: int) -> bool:
+            """Whether line i is a Setext heading, underlined by the next line."""
+            if not could_be_setext(i):
+                return False
+            # In a run like "a", "---", "---", "---" the underlines pair up from the top.
+            first = i
+            while could_be_setext(first - 1):
+                first -= 1
+            return (i - first) % 2 == 0
+
+        def get_line(i: int) -> StyleAndTextTuples:
+            if i in lexed_lines:
+                return lexed_lines[i]
+            if not 0 <= i < len(lines):
+                return []
+
+            first, last = fence_around(i) or (i, i)
+            if first == last:
+                if is_setext(i):
+                    last = i + 1
+                elif is_setext(i - 1):
+                    first = i - 1
+            if first != last:
+                block = self._lex("\n".join(lines[first : last + 1]))
+                lexed_lines.update(enumerate(block, first))
+                return lexed_lines[i]
+
+            lexed = self._blocks.get(lines[i])
+            if lexed is not None:
+                self._blocks.move_to_end(lines[i])
+                lexed_lines[i] = lexed[0]
+                return lexed[0]
+            # Lex the single lines that follow too, the window is going to ask for them next.
+            end = i + 1
+            while (
+                end < min(len(lines), i + LEX_AHEAD)
+                and lines[end] not in self._blocks
+                and fence_around(end) is None
+                and not is_setext(end)
+                and not is_setext(end - 1)
+            ):
+                end += 1
+            for row, fragments in enumerate(self._lex_lines(lines[i:end]), i):
+                lexed_lines[row] = fragments
+            return lexed_lines[i]
+
+        return get_line
+
+    def _lex(self, text: str) -> List[StyleAndTextTuples]:
+        """Fragments of every line of a block, from the cache if it was lexed before."""
+        lexed = self._blocks.get(text)
+        if lexed is not None:
+            self._blocks.move_to_end(text)
+            return lexed
+        lexed = self._pygments_lex(text)
+        self._remember(text, lexed)
+        return lexed
+
+    def _lex_lines(self, lines: List[str]) -> List[StyleAndTextTuples]:
+        """Fragments of single line blocks, lexed with one call to pygments and cached one by one."""
+        lexed = self._pygments_lex("\n".join(lines))
+        for line, fragments in zip(lines, lexed):
+            self._remember(line, [fragments])
+        return lexed
+
+    def _pygments_lex(self, text: str) -> List[StyleAndTextTuples]:
+        styles = self._styles
+        fragments = []
+        # Markdown rules expect lines to end with a newline.
+        for _, token, value in self.pygments_lexer.get_tokens_unprocessed(text + "\n"):
+            style = styles.get(token)
+            if style is None:
+                style = styles[token] = "class:" + pygments_token_to_classname(token)
+            fragments.append((style, value))
+        # Drop the empty line after the added newline.
+        return list(split_lines(fragments))[:-1]
+
+    def _remember(self, text: str, lexed: List[StyleAndTextTuples]) -> None:
+        self._blocks[text] = lexed
+        if len(self._blocks) > self.cache_size:
+            self._blocks.popitem(last=False)
@@ -0,0 +1,116 @@
+import os
+from collections import OrderedDict
+from typing import Iterator, List, NamedTuple, Optional
+
+from prompt_toolkit.document import Document
+
+from application.lazy_loader import LazyFileLoader
+from application.state import NoteStatus
+from application.undo import HistoryState
+from constants import MAX_OPEN_NOTES, OPEN_NOTES_MAX_CHARS
+
+
+class OpenNote(NamedTuple):
+    """A note kept in memory while another one is in the editor"""
+
+    path: str
+    document: Document
+    history: HistoryState
+    status: NoteStatus
+    # Set if the note isn't fully decoded yet.
+    lazy_loader: Optional[LazyFileLoader]
+    vertical_scroll: int
+
+    @property
+    def size(self) -> int:
+        """Rough number of characters held in memory for the note."""
+        return len(self.document.text) + self.history.document.added_length
+
+    def close(self) -> None:
+        """Release the file of a lazily loaded note."""
+        if self.lazy_loader:
+            self.lazy_loader.close()
+
+
+class OpenNotes:
+    """The notes the user left for another one, least recently used first.
+
+    Switching back to a note takes its text, cursor and undo history from here
+    instead of reading it from disk again.
+    """
+
+    def __init__(
+        self, max_notes: int = MAX_OPEN_NOTES, max_chars: int = OPEN_NOTES_MAX_CHARS
+    ):
+        self.max_notes = max_notes
+        self.max_chars = max_chars
+        self._notes: "OrderedDict[str, OpenNote]" = OrderedDict()
+        self._chars = 0
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def __iter__(self) -> Iterator[OpenNote]:
+        return iter(list(self._notes.values()))
+
+    def put(self, note: OpenNote) -> List[OpenNote]:
+        """Keep note, returning the notes evicted to make room for it.
+
+        The caller saves the evicted notes that have unsaved changes, and closes them.
+        """
+        key = os.path.normpath(note.path)
+        if previous := self._notes.pop(key, None):
+            self._chars -= previous.size
+        self._notes[key] = note
+        self._chars += note.size
+
+        evicted = []
+        while len(self._notes) > self.max_notes or (
+            self._chars > self.max_chars and len(self._notes) > 1
+        ):
+            _, oldest = self._notes.popitem(last=False)
+            self._chars -= oldest.size
+            evicted.append(oldest)
+        return evicted
+
+    def get(self, path: str) -> Optional[OpenNote]:
+        """The note at path if it's kept, without counting it as used."""
+        return self._notes.get(os.path.normpath(path))
+
+    def clear(self) -> List[OpenNote]:
+        """Take every note out, least recently used first."""
+        notes = list(self._notes.values())
+        self._notes.clear()
+        self._chars = 0
+        return notes
+
+    def pop(self, path: str) -> Optional[OpenNote]:
+        """Take the note at path out, None if it isn't kept."""
+        note = self._notes.pop(os.path.normpath(path), None)
+        if note:
+            self._chars -= note.size
+        return note
+
+    def remove(self, path: str) -> None:
+        """Drop the note at path, or every note in the folder at path, without saving."""
+        for note in self._under(path):
+            self.pop(note.path).close()
+
+    def move(self, old_path: str, new_path: str) -> None:
+        """Follow a note or folder that was moved or renamed."""
+        old_path = os.path.normpath(old_path)
+        new_path = os.path.normpath(new_path)
+        for note in self._under(old_path):
+            self.pop(note.path)
+            moved_path = new_path + os.path.normpath(note.path)[len(old_path) :]
+            self._notes[moved_path] = note._replace(path=moved_path)
+            self._chars += note.size
+
+    def _under(self, path: str) -> List[OpenNote]:
+        """The kept notes at path or in the folder at path."""
+        path = os.path.normpath(path)
+        return [
+            note
+            for key, note in self._notes.items()
+            if key == path or key.startswith(path + os.sep)
+        ]
@@ -0,0 +1,318 @@
+import io
+from bisect import bisect_right
+from itertools import accumulate, chain
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# Inserted text longer than this is referenced directly instead of being copied to the add buffer.
+DIRECT_PIECE_SIZE = 4096
+# Pieces per block of a PieceTable. A block twice that size is split.
+PIECE_BLOCK_SIZE = 64
+
+
+class TextEdit(NamedTuple):
+    """A single change to a text: `removed` at `start` was replaced by `inserted`"""
+
+    start: int
+    removed: str
+    inserted: str
+
+    @property
+    def end(self) -> int:
+        """End of the replaced range in the old text."""
+        return self.start + len(self.removed)
+
+
+class _AddBuffer:
+    """Append-only store for typed text. Slicing it only reads the requested range."""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self.length = 0
+
+    def append(self, text: str) -> int:
+        """Append text and return the offset it was written at."""
+        offset = self.length
+        self._buffer.seek(offset)
+        self._buffer.write(text)
+        self.length += len(text)
+        return offset
+
+    def __getitem__(self, key: slice) -> str:
+        self._buffer.seek(key.start)
+        return self._buffer.read(key.stop - key.start)
+
+
+class Piece(NamedTuple):
+    """A run of `length` characters starting at `start` in `source`"""
+
+    source: Union[str, _AddBuffer]
+    start: int
+    length: int
+
+    def text(self, start: int = 0, end: int = None) -> str:
+        """Text of the piece, optionally restricted to [start, end) relative to the piece."""
+        end = self.length if end is None else end
+        return self.source[self.start + start : self.start + end]
+
+
+Snapshot = Tuple[Piece, ...]
+
+
+def _common_length(a: Sequence[Piece], b: Sequence[Piece], forward: bool) -> int:
+    """Number of characters a and b start (or end, if not forward) with that come from the same place."""
+    ia = ib = used_a = used_b = total = 0
+    while ia < len(a) and ib < len(b):
+        pa, pb = a[ia], b[ib]
+        if forward:
+            at_a, at_b = pa.start + used_a, pb.start + used_b
+        else:
+            at_a, at_b = pa.start + pa.length - used_a, pb.start + pb.length - used_b
+        if pa.source is not pb.source or at_a != at_b:
+            break
+        step = min(pa.length - used_a, pb.length - used_b)
+        total += step
+        used_a += step
+        used_b += step
+        if used_a == pa.length:
+            ia, used_a = ia + 1, 0
+        if used_b == pb.length:
+            ib, used_b = ib + 1, 0
+    return total
+
+
+def _snapshot_text(snapshot: Snapshot, start: int, end: int) -> str:
+    """Text of [start, end) of a snapshot."""
+    parts = []
+    position = 0
+    for piece in snapshot:
+        if position >= end:
+            break
+        if position + piece.length > start:
+            parts.append(
+                piece.text(max(0, start - position), min(piece.length, end - position))
+            )
+        position += piece.length
+    return "".join(parts)
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> TextEdit:
+    """The edit turning the text of old into the text of new.
+
+    Pieces shared by both snapshots are skipped without reading their text, so
+    this is O(p) plus the size of the changed range. The edit isn't always the
+    smallest possible one, but it is always correct.
+    """
+    old_length = sum(piece.length for piece in old)
+    new_length = sum(piece.length for piece in new)
+    prefix = _common_length(old, new, forward=True)
+    suffix = min(
+        _common_length(old[::-1], new[::-1], forward=False),
+        min(old_length, new_length) - prefix,
+    )
+    return TextEdit(
+        prefix,
+        _snapshot_text(old, prefix, old_length - suffix),
+        _snapshot_text(new, prefix, new_length - suffix),
+    )
+
+
+class PieceTable:
+    """Text of a note stored as a table of pieces.
+
+    Edits only touch the piece table, never the whole text. Pieces are kept in
+    blocks of about PIECE_BLOCK_SIZE: locating a position bisects the offsets of
+    the blocks, then walks the pieces of one block, and an edit only rewrites
+    the blocks it touches. Offsets of the blocks are recomputed after an edit, so
+    an edit costs O(p / PIECE_BLOCK_SIZE + PIECE_BLOCK_SIZE), p being the number of pieces.
+    Pieces are immutable and sources are append-only, so a snapshot of the
+    table is a tuple of pieces and stays valid after further edits.
+    """
+
+    def __init__(self, text: str = ""):
+        self._add_buffer = _AddBuffer()
+        self._blocks: List[List[Piece]] = [[Piece(text, 0, len(text))]] if text else []
+        # Number of characters in each block, and the offset of each block once computed.
+        self._block_lengths: List[int] = [len(text)] if text else []
+        self._block_starts: Optional[List[int]] = None
+        self._length = len(text)
+        # Materialized text, dropped on every edit.
+        self._text = text
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def added_length(self) -> int:
+        """Number of characters typed or pasted into the table so far."""
+        return self._add_buffer.length
+
+    @property
+    def text(self) -> str:
+        """The whole text. Joined once and cached until the next edit."""
+        if self._text is None:
+            self._text = "".join(self.chunks())
+        return self._text
+
+    def get_text(self, start: int, end: int) -> str:
+        """Text in the range [start, end) without materializing the whole document."""
+        return "".join(self._iter_range(start, end))
+
+    def chunks(self) -> Iterator[str]:
+        """Iterate over the text piece by piece, e.g. to write it to a file."""
+        for piece in chain.from_iterable(self._blocks):
+            yield piece.text()
+
+    def insert(self, position: int, text: str) -> None:
+        """Insert text at position."""
+        if not text:
+            return
+        position = max(0, min(position, self._length))
+        block, index, offset = self._locate(position)
+
+        # Typing at the end of the last typed run just extends that piece.
+        if offset == 0 and (block, index) != (0, 0):
+            if index == 0:
+                block, index = block - 1, len(self._blocks[block - 1])
+            previous = self._blocks[block][index - 1]
+            if (
+                previous.source is self._add_buffer
+                and previous.start + previous.length == self._add_buffer.length
+                and len(text) <= DIRECT_PIECE_SIZE
+            ):
+                self._add_buffer.append(text)
+                self._blocks[block][index - 1] = previous._replace(
+                    length=previous.length + len(text)
+                )
+                self._edited(block, len(text))
+                return
+        elif not self._blocks:
+            self._blocks.append([])
+            self._block_lengths.append(0)
+
+        if len(text) > DIRECT_PIECE_SIZE:
+            new_piece = Piece(text, 0, len(text))
+        else:
+            new_piece = Piece(
+                self._add_buffer, self._add_buffer.append(text), len(text)
+            )
+
+        pieces = self._blocks[block]
+        if offset == 0:
+            pieces.insert(index, new_piece)
+        else:
+            piece = pieces[index]
+            pieces[index : index + 1] = [
+                piece._replace(length=offset),
+                new_piece,
+                Piece(piece.source, piece.start + offset, piece.length - offset),
+            ]
+        self._edited(block, len(text))
+        if len(pieces) > 2 * PIECE_BLOCK_SIZE:
+            self._rebuild_blocks(block, block + 1, pieces)
+
+    def delete(self, start: int, end: int) -> None:
+        """Delete the range [start, end)."""
+        start = max(0, start)
+        end = min(end, self._length)
+        if start >= end:
+            return
+        first_block, first, first_offset = self._locate(start)
+        last_block, last, last_offset = self._locate(end)
+
+        # The pieces of the blocks touched, edited as one list.
+        stop = min(last_block + 1, len(self._blocks))
+        pieces = list(chain.from_iterable(self._blocks[first_block:stop]))
+        last += sum(map(len, self._blocks[first_block:last_block]))
+        replacement = []
+        if first_offset:
+            replacement.append(pieces[first]._replace(length=first_offset))
+        if last < len(pieces) and last_offset:
+            piece = pieces[last]
+            replacement.append(
+                Piece(
+                    piece.source, piece.start + last_offset, piece.length - last_offset
+                )
+            )
+            last += 1
+        pieces[first:last] = replacement
+        if len(pieces) < PIECE_BLOCK_SIZE // 2 and stop < len(self._blocks):
+            # Don't leave a small block behind, merge it with the next one.
+            pieces.extend(self._blocks[stop])
+            stop += 1
+        self._rebuild_blocks(first_block, stop, pieces)
+        self._length -= end - start
+        self._text = None
+
+    def apply(self, edit: TextEdit) -> None:
+        """Apply a TextEdit recorded against the current text."""
+        self.delete(edit.start, edit.end)
+        self.insert(edit.start, edit.inserted)
+
+    def snapshot(self) -> Snapshot:
+        """Immutable copy of the table, costs O(p) regardless of the text size."""
+        return tuple(chain.from_iterable(self._blocks))
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Go back to a snapshot taken from this table."""
+        self._blocks = []
+        self._block_lengths = []
+        self._rebuild_blocks(0, 0, list(snapshot))
+        self._length = sum(self._block_lengths)
+        self._text = None
+
+    ############ INTERNALS ############
+    def _edited(self, block: int, delta: int) -> None:
+        """Update the bookkeeping after an edit in block changed the length by delta."""
+        self._block_lengths[block] += delta
+        self._block_starts = None
+        self._length += delta
+        self._text = None
+
+    def _rebuild_blocks(self, first: int, stop: int, pieces: List[Piece]) -> None:
+        """Replace the blocks [first, stop) by pieces, cut into blocks of about the same size."""
+        count = -(-len(pieces) // PIECE_BLOCK_SIZE)
+        size = -(-len(pieces) // count) if count else 0
+        blocks = [pieces[i : i + size] for i in range(0, len(pieces), size or 1)]
+        self._blocks[first:stop] = blocks
+        self._block_lengths[first:stop] = [
+            sum(piece.length for piece in block) for block in blocks
+        ]
+        self._block_starts = None
+
+    def _locate(self, position: int) -> Tuple[int, int, int]:
+        """Return (block index, piece index in the block, offset in piece) of position.
+
+        A position on a piece boundary is reported as offset 0 of the following piece,
+        and the end of the text as (number of blocks, 0, 0).
+        """
+        if position >= self._length:
+            return len(self._blocks), 0, 0
+        if self._block_starts is None:
+            self._block_starts = [0, *accumulate(self._block_lengths)]
+        block = bisect_right(self._block_starts, position) - 1
+        offset = position - self._block_starts[block]
+        for index, piece in enumerate(self._blocks[block]):
+            if offset < piece.length:
+                return block, index, offset
+            offset -= piece.length
+        raise AssertionError("block lengths out of sync with their pieces")
+
+    def _iter_range(self, start: int, end: int) -> Iterator[str]:
+        """Yield the pieces of text covering [start, end)."""
+        start = max(0, start)
+        end = min(end, self._length)
+        if start >= end:
+            return
+        block, index, offset = self._locate(start)
+        pieces = chain(
+            self._blocks[block][index:],
+            chain.from_iterable(self._blocks[block + 1 :]),
+        )
+        remaining = end - start
+        for piece in pieces:
+            take = min(piece.length - offset, remaining)
+            yield piece.text(offset, offset + take)
+            remaining -= take
+            if remaining <= 0:
+                break
+            offset = 0
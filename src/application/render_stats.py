@@ -0,0 +1,132 @@
+import json
+import sys
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional, TextIO
+
+from prompt_toolkit.application import Application
+
+from constants import RENDER_LOG, RENDER_STATS_FRAMES
+
+# Callers of Application.invalidate with a friendlier name, by module and function.
+KNOWN_CAUSES = {
+    ("key_bindings", "call"): "key",
+    ("application", "_invalidate_handler"): "ui",
+    ("application", "auto_refresh"): "refresh",
+}
+
+
+class Frame(NamedTuple):
+    """One frame drawn by the application"""
+
+    time: float
+    # Seconds spent drawing it, after_render handlers included.
+    duration: float
+    # Bytes written to the terminal.
+    bytes: int
+    # What asked for the frame, and how many times.
+    causes: Dict[str, int]
+
+
+class RenderStats:
+    """Measures how long frames take to draw, how much they write to the terminal and what asked for them.
+
+    Costs next to nothing while disabled. While enabled, every frame is also appended to a log file.
+    """
+
+    def __init__(
+        self, log_path: str = RENDER_LOG, max_frames: int = RENDER_STATS_FRAMES
+    ):
+        self.log_path = log_path
+        self.enabled = False
+        self.frames: Deque[Frame] = deque(maxlen=max_frames)
+        self._log: Optional[TextIO] = None
+        self._start: Optional[float] = None
+        self._bytes = 0
+        self._causes: Counter = Counter()
+
+    def attach(self, app: Application) -> None:
+        """Hook into the rendering of app. Attach it last, so after_render handlers count towards the frame."""
+        app.before_render += self._before_render
+        app.after_render += self._after_render
+        app.invalidate = self._track_invalidate(app.invalidate)
+        app.output.write = self._track_write(app.output.write)
+        app.output.write_raw = self._track_write(app.output.write_raw)
+
+    def toggle(self) -> None:
+        """Start or stop measuring."""
+        if self.enabled:
+            self.close()
+        else:
+            self._log = open(self.log_path, "a", encoding="utf-8")
+            self.enabled = True
+
+    def close(self) -> None:
+        """Stop measuring and close the log file."""
+        self.enabled = False
+        self._start = None
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def summary(self) -> str:
+        """A few lines describing the last frames, for the overlay."""
+        if not self.frames:
+            return " Waiting for a frame... "
+        last = self.frames[-1]
+        durations = [frame.duration for frame in self.frames]
+        average_bytes = sum(frame.bytes for frame in self.frames) // len(self.frames)
+        causes: Counter = Counter()
+        for frame in self.frames:
+            causes.update(frame.causes)
+        return "\n".join(
+            (
+                f" Frame {last.duration * 1000:.1f} ms, {last.bytes} bytes ",
+                f" Last {len(durations)}: avg {sum(durations) / len(durations) * 1000:.1f} ms,"
+                f" max {max(durations) * 1000:.1f} ms, {average_bytes} bytes ",
+                " Causes: "
+                + ", ".join(
+                    f"{cause} {count}" for cause, count in causes.most_common(3)
+                )
+                + " ",
+            )
+        )
+
+    def _before_render(self, app: Application) -> None:
+        if self.enabled:
+            self._start = time.perf_counter()
+
+    def _after_render(self, app: Application) -> None:
+        if not self.enabled or self._start is None:
+            return
+        frame = Frame(
+            time.time(),
+            time.perf_counter() - self._start,
+            self._bytes,
+            # Redraws not asked for through invalidate, like the first frame or a resize.
+            dict(self._causes) or {"other": 1},
+        )
+        self.frames.append(frame)
+        self._log.write(json.dumps(frame._asdict()) + "\n")
+        self._start = None
+        self._bytes = 0
+        self._causes.clear()
+
+    def _track_invalidate(self, invalidate: Callable[[], None]) -> Callable[[], None]:
+        def wrapper() -> None:
+            if self.enabled:
+                caller = sys._getframe(1)
+                module = caller.f_globals.get("__name__", "").rpartition(".")[2]
+                name = caller.f_code.co_name
+                self._causes[KNOWN_CAUSES.get((module, name), f"{module}.{name}")] += 1
+            invalidate()
+
+        return wrapper
+
+    def _track_write(self, write: Callable[[str], None]) -> Callable[[str], None]:
+        def wrapper(data: str) -> None:
+            if self.enabled:
+                self._bytes += len(data.encode("utf-8", "replace"))
+            write(data)
+
+        return wrapper
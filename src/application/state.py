@@ -1,8 +1,72 @@
-import json
 import os
-from typing import Dict
+from typing import Optional, Tuple
 
-from constants import DEFAULT_STYLE, NOTES_DIR, USER_SETTINGS_DIR, WELCOME_PAGE
+from constants import NOTES_DIR, WELCOME_PAGE
+from storage import user_settings
+
+
+class NoteStatus:
+    """Whether a note was edited since it was opened or last saved.
+
+    Kept up to date from buffer change events, so checking it never touches the disk.
+    """
+
+    def __init__(self):
+        self.dirty = False
+        self.change_count = 0
+        self._saved_length = 0
+        self._saved_hash: Optional[int] = hash("")
+        # (mtime_ns, size) of the file the app last wrote for the note.
+        self._written: Optional[Tuple[int, int]] = None
+        # Path the note had and "Moved" or "Deleted", once its file was moved or deleted in the app.
+        self.removed: Optional[Tuple[str, str]] = None
+
+    def record_change(self) -> None:
+        """Register an edit of the note."""
+        self.change_count += 1
+        self.dirty = True
+
+    def mark_saved(
+        self, text: Optional[str], change_count: Optional[int] = None
+    ) -> None:
+        """Register that text is what is on disk for the note.
+
+        Pass None when the content on disk isn't fully known (like a partially decoded large
+        note), then is_modified can only rely on the dirty flag.
+        Pass the change_count the text was taken at when saving in the background. If the note
+        was edited since, it stays dirty.
+        """
+        if change_count is None or change_count == self.change_count:
+            self.dirty = False
+        if text is None:
+            self._saved_hash = None
+        else:
+            self._saved_length = len(text)
+            self._saved_hash = hash(text)
+
+    def mark_written(self, stat: os.stat_result) -> None:
+        """Register the stat of the file the app just wrote for the note."""
+        self._written = (stat.st_mtime_ns, stat.st_size)
+
+    def is_own_write(self, stat: os.stat_result) -> bool:
+        """Whether the file with stat is the one the app last wrote, e.g. to ignore the watcher reporting it."""
+        return self._written == (stat.st_mtime_ns, stat.st_size)
+
+    def is_modified(self, text: str) -> bool:
+        """Whether text differs from the saved version of the note.
+
+        O(1) unless the note was edited back to the saved length (e.g. by undoing),
+        in which case the content hash is compared. str caches its hash, so that
+        only costs anything once per version of the text.
+        """
+        if not self.dirty:
+            return False
+        if self._saved_hash is None or len(text) != self._saved_length:
+            return True
+        if hash(text) == self._saved_hash:
+            # Back to the saved content.
+            self.dirty = False
+        return self.dirty
 
 
 class ApplicationState:
@@ -10,45 +74,47 @@ class ApplicationState:
 
     def __init__(self):
 
-        self.user_settings = self._load_settings()
+        self.user_settings = user_settings
 
         self.show_status_bar = True
+        self.autosave = True
+        # Saved state of the note in the editor. Each opened note gets its own.
+        self.note = NoteStatus()
         if self.user_settings.get("last_path"):
             self.current_path = self.user_settings["last_path"]
         else:
             # Open the welcome page
             self.current_path = NOTES_DIR + "/" + WELCOME_PAGE
 
-    def _load_settings(self, reset_style: bool = False) -> Dict[str, str]:
-        """Load user settings from disk. Use default settings for any missing settings."""
-        default_path = os.path.join(NOTES_DIR, "welcome.md")
-        try:
-            with open(USER_SETTINGS_DIR, "r") as f:
-                # There is a failure case here, in that `.user_setting.json` could be an empty file.
-                # In which case this raises a JSONDecodeError exception.
-                # This should not be encountered in a normal user flow, but this is a risk.
-                user_settings = json.load(f)
-        except FileNotFoundError:
-            # If for some reason the file is not present, then use the default settings and write them to disk.
-            user_settings = {
-                "last_path": default_path,
-                "style": DEFAULT_STYLE,
-            }
-            with open(USER_SETTINGS_DIR, "w") as f:
-                json.dump(user_settings, f)
-            return user_settings
-        else:
-            if reset_style:
-                user_settings["style"] = DEFAULT_STYLE
-            with open(USER_SETTINGS_DIR, "w") as f:
-                json.dump(user_settings, f)
+    @property
+    def dirty(self) -> bool:
+        """Whether the open note was edited since it was opened or last saved."""
+        return self.note.dirty
 
-        if "last_path" not in user_settings:
-            user_settings["last_path"] = default_path
-        if "style" not in user_settings or type(user_settings["style"]) is not dict:
-            user_settings["style"] = DEFAULT_STYLE
+    @property
+    def change_count(self) -> int:
+        """Number of edits of the open note so far."""
+        return self.note.change_count
+
+    def record_change(self) -> None:
+        """Register an edit of the open note."""
+        self.note.record_change()
+
+    def mark_saved(
+        self, text: Optional[str], change_count: Optional[int] = None
+    ) -> None:
+        """Register that text is what is on disk for the open note, see NoteStatus.mark_saved."""
+        self.note.mark_saved(text, change_count)
 
-        return user_settings
+    def is_modified(self, text: str) -> bool:
+        """Whether text differs from the saved version of the open note, see NoteStatus.is_modified."""
+        return self.note.is_modified(text)
+
+    def mark_removed(self, reason: str) -> None:
+        """Register that the file of the open note was moved or deleted, leaving the note without a path."""
+        if self.current_path:
+            self.note.removed = (self.current_path, reason)
+            self.current_path = None
 
     @property
     def current_dir(self) -> str:
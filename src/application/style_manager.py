@@ -0,0 +1,72 @@
+from typing import Dict, Optional, Tuple
+
+from prompt_toolkit.styles import BaseStyle, Style, merge_styles
+
+# How many compiled styles to remember, e.g. the user's style and a few previews of it.
+STYLE_CACHE_SIZE = 16
+
+StyleKey = Tuple[Tuple[str, str], ...]
+
+
+class StyleManager:
+    """Owns the application's style.
+
+    Compiled styles are memoized by content, so switching back to a style that was
+    used before doesn't compile it again and keeps prompt_toolkit's attribute cache
+    for it. Previewed changes of single classes are a small style merged on top of
+    the user's style, instead of a recompilation of every class.
+    """
+
+    def __init__(self, style_dict: Optional[Dict[str, str]] = None):
+        self._compiled: Dict[StyleKey, Style] = {}
+        self._merged: Dict[Tuple[StyleKey, StyleKey], BaseStyle] = {}
+        self._base: StyleKey = ()
+        self._overrides: Dict[str, str] = {}
+        if style_dict is not None:
+            self.set_base(style_dict)
+
+    def set_base(self, style_dict: Dict[str, str]) -> None:
+        """Use style_dict as the style of the application. Drops any previewed change."""
+        self._base = tuple(style_dict.items())
+        self._overrides = {}
+
+    def preview(self, style_class: str, style_str: str) -> None:
+        """Show style_class styled as style_str, without changing the base style."""
+        self._overrides[style_class] = style_str
+
+    def clear_preview(self) -> None:
+        """Go back to the base style."""
+        self._overrides = {}
+
+    @property
+    def style(self) -> BaseStyle:
+        """Current style, to be used with a DynamicStyle."""
+        overrides = tuple(self._overrides.items())
+        if not overrides:
+            return self._compile(self._base)
+        key = (self._base, overrides)
+        merged = self._merged.get(key)
+        if merged is None:
+            # Rules of later styles win, so the overrides go last.
+            merged = merge_styles([self._compile(self._base), self._compile(overrides)])
+            self._remember(self._merged, key, merged)
+        return merged
+
+    ############ INTERNALS ############
+    def _compile(self, key: StyleKey) -> Style:
+        style = self._compiled.get(key)
+        if style is None:
+            style = Style(list(key))
+            self._remember(self._compiled, key, style)
+        return style
+
+    @staticmethod
+    def _remember(cache: dict, key: tuple, value: BaseStyle) -> None:
+        """Add to a cache, dropping its oldest entry when full."""
+        if len(cache) >= STYLE_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[key] = value
+
+
+# The style of the application.
+style_manager = StyleManager()
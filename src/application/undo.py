@@ -0,0 +1,340 @@
+from itertools import count
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.document import Document
+
+from application.edit_tracker import EditTracker
+from application.piece_table import (
+    Piece,
+    PieceTable,
+    Snapshot,
+    TextEdit,
+    diff_snapshots,
+)
+from constants import UNDO_MAX_CHARS
+
+# Every distinct text gets a new version, so equal versions mean equal texts.
+_versions = count()
+
+
+def _inverse(edit: TextEdit) -> TextEdit:
+    """The edit undoing edit."""
+    return TextEdit(edit.start, edit.inserted, edit.removed)
+
+
+def _edited_length(edits: Sequence[TextEdit]) -> int:
+    """Characters held by edits, each edit counting as one more."""
+    return sum(len(edit.removed) + len(edit.inserted) + 1 for edit in edits)
+
+
+class UndoState(NamedTuple):
+    """A state of the note that undo/redo can go back to"""
+
+    version: int
+    cursor_position: int
+    # The edits between this state and the next one towards the current text, rewound to
+    # undo and replayed to redo. Empty for checkpoints.
+    edits: Tuple[TextEdit, ...]
+    # Set for checkpoints, which are restored directly.
+    snapshot: Optional[Snapshot]
+
+    @property
+    def cost(self) -> int:
+        """Memory held by the state, in characters. A piece of a snapshot counts as one."""
+        pieces = len(self.snapshot) if self.snapshot is not None else 0
+        return _edited_length(self.edits) + pieces
+
+
+class HistoryState(NamedTuple):
+    """The history of a note that isn't in the editor, see UndoHistory.detach"""
+
+    document: PieceTable
+    version: int
+    undo_stack: List[UndoState]
+    redo_stack: List[UndoState]
+    # Edits made since the last state of the undo stack, None if it's a checkpoint.
+    edits: Optional[List[TextEdit]] = None
+
+
+class UndoHistory:
+    """Undo/redo for the editor, backed by the edits made to the note.
+
+    prompt_toolkit keeps a full copy of the text for every undo step.
+    Here a step holds the edits between two states, so memory grows with what
+    was edited, not with the size of the note. Where a snapshot of the note's
+    piece table is smaller, like after deleting a large selection, the step
+    keeps that instead (a checkpoint). Past max_chars, the oldest steps are dropped.
+    """
+
+    def __init__(
+        self,
+        buffer: Buffer,
+        edit_tracker: EditTracker,
+        max_chars: int = UNDO_MAX_CHARS,
+    ):
+        self.buffer = buffer
+        self.edit_tracker = edit_tracker
+        self.max_chars = max_chars
+        self._restoring = False
+        self.reset()
+
+        edit_tracker.add_listener(self._apply_edit)
+        # Take over the buffer's own undo stack. The key processor calls save_to_undo_stack
+        # before every key binding, and Buffer.undo/redo are used by the default bindings.
+        buffer.save_to_undo_stack = self.save
+        buffer.undo = self.undo
+        buffer.redo = self.redo
+
+    def reset(self) -> None:
+        """Forget the history, e.g. when another note is opened."""
+        self.document = PieceTable(self.buffer.text)
+        self.version = next(_versions)
+        self._undo_stack: List[UndoState] = []
+        self._redo_stack: List[UndoState] = []
+        # Edits made since the top of the undo stack, None if it's a checkpoint.
+        self._edits: Optional[List[TextEdit]] = []
+        self._size = 0
+
+    def extend(self, text: str) -> None:
+        """Append text to the note and to every state in the history.
+
+        Used for the lazily decoded tail of a large note, which is part of every version of it.
+        Edits stay valid as they are, only checkpoints get the text appended.
+        """
+        versions = {}
+        piece = (Piece(text, 0, len(text)),)
+
+        def extended(state: UndoState) -> UndoState:
+            snapshot = state.snapshot
+            return state._replace(
+                version=versions.setdefault(state.version, next(_versions)),
+                snapshot=None if snapshot is None else snapshot + piece,
+            )
+
+        self._undo_stack = [extended(state) for state in self._undo_stack]
+        self._redo_stack = [extended(state) for state in self._redo_stack]
+        self._size = self._stacks_cost()
+
+        self.edit_tracker.expect(TextEdit(len(self.buffer.text), "", text))
+        self._restoring = True
+        try:
+            self.buffer.set_document(
+                Document(self.buffer.text + text, self.buffer.cursor_position),
+                bypass_readonly=True,
+            )
+        finally:
+            self._restoring = False
+        self.document.insert(len(self.document), text)
+        self.version = versions.setdefault(self.version, next(_versions))
+
+    def save(self, clear_redo_stack: bool = True) -> None:
+        """Save the current state, so that we can go back to it with undo."""
+        if self._undo_stack and self._undo_stack[-1].version == self.version:
+            # Same text, only remember the new cursor position.
+            self._undo_stack[-1] = self._undo_stack[-1]._replace(
+                cursor_position=self.buffer.cursor_position
+            )
+        else:
+            if self._undo_stack:
+                # The edits leading away from the previous state are known now.
+                previous = self._undo_stack[-1]
+                self._undo_stack[-1] = self._compact(previous, self._edits)
+                self._size += self._undo_stack[-1].cost - previous.cost
+            state = UndoState(
+                self.version, self.buffer.cursor_position, (), self.document.snapshot()
+            )
+            self._undo_stack.append(state)
+            self._size += state.cost
+            self._edits = []
+            self._trim()
+
+        if clear_redo_stack and self._redo_stack:
+            self._size -= sum(state.cost for state in self._redo_stack)
+            self._redo_stack = []
+
+    def undo(self) -> None:
+        """Go back to the last saved state that differs from the current text."""
+        while self._undo_stack:
+            state = self._undo_stack.pop()
+            self._size -= state.cost
+            edits = self._edits
+            self._edits = self._edits_from_top()
+            if state.version != self.version:
+                redo = UndoState(
+                    self.version,
+                    self.buffer.cursor_position,
+                    (),
+                    self.document.snapshot(),
+                )
+                self._redo_stack.append(self._compact(redo, edits))
+                self._size += self._redo_stack[-1].cost
+                if state.snapshot is not None:
+                    self.document.restore(state.snapshot)
+                else:
+                    self._rewind(edits)
+                self._show(state)
+                break
+
+    def redo(self) -> None:
+        """Redo the last undone change."""
+        if self._redo_stack:
+            self.save(clear_redo_stack=False)
+            state = self._redo_stack.pop()
+            self._size -= state.cost
+            if state.snapshot is not None:
+                self.document.restore(state.snapshot)
+                self._edits = None
+            else:
+                self._replay(state.edits)
+                self._edits = list(state.edits)
+            self._show(state)
+
+    def detach(self) -> HistoryState:
+        """Hand over the history of the note in the editor, to come back to it with switch.
+
+        The editor is left with an empty history, so further edits don't change the one handed over.
+        """
+        history = HistoryState(
+            self.document,
+            self.version,
+            self._undo_stack,
+            self._redo_stack,
+            self._edits,
+        )
+        self.reset()
+        return history
+
+    def switch(self, document: Document, history: HistoryState) -> None:
+        """Show another note in the buffer, with the history detached from it."""
+        self.edit_tracker.expect(TextEdit(0, self.buffer.text, document.text))
+        self._restoring = True
+        try:
+            self.buffer.set_document(document, bypass_readonly=True)
+        finally:
+            self._restoring = False
+        (
+            self.document,
+            self.version,
+            self._undo_stack,
+            self._redo_stack,
+            self._edits,
+        ) = history
+        self._size = self._stacks_cost()
+
+    def export(self, max_steps: int, max_chars: int) -> List[tuple]:
+        """The most recent undo steps, as [start, removed, inserted, cursor_position] lists.
+
+        Each step is the edit going from the text after it back to the text before
+        it, newest first. Stops after max_steps, or once the edited text adds up to
+        more than max_chars.
+        """
+        steps = []
+        chars = 0
+        current = self.document.snapshot()
+        newer, newer_version = current, self.version
+        edits = self._edits
+        try:
+            for index in range(len(self._undo_stack) - 1, -1, -1):
+                if len(steps) >= max_steps:
+                    break
+                state = self._undo_stack[index]
+                if state.version != newer_version:
+                    # Walk the piece table back to the state, and diff it to get a single edit.
+                    if state.snapshot is not None:
+                        self.document.restore(state.snapshot)
+                    else:
+                        self._rewind(edits)
+                    older = self.document.snapshot()
+                    edit = diff_snapshots(newer, older)
+                    chars += len(edit.removed) + len(edit.inserted)
+                    if chars > max_chars:
+                        break
+                    steps.append([*edit, state.cursor_position])
+                    newer, newer_version = older, state.version
+                if index:
+                    edits = self._undo_stack[index - 1].edits
+        finally:
+            self.document.restore(current)
+        return steps
+
+    def load(self, steps: List[tuple]) -> None:
+        """Replace the history with steps from export(), made on the same text.
+
+        Steps that don't fit the text are dropped, along with every older step.
+        """
+        self.reset()
+        current = self.document.snapshot()
+        states: List[UndoState] = []
+        for step in steps:
+            edit: Optional[TextEdit] = None
+            try:
+                start, removed, inserted, cursor_position = step
+                if 0 <= start and start + len(removed) <= len(self.document):
+                    edit = TextEdit(start, removed, inserted)
+            except (TypeError, ValueError):
+                pass
+            if edit is None or self.document.get_text(start, edit.end) != removed:
+                break
+            self.document.apply(edit)
+            cursor_position = min(max(0, cursor_position), len(self.document))
+            states.append(
+                UndoState(next(_versions), cursor_position, (_inverse(edit),), None)
+            )
+        self.document.restore(current)
+        self._undo_stack = states[::-1]
+        self._edits = self._edits_from_top()
+        self._size = self._stacks_cost()
+        self._trim()
+
+    ############ INTERNALS ############
+    def _compact(self, state: UndoState, edits: Optional[List[TextEdit]]) -> UndoState:
+        """The state with the edits leading away from it, or as a checkpoint if its snapshot is smaller."""
+        if edits is not None and (
+            state.snapshot is None or _edited_length(edits) <= len(state.snapshot)
+        ):
+            return state._replace(edits=tuple(edits), snapshot=None)
+        return state._replace(edits=())
+
+    def _edits_from_top(self) -> Optional[List[TextEdit]]:
+        """The edits from the top of the undo stack to the current text, when it's not a checkpoint."""
+        if self._undo_stack and self._undo_stack[-1].snapshot is None:
+            return list(self._undo_stack[-1].edits)
+        return None
+
+    def _stacks_cost(self) -> int:
+        return sum(state.cost for state in self._undo_stack + self._redo_stack)
+
+    def _trim(self) -> None:
+        """Drop the oldest states while the history is over its memory budget."""
+        drop = 0
+        while self._size > self.max_chars and drop < len(self._undo_stack) - 1:
+            self._size -= self._undo_stack[drop].cost
+            drop += 1
+        del self._undo_stack[:drop]
+
+    def _rewind(self, edits: Sequence[TextEdit]) -> None:
+        for edit in reversed(edits):
+            self.document.apply(_inverse(edit))
+
+    def _replay(self, edits: Sequence[TextEdit]) -> None:
+        for edit in edits:
+            self.document.apply(edit)
+
+    def _show(self, state: UndoState) -> None:
+        """Put the text of the piece table in the buffer, at the cursor position of state."""
+        self._restoring = True
+        try:
+            self.buffer.document = Document(self.document.text, state.cursor_position)
+        finally:
+            self._restoring = False
+        self.version = state.version
+
+    def _apply_edit(self, edit: TextEdit) -> None:
+        """Mirror a change of the buffer in the piece table."""
+        if self._restoring:
+            return
+        self.document.apply(edit)
+        self.version = next(_versions)
+        if self._edits is not None:
+            self._edits.append(edit)
@@ -6,6 +6,47 @@ WELCOME_PAGE = "welcome.md"
 PADDING_CHAR = "|"
 PADDING_WIDTH = 1
 DIALOG_WIDTH = 80
+# Notes bigger than this (in bytes) are decoded lazily as the user scrolls.
+LARGE_FILE_THRESHOLD = 1024 * 1024
+LAZY_LOAD_CHUNK_SIZE = 256 * 1024
+# How many lines past the bottom of the window should already be decoded.
+LAZY_LOAD_MARGIN = 200
+# Number of characters shown when previewing a note, and how many previews to cache.
+PREVIEW_LENGTH = 1000
+PREVIEW_CACHE_SIZE = 256
+# Seconds without typing before the open note is saved automatically.
+AUTOSAVE_DELAY = 2.0
+# Notes left for another one stay in memory, so that switching back to them is instant.
+# The least recently used are saved and dropped past this many notes or characters.
+MAX_OPEN_NOTES = 10
+OPEN_NOTES_MAX_CHARS = 64 * 1024 * 1024
+# Memory the undo history of a note may use before its oldest steps are dropped, counted in
+# characters of edited text (an edit or a piece of a checkpoint counting as one more).
+UNDO_MAX_CHARS = 16 * 1024 * 1024
+# Number of notes whose cursor, scroll position and undo history are remembered, and how much
+# of the undo history is kept per note (in steps and in characters of edited text).
+MAX_SESSIONS = 200
+SESSION_UNDO_STEPS = 100
+SESSION_UNDO_CHARS = 64 * 1024
+# Seconds to wait for more changes of the notes tree before handling them, and between
+# scans of the tree where the kernel can't report changes.
+WATCH_DEBOUNCE = 0.2
+WATCH_POLL_INTERVAL = 2.0
+# Deleted notes and folders are moved to the trash, and deleted for good after this many days.
+TRASH_DIR = os.path.join(NOTES_DIR, ".trash")
+TRASH_KEEP_DAYS = 30
+# Seconds a move or delete can take before a progress dialog is shown.
+PROGRESS_DIALOG_DELAY = 0.3
+# While render stats are shown, every frame is logged here, and the overlay sums up this many.
+RENDER_LOG = os.path.join(NOTES_DIR, ".render_log.jsonl")
+RENDER_STATS_FRAMES = 100
+# Quick-open scans the note paths for this many seconds per frame, until this many match,
+# and lists the best this many.
+QUICK_OPEN_BUDGET = 0.008
+QUICK_OPEN_MATCHES = 500
+QUICK_OPEN_RESULTS = 100
+# Seconds to wait for more setting changes before writing them to disk.
+SETTINGS_WRITE_DELAY = 0.5
 USER_SETTINGS_DIR = os.path.join(NOTES_DIR, ".user_setting.json")
 DEFAULT_STYLE = {
     "status": "reverse",
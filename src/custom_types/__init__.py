@@ -1,18 +1,27 @@
 from .color_picker import ColorPicker, ScrollMenuColorDialog
 from .confirm import ConfirmDialog
 from .message import MessageDialog
+from .progress import ProgressDialog
+from .quick_open import QuickOpenDialog
 from .save_exit import SaveExitDialog
 from .scroll_menu import ScrollMenuDialog
+from .search_results import SearchResultsDialog
 from .text_input import TextInputDialog
 from .ui_types import PopUpDialog
+from .virtual_list import VirtualList, VirtualListControl
 
 __all__ = [
     TextInputDialog,
     ScrollMenuDialog,
+    SearchResultsDialog,
+    QuickOpenDialog,
     MessageDialog,
     ConfirmDialog,
     ColorPicker,
     ScrollMenuColorDialog,
     SaveExitDialog,
+    ProgressDialog,
     PopUpDialog,
+    VirtualList,
+    VirtualListControl,
 ]
@@ -1,18 +1,16 @@
 import functools
-import json
 import string
 from asyncio import Future
 
-from prompt_toolkit.application.current import get_app
 from prompt_toolkit.buffer import Buffer
 from prompt_toolkit.layout import ScrollablePane
 from prompt_toolkit.layout.containers import HSplit
 from prompt_toolkit.layout.dimension import D
-from prompt_toolkit.styles import Style
 from prompt_toolkit.widgets import Button, Dialog, Frame, Label, TextArea
 
-from constants import USER_SETTINGS_DIR
+from application.style_manager import style_manager
 from custom_types.ui_types import PopUpDialog
+from storage import user_settings
 
 
 class ColorPicker(PopUpDialog):
@@ -20,8 +18,8 @@ class ColorPicker(PopUpDialog):
 
     def __init__(self, style_class: str, style_class_attr: str):
         self.future = Future()
-        with open(USER_SETTINGS_DIR, "r") as user_file:
-            self.user_settings = json.load(user_file)
+        # Previews change a copy, the settings only change when the color is applied.
+        self.style = dict(user_settings["style"])
 
         def is_hex(s: str) -> bool:
             """Validate that the user entered text is a 6 digit hex number
@@ -62,7 +60,7 @@ class ColorPicker(PopUpDialog):
 
         def get_hex_style(style_c: str, style_c_attr: str) -> str:
             """Gets previously set hex value for user reference"""
-            style_ = self.user_settings["style"][style_c]
+            style_ = self.style[style_c]
             style_dict = string_to_dict(style_)
             if style_c_attr in style_dict.keys():
                 # if key is real
@@ -74,13 +72,13 @@ class ColorPicker(PopUpDialog):
         def preview_changes() -> None:
             """Preview the given change of style
 
-            by setting it to applications style but not to the user_settings file
+            by setting it to applications style but not to the user settings
             """
             if is_hex(self.text_area.text):
                 self.promp_label.text = "Enter a hex:"
                 # just reset if it was set to Invalid
 
-                style_menu = self.user_settings["style"][style_class]
+                style_menu = self.style[style_class]
                 style_menu_dict = string_to_dict(style_menu)
                 if style_class_attr != "":
                     # if class attribute is '' save as just #123456
@@ -88,9 +86,10 @@ class ColorPicker(PopUpDialog):
                 else:
                     style_menu_dict[""] = f"#{self.text_area.text}"
                 style_menu = dict_to_string(style_menu_dict)
-                self.user_settings["style"][style_class] = style_menu
+                self.style[style_class] = style_menu
 
-                get_app().style = Style.from_dict(self.user_settings["style"])
+                # Only the changed class is compiled, on top of the user's style.
+                style_manager.preview(style_class, style_menu)
 
             else:
                 self.promp_label.text = "Invalid Hex!"
@@ -101,14 +100,12 @@ class ColorPicker(PopUpDialog):
             return True
 
         def accept() -> None:
-            """Accept the change save the style to the user_settings file"""
+            """Accept the change save the style to the user settings"""
             if is_hex(self.text_area.text):
                 # save to user settings
-                self.user_settings["style"][style_class] = f"bg:#{self.text_area.text}"
-
-                with open(USER_SETTINGS_DIR, "w") as user_file:
-                    json.dump(self.user_settings, user_file)
+                self.style[style_class] = f"bg:#{self.text_area.text}"
 
+                user_settings.set("style", self.style)
                 self.future.set_result(None)
             else:
                 # invalid hex don't set_future
@@ -0,0 +1,62 @@
+import asyncio
+from asyncio import Future
+
+from prompt_toolkit.application.current import get_app
+from prompt_toolkit.layout.containers import HSplit
+from prompt_toolkit.layout.dimension import D
+from prompt_toolkit.widgets import Button, Dialog, Label, ProgressBar
+
+from constants import DIALOG_WIDTH
+from custom_types.ui_types import PopUpDialog
+from storage import FileOperation
+from utils import display_path
+
+# Seconds between redraws of the progress.
+REFRESH_INTERVAL = 0.1
+
+
+class ProgressDialog(PopUpDialog):
+    """Dialog following a move or delete running in the background, which it can cancel"""
+
+    def __init__(self, title: str, operation: FileOperation):
+        self.future = Future()
+        self.operation = operation
+
+        def cancel() -> None:
+            """Ask the operation to stop, the dialog closes once it has rolled back."""
+            operation.cancel()
+            self.label.text = "Cancelling..."
+
+        self.label = Label(text=display_path(operation.description))
+        self.progress_bar = ProgressBar()
+        self.progress_bar.percentage = 0
+        cancel_button = Button(text="Cancel", handler=cancel)
+
+        self.dialog = Dialog(
+            title=title,
+            body=HSplit([self.label, self.progress_bar]),
+            buttons=[cancel_button],
+            width=D(preferred=DIALOG_WIDTH),
+            modal=True,
+        )
+        asyncio.ensure_future(self._follow())
+
+    async def _follow(self) -> None:
+        """Redraw the progress until the operation is done, then close with its result."""
+        operation = asyncio.wrap_future(self.operation.future)
+        while not operation.done():
+            await asyncio.wait([operation], timeout=REFRESH_INTERVAL)
+            self.progress_bar.percentage = int(self.operation.progress * 100)
+            if self.operation.total and not self.operation.cancelled:
+                self.label.text = display_path(
+                    f"{self.operation.description}: "
+                    f"{self.operation.done} of {self.operation.total} files"
+                )
+            get_app().invalidate()
+        # The error is reported by whoever awaits the operation, retrieving it here keeps
+        # asyncio from logging it over the screen.
+        operation.exception()
+        self.future.set_result(None)
+
+    def __pt_container__(self):
+        return self.dialog
@@ -0,0 +1,114 @@
+import asyncio
+from asyncio import Future
+from typing import List, Optional
+
+from prompt_toolkit.application.current import get_app
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.filters import has_focus
+from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.key_binding.key_processor import KeyPressEvent
+from prompt_toolkit.layout.containers import HSplit
+from prompt_toolkit.layout.dimension import D
+from prompt_toolkit.widgets import Button, Dialog, Frame, Label, TextArea
+
+from constants import DIALOG_WIDTH, QUICK_OPEN_RESULTS
+from custom_types.ui_types import PopUpDialog
+from custom_types.virtual_list import VirtualList
+from storage.path_index import PathIndex, PathSearch
+from utils import display_path
+
+
+class QuickOpenDialog(PopUpDialog):
+    """Fuzzy finder over the paths of every note. Returns the chosen path, or None"""
+
+    def __init__(self, index: PathIndex):
+        self.future = Future()
+        self.index = index
+        self.search: Optional[PathSearch] = None
+        self.paths: List[str] = []
+
+        def open_path(index: int) -> None:
+            """Open the chosen note, unless the dialog was already closed (e.g. Enter, then a click)"""
+            if not self.future.done():
+                self.future.set_result(self.paths[index])
+
+        def accept(buf: Buffer) -> bool:
+            """Open the highlighted note"""
+            self.list.control.activate()
+            return True
+
+        def set_cancel() -> None:
+            """Cancel the dialog."""
+            if not self.future.done():
+                self.future.set_result(None)
+
+        self.text_area = TextArea(
+            multiline=False,
+            width=D(preferred=40),
+            accept_handler=accept,
+        )
+        self.text_area.buffer.on_text_changed += lambda buf: self.update()
+        self.list = VirtualList([], on_activate=open_path)
+        self.cancel_button = Button(text="Cancel", handler=set_cancel)
+
+        self.dialog = Dialog(
+            title="Quick Open",
+            body=HSplit(
+                [
+                    Label(text="Type part of a note's path:"),
+                    self.text_area,
+                    Frame(body=self.list, height=D(max=20)),
+                ],
+                key_bindings=self._setup_keybindings(),
+            ),
+            buttons=[self.cancel_button],
+            width=D(preferred=DIALOG_WIDTH),
+            modal=True,
+        )
+        self.update()
+
+    def update(self) -> None:
+        """Search for what's typed, and list the best matches found within a frame.
+
+        A search that takes longer goes on in the following iterations of the event loop,
+        unless the text changes in the meantime.
+        """
+        self.search = self.index.search(self.text_area.text, self.search)
+        self._run(self.search)
+
+    def _run(self, search: PathSearch) -> None:
+        """Run the search for a frame, show its results and schedule the rest."""
+        if search is not self.search or self.future.done():
+            return
+        done = search.run()
+        paths = search.results(QUICK_OPEN_RESULTS)
+        if paths != self.paths:
+            # Keep the highlight on the note it was moved to, if that's still listed.
+            control = self.list.control
+            selected = self.paths[control.selected] if control.selected else None
+            self.paths = paths
+            self.list.set_items([display_path(path) for path in paths])
+            if selected in paths:
+                control.select(paths.index(selected))
+            get_app().invalidate()
+        if not done:
+            asyncio.get_event_loop().call_soon(self._run, search)
+
+    def _setup_keybindings(self) -> KeyBindings:
+        """Arrow keys in the text field move the highlight in the list"""
+        bindings = KeyBindings()
+        typing = has_focus(self.text_area)
+        control = self.list.control
+
+        @bindings.add("up", filter=typing)
+        def up(event: KeyPressEvent) -> None:
+            control.select(control.selected - 1)
+
+        @bindings.add("down", filter=typing)
+        def down(event: KeyPressEvent) -> None:
+            control.select(control.selected + 1)
+
+        return bindings
+
+    def __pt_container__(self):
+        return self.dialog
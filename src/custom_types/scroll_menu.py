@@ -1,20 +1,43 @@
+import asyncio
 import functools
+import os
 from asyncio import Future
-from os import listdir
-from os.path import basename, dirname, isdir, isfile, join, realpath
+from os.path import basename, dirname, join, realpath
 from typing import List, Optional
 
 from prompt_toolkit.application.current import get_app
-from prompt_toolkit.layout import FormattedTextControl, ScrollablePane, Window
-from prompt_toolkit.layout.containers import HSplit, VSplit
+from prompt_toolkit.layout import FormattedTextControl, Window
+from prompt_toolkit.layout.containers import VSplit
 from prompt_toolkit.layout.dimension import D
-from prompt_toolkit.widgets import Button, Dialog, Frame, Label
-
-from constants import DIALOG_WIDTH, NOTES_DIR, PADDING_CHAR, PADDING_WIDTH
+from prompt_toolkit.widgets import Button, Dialog, Frame
+
+from constants import (
+    DIALOG_WIDTH,
+    NOTES_DIR,
+    PADDING_CHAR,
+    PADDING_WIDTH,
+    PREVIEW_CACHE_SIZE,
+    PREVIEW_LENGTH,
+)
 from custom_types.ui_types import PopUpDialog
+from custom_types.virtual_list import VirtualList
+from storage import NoteEntry, notes_index
 from utils import display_path
 
 
+@functools.lru_cache(maxsize=PREVIEW_CACHE_SIZE)
+def _read_preview(path: str, mtime_ns: int, size: int) -> str:
+    """Read the beginning of a file. Cached by mtime and size, so edited files are read again."""
+    with open(path, "r") as f:
+        return f.read(PREVIEW_LENGTH)
+
+
+def load_preview(path: str) -> str:
+    """Beginning of the file at path, for the scroll menu's preview."""
+    stat = os.stat(path)
+    return _read_preview(path, stat.st_mtime_ns, stat.st_size)
+
+
 class ScrollMenuDialog(PopUpDialog):
     """Scroll menu added to the info tab dialog box"""
 
@@ -48,18 +71,23 @@ class ScrollMenuDialog(PopUpDialog):
         )
         self.text = self.prepend_path(current_path, text)
 
+        self.show_files = show_files
+        self.directory = directory
+        self.entries = self._get_contents(directory, show_files=show_files)
+        self.list = VirtualList(
+            [self._entry_label(entry) for entry in self.entries],
+            on_activate=self._activate_entry,
+            on_select=self._select_entry,
+        )
+        self._preview_task: Optional[asyncio.Task] = None
+
         self.body = VSplit(
             children=[
-                Label(text=self.text, dont_extend_height=False),
-                Frame(
-                    body=ScrollablePane(
-                        HSplit(
-                            children=self._get_contents(
-                                directory, show_files=show_files
-                            )
-                        )
-                    ),
+                Window(
+                    content=FormattedTextControl(lambda: self.text),
+                    dont_extend_height=False,
                 ),
+                Frame(body=self.list),
             ],
             padding_char=PADDING_CHAR,
             padding=PADDING_WIDTH,
@@ -87,57 +115,87 @@ class ScrollMenuDialog(PopUpDialog):
             modal=True,
         )
 
-    def _get_contents(self, directory: str, show_files: bool = True) -> List[Frame]:
-        """Get file names and content previews from the given directory.
+    def _get_contents(self, directory: str, show_files: bool = True) -> List[NoteEntry]:
+        """Get the entries to list for the given directory.
 
         Args:
             directory (str): directory's name
             show_files (bool): Whether or not to show files in the scroll menu
 
         Returns:
-            List[Frame]: List of frames to add to the container
+            List[NoteEntry]: Entries to show in the list, in order
         """
-        frames = []
-        for file_name in listdir(directory):
+        entries = [
+            entry
+            for entry in notes_index.list_dir(directory)
             # Make sure that the file:
             # 1. Does not start with "."
             # 2a. If show_files, make sure it ends with '.txt' or '.md'
             # 2b. Otherwise, make sure it's a folder
-            if not file_name.startswith(".") and (
+            if not entry.name.startswith(".")
+            and (
                 (
                     show_files
-                    and (file_name.endswith(".txt") or file_name.endswith(".md"))
-                )
-                or isdir(join(directory, file_name))
-            ):
-                frames.append(
-                    Frame(
-                        Button(
-                            text=file_name,
-                            handler=functools.partial(
-                                self._display_content, file_name, directory, show_files
-                            ),
-                        )
-                    )
+                    and (entry.name.endswith(".txt") or entry.name.endswith(".md"))
                 )
+                or entry.is_dir
+            )
+        ]
 
-        # Add a move-up one directory button, except if in NOTES_DIR
+        # Add a move-up one directory entry, except if in NOTES_DIR
         if basename(realpath(directory)) != NOTES_DIR:
-            frames.insert(
-                0,
-                Frame(
-                    Button(
-                        text="../",
-                        handler=functools.partial(
-                            self._display_content, "..", directory, show_files
-                        ),
-                    )
-                ),
-            )
-        return frames
+            entries.insert(0, NoteEntry("..", True))
+        return entries
+
+    @staticmethod
+    def _entry_label(entry: NoteEntry) -> str:
+        """Text of an entry in the list. Folders end with a slash."""
+        return entry.name + "/" if entry.is_dir else entry.name
+
+    def _select_entry(self, index: int) -> None:
+        """Preview a note as soon as it's highlighted in the list"""
+        entry = self.entries[index]
+        if not entry.is_dir:
+            self.path = join(self.directory, entry.name)
+            self._show_preview(self.path)
+
+    def _show_preview(self, path: str) -> None:
+        """Show the beginning of the file at path in the left column.
+
+        The file is read in an executor. A preview still loading for a previously
+        selected file is cancelled, so moving through the list never waits on the disk.
+        """
+        self._cancel_preview()
+
+        async def coroutine() -> None:
+            loop = asyncio.get_event_loop()
+            try:
+                file_content = await loop.run_in_executor(None, load_preview, path)
+            except (OSError, UnicodeDecodeError) as e:
+                file_content = f"Unable to preview this file: {e}"
+            # Prepend the file_content to the body
+            self.text = self.prepend_path(path, file_content)
+            get_app().invalidate()
+
+        self._preview_task = asyncio.ensure_future(coroutine())
+
+    def _cancel_preview(self) -> None:
+        """Stop a preview still loading, so it doesn't replace what's shown since"""
+        if self._preview_task:
+            self._preview_task.cancel()
+            self._preview_task = None
+
+    def _activate_entry(self, index: int) -> None:
+        """Open the entry at index of the list"""
+        entry = self.entries[index]
+        self._display_content(entry.name, self.directory, entry.is_dir, self.show_files)
 
     def _display_content(
-        self, target_content: str, target_dir: str, show_files: bool = True
+        self,
+        target_content: str,
+        target_dir: str,
+        is_dir: bool,
+        show_files: bool = True,
     ) -> None:
         """Display content.
 
@@ -147,54 +205,28 @@ class ScrollMenuDialog(PopUpDialog):
         Args:
             target_content (str): Target's content
             target_dir (str): target's directory
+            is_dir (bool): Whether the target is a directory, as listed by the notes index
             show_files (bool): Whether or not to show files in the scroll menu
         """
         self.path = join(target_dir, target_content)
-        if isfile(self.path):
-            # open file's content
-            with open(join(target_dir, target_content), "r") as f:
-                # Read up to 1000th character.
-                file_content = f.read(1000)
-            self.path = join(target_dir, target_content)
-
-            # Remove any object that isn't HSplit
-            self.body.children = list(
-                filter(lambda x: type(x) == HSplit, self.body.children)
-            )
-            # Prepend the file_content to the body
-            self.text = self.prepend_path(self.path, file_content)
-            self.body.children.insert(
-                0, Window(content=FormattedTextControl(self.text))
-            )
+        if not is_dir:
+            self._show_preview(self.path)
             # Re-focus cursor to ok_button
             get_app().layout.focus(self.ok_button)
-        elif isdir(self.path):
+        else:
             if target_content == "..":
                 self.path = dirname(target_dir)
-            frames = self._get_contents(self.path, show_files=show_files)
-            # Assuming the last child is the scrolling menu
-            self.body.children.pop()
-            # Add a new updated menu
-            self.body.children.append(
-                HSplit(
-                    [
-                        ScrollablePane(
-                            content=HSplit(children=frames), keep_cursor_visible=True
-                        )
-                    ]
-                )
-            )
+            # A preview from the folder left would overwrite the new folder's header.
+            self._cancel_preview()
+            self.directory = self.path
+            # Only the list's rows are replaced, the list renders the visible ones on demand.
+            self.entries = self._get_contents(self.path, show_files=show_files)
+            self.list.set_items([self._entry_label(entry) for entry in self.entries])
 
             # Change the header (selected path)
-            self.body.children.pop(0)
             self.text = self.modify_header(self.path)
-            self.body.children.insert(
-                0, Window(content=FormattedTextControl(self.text))
-            )
-            # Re-focus the cursor back to the dialog
-            get_app().layout.focus(self.body)
-        else:
-            raise ValueError("The target content is neither a file nor directory")
+            # Re-focus the cursor back to the list
+            get_app().layout.focus(self.list)
 
     def prepend_path(self, path: str, text: str) -> str:
         """Adds the path onto the header text"""
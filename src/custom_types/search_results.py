@@ -0,0 +1,50 @@
+from asyncio import Future
+from typing import List, Union
+
+from prompt_toolkit.layout.containers import HSplit
+from prompt_toolkit.layout.dimension import D
+from prompt_toolkit.widgets import Button, Dialog, Frame, Label
+
+from constants import DIALOG_WIDTH
+from custom_types.ui_types import PopUpDialog
+from custom_types.virtual_list import VirtualList
+from storage.link_index import Backlink
+from storage.search_index import SearchHit
+from utils import display_path
+
+
+class SearchResultsDialog(PopUpDialog):
+    """List of places in notes, like search hits or backlinks. Returns the chosen one, or None"""
+
+    def __init__(self, title: str, label: str, hits: List[Union[SearchHit, Backlink]]):
+        self.future = Future()
+
+        def open_hit(index: int) -> None:
+            """Open the chosen note"""
+            self.future.set_result(hits[index])
+
+        def set_cancel() -> None:
+            """Cancel the dialog."""
+            self.future.set_result(None)
+
+        self.list = VirtualList(
+            [f"{display_path(hit.path)}: {hit.snippet}" for hit in hits],
+            on_activate=open_hit,
+        )
+        cancel_button = Button(text="Cancel", handler=set_cancel)
+
+        self.dialog = Dialog(
+            title=title,
+            body=HSplit(
+                [
+                    Label(text=label),
+                    Frame(body=self.list, height=D(max=20)),
+                ]
+            ),
+            buttons=[cancel_button],
+            width=D(preferred=DIALOG_WIDTH),
+            modal=True,
+        )
+
+    def __pt_container__(self):
+        return self.dialog
@@ -0,0 +1,191 @@
+from typing import Callable, List, Optional, Sequence
+
+from prompt_toolkit.application.current import get_app
+from prompt_toolkit.data_structures import Point
+from prompt_toolkit.formatted_text import StyleAndTextTuples
+from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.key_binding.key_processor import KeyPressEvent
+from prompt_toolkit.layout import ScrollbarMargin, Window
+from prompt_toolkit.layout.controls import UIContent, UIControl
+from prompt_toolkit.mouse_events import MouseEvent, MouseEventType
+
+
+class VirtualListControl(UIControl):
+    """UIControl showing one item per line.
+
+    The Window only asks for the lines it draws, so rendering costs the same
+    whether the list has ten items or a hundred thousand.
+    """
+
+    def __init__(
+        self,
+        items: Sequence[str],
+        on_activate: Callable[[int], None],
+        on_select: Optional[Callable[[int], None]] = None,
+    ):
+        """Initialize the list control
+
+        Args:
+            items (Sequence[str]): Text of every row
+            on_activate (Callable[[int], None]): Called with the row's index on Enter or click
+            on_select (Optional[Callable[[int], None]]): Called with the row's index when the
+                highlighted row changes
+        """
+        self.items: Sequence[str] = items
+        self.selected = 0
+        self.on_activate = on_activate
+        self.on_select = on_select
+        self.window: Optional[Window] = None
+        self._key_bindings = self._setup_keybindings()
+
+    def set_items(self, items: Sequence[str]) -> None:
+        """Replace the rows and move the highlight back to the top"""
+        self.items = items
+        self.selected = 0
+        if self.window:
+            self.window.vertical_scroll = 0
+
+    def select(self, index: int) -> None:
+        """Highlight the row at index"""
+        if not self.items:
+            return
+        index = max(0, min(index, len(self.items) - 1))
+        if index != self.selected:
+            self.selected = index
+            if self.on_select:
+                self.on_select(index)
+
+    def activate(self) -> None:
+        """Activate the highlighted row"""
+        if self.items:
+            self.on_activate(self.selected)
+
+    ############ UIControl ############
+    def is_focusable(self) -> bool:
+        """The list takes the focus, for its key bindings"""
+        return True
+
+    def preferred_width(self, max_available_width: int) -> Optional[int]:
+        """Take whatever width the container gives"""
+        return None
+
+    def preferred_height(
+        self,
+        width: int,
+        max_available_height: int,
+        wrap_lines: bool,
+        get_line_prefix: Optional[Callable],
+    ) -> Optional[int]:
+        """One line per item"""
+        return len(self.items)
+
+    def create_content(self, width: int, height: int) -> UIContent:
+        """Content whose lines are only built when the Window draws them"""
+        items = self.items
+        selected = self.selected
+        focused = get_app().layout.has_focus(self)
+
+        def get_line(i: int) -> StyleAndTextTuples:
+            if i == selected:
+                style = "class:virtual-list.selected"
+                if focused:
+                    style += " reverse"
+                return [(style, f" {items[i]} ")]
+            return [("class:virtual-list", f" {items[i]} ")]
+
+        return UIContent(
+            get_line=get_line,
+            line_count=len(items),
+            cursor_position=Point(0, selected),
+            show_cursor=False,
+        )
+
+    def mouse_handler(self, mouse_event: MouseEvent) -> Optional[object]:
+        """Click activates a row, the scroll wheel moves the highlight"""
+        if mouse_event.event_type == MouseEventType.MOUSE_UP:
+            get_app().layout.focus(self)
+            self.select(mouse_event.position.y)
+            self.activate()
+            return None
+        if mouse_event.event_type == MouseEventType.SCROLL_DOWN:
+            self.select(self.selected + 1)
+            return None
+        if mouse_event.event_type == MouseEventType.SCROLL_UP:
+            self.select(self.selected - 1)
+            return None
+        return NotImplemented
+
+    def get_key_bindings(self) -> KeyBindings:
+        """Key bindings active while the list has the focus"""
+        return self._key_bindings
+
+    def _page_size(self) -> int:
+        """Number of rows currently on screen"""
+        if self.window and self.window.render_info:
+            return max(1, self.window.render_info.window_height)
+        return 10
+
+    def _setup_keybindings(self) -> KeyBindings:
+        """Arrow keys move the highlight, Enter and Space activate it"""
+        bindings = KeyBindings()
+
+        @bindings.add("up")
+        def up(event: KeyPressEvent) -> None:
+            self.select(self.selected - 1)
+
+        @bindings.add("down")
+        def down(event: KeyPressEvent) -> None:
+            self.select(self.selected + 1)
+
+        @bindings.add("pageup")
+        def page_up(event: KeyPressEvent) -> None:
+            self.select(self.selected - self._page_size())
+
+        @bindings.add("pagedown")
+        def page_down(event: KeyPressEvent) -> None:
+            self.select(self.selected + self._page_size())
+
+        @bindings.add("home")
+        def first(event: KeyPressEvent) -> None:
+            self.select(0)
+
+        @bindings.add("end")
+        def last(event: KeyPressEvent) -> None:
+            self.select(len(self.items) - 1)
+
+        @bindings.add("enter")
+        @bindings.add(" ")
+        def activate(event: KeyPressEvent) -> None:
+            self.activate()
+
+        return bindings
+
+
+class VirtualList:
+    """Scrollable, virtualized list of items with keyboard and mouse navigation"""
+
+    def __init__(
+        self,
+        items: Sequence[str],
+        on_activate: Callable[[int], None],
+        on_select: Optional[Callable[[int], None]] = None,
+    ):
+        self.control = VirtualListControl(items, on_activate, on_select)
+        self.window = Window(
+            self.control,
+            right_margins=[ScrollbarMargin(display_arrows=True)],
+            style="class:virtual-list",
+        )
+        self.control.window = self.window
+
+    @property
+    def items(self) -> Sequence[str]:
+        """Text of every row"""
+        return self.control.items
+
+    def set_items(self, items: List[str]) -> None:
+        """Replace the rows of the list"""
+        self.control.set_items(items)
+
+    def __pt_container__(self):
+        return self.window
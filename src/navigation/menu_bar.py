@@ -1,34 +1,59 @@
+import asyncio
 import datetime
-import json
 import os
-import shutil
-import webbrowser
 from asyncio import ensure_future
-from typing import Optional, Union
+from typing import List, Optional, Tuple, Union
 
-from emoji import emojize
 from prompt_toolkit.application.current import get_app
+from prompt_toolkit.document import Document
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.key_binding.key_processor import KeyPressEvent
 from prompt_toolkit.layout.containers import Float
 from prompt_toolkit.layout.menus import CompletionsMenu
 from prompt_toolkit.search import start_search
-from prompt_toolkit.shortcuts import set_title
-from prompt_toolkit.styles import Style
 from prompt_toolkit.widgets import MenuContainer, MenuItem
 
-from constants import DIALOG_WIDTH, NOTES_DIR, USER_SETTINGS_DIR
+from application.edit_tracker import combine_edits, shift_position
+from application.lazy_loader import LazyFileLoader, UnreadBytes
+from application.open_notes import OpenNote
+from application.piece_table import TextEdit
+from application.state import NoteStatus
+from application.style_manager import style_manager
+from constants import (
+    DEFAULT_STYLE,
+    DIALOG_WIDTH,
+    LARGE_FILE_THRESHOLD,
+    NOTES_DIR,
+    PROGRESS_DIALOG_DELAY,
+    SESSION_UNDO_CHARS,
+    SESSION_UNDO_STEPS,
+)
 from custom_types import (
     ColorPicker,
     ConfirmDialog,
     MessageDialog,
     PopUpDialog,
+    ProgressDialog,
+    QuickOpenDialog,
     SaveExitDialog,
     ScrollMenuColorDialog,
     ScrollMenuDialog,
+    SearchResultsDialog,
     TextInputDialog,
 )
-from utils import display_path, get_unique_filename
+from storage import (
+    FileChange,
+    FileOperation,
+    NoteSession,
+    note_sessions,
+    notes_index,
+    path_index,
+    text_hash,
+    text_index,
+)
+from storage.link_index import link_at
+from storage.notes_database import is_note
+from utils import display_path, get_unique_filename, read_note
 
 
 class MenuNav:
@@ -51,14 +76,17 @@ class MenuNav:
                     children=[
                         MenuItem("New Note", handler=self.do_new_file),
                         MenuItem("Open Note", handler=self.do_scroll_menu),
+                        MenuItem("Quick Open...", handler=self.do_quick_open),
                         MenuItem("Save", handler=self.do_save_file),
                         MenuItem("Save as...", handler=self.do_save_as_file),
+                        MenuItem("Autosave", handler=self.do_autosave),
                         MenuItem("-", disabled=True),
                         MenuItem("New Folder", handler=self.do_new_folder),
                         MenuItem("-", disabled=True),
                         MenuItem("Move...", handler=self.do_move_item),
                         MenuItem("Rename...", handler=self.do_rename_item),
                         MenuItem("Delete...", handler=self.do_delete_item),
+                        MenuItem("Restore Deleted Item", handler=self.do_restore_item),
                         MenuItem("-", disabled=True),
                         MenuItem("Exit", handler=self.do_exit),
                     ],
@@ -74,6 +102,7 @@ class MenuNav:
                         MenuItem("-", disabled=True),
                         MenuItem("Find", handler=self.do_find),
                         MenuItem("Find next", handler=self.do_find_next),
+                        MenuItem("Search all notes", handler=self.do_search_notes),
                         MenuItem("Select All", handler=self.do_select_all),
                         MenuItem("Time/Date", handler=self.do_time_date),
                         MenuItem("Text To Emoji", handler=self.do_convert_to_emoji),
@@ -84,10 +113,12 @@ class MenuNav:
                     children=[
                         MenuItem("Status Bar", handler=self.do_status_bar),
                         MenuItem("Open Link", handler=self.do_open_link),
+                        MenuItem("Backlinks", handler=self.do_backlinks),
                         MenuItem("Color Settings", handler=self.do_color_scroll),
                         MenuItem(
                             "Reset to default styles", handler=self.do_reset_styles
                         ),
+                        MenuItem("Render Stats", handler=self.do_render_stats),
                     ],
                 ),
                 MenuItem(
@@ -109,12 +140,16 @@ class MenuNav:
         )
 
     ############ HANDLERS FOR MENU ITEMS ############
-    def do_save_file(self) -> None:
-        """Try to save. If no file is being edited, save as instead to create a new one."""
+    def do_save_file(self) -> Optional[asyncio.Future]:
+        """Try to save. If no file is being edited, save as instead to create a new one.
+
+        Returns the future of the background save, if one was started.
+        """
         if path := self.application_state.current_path:
-            self._save_file_at_path(path, self.text_field.text)
-        else:
-            self.do_save_as_file()
+            return self._save_file_at_path(
+                path, self.text_field.text, tail=self._unread()
+            )
+        self.do_save_as_file()
 
     def do_save_as_file(self) -> None:
         """Try to Save As a file under a new name/path."""
@@ -125,10 +160,7 @@ class MenuNav:
 
             If the path entered is a valid file name, save the current note at that path.
             """
-            has_folders = any(
-                os.path.isdir(os.path.join(NOTES_DIR, f)) for f in os.listdir(NOTES_DIR)
-            )
-            if has_folders:
+            if notes_index.has_subdirs(NOTES_DIR):
                 dialog = ScrollMenuDialog(
                     title="Save As",
                     text="Choose the location of the file.",
@@ -173,7 +205,7 @@ class MenuNav:
                     if not override:
                         return
 
-                self._save_file_at_path(path, self.text_field.text)
+                self._save_file_at_path(path, self.text_field.text, tail=self._unread())
             else:
                 self.show_message("Invalid Name", "Please enter a valid file name.")
 
@@ -193,11 +225,7 @@ class MenuNav:
             # Only add to text_editor if the given file is text file or markdown file.
             if path:
                 if os.path.splitext(path)[1] in (".txt", ".md"):
-                    self.application_state.current_path = path
-                    with open(path, "r") as f:
-                        self.text_field.text = f.read()
-
-                    set_title(f"ThoughtBox - {display_path(path)}")
+                    self._switch_to_note(path)
                 else:
                     # Else show a popup message revealing the error message
                     self.show_message(
@@ -207,6 +235,22 @@ class MenuNav:
 
         ensure_future(coroutine(self))
 
+    def do_quick_open(self) -> None:
+        """Find a note by typing part of its path, and open it"""
+
+        async def coroutine(self: MenuNav) -> None:
+            dialog = QuickOpenDialog(path_index)
+            # Notes found after the dialog opened, like while the index is first built.
+            ready = asyncio.wrap_future(path_index.ready())
+            ready.add_done_callback(lambda future: dialog.update())
+            path = await self.show_dialog_as_float(dialog)
+            if path and path != os.path.normpath(
+                self.application_state.current_path or ""
+            ):
+                self._switch_to_note(path)
+
+        ensure_future(coroutine(self))
+
     def do_about(self) -> None:
         """About from menu select"""
         self.show_message(
@@ -219,9 +263,10 @@ class MenuNav:
 
     def do_new_file(self) -> None:
         """Make a new file"""
-        self.text_field.text = ""
+        self._save_session()
+        self._stash_note()
+        self._replace_text("")
         self.application_state.current_path = None
-        set_title("ThoughtBox - Untitled")
 
     def do_move_item(self) -> None:
         """Move a folder or file to a different directory."""
@@ -259,19 +304,29 @@ class MenuNav:
                     text=f"{os.path.basename(item_path)} already exists at that location.",
                 )
 
+            operation = self.file_operations.move(item_path, move_path)
             try:
-                shutil.move(item_path, move_path)
-            except OSError:
+                moved = await self._wait_for_operation("Move Item", operation)
+            except OSError as e:
                 self.show_message(
                     title="Move Item",
-                    text="Unable to move item to that location.",
+                    text=f"Unable to move item to that location.\n{e}",
                 )
             else:
+                if not moved:
+                    return self.show_message(
+                        title="Move Item", text="The move was cancelled."
+                    )
+                self._tree_changed(item_path, move_path)
+                new_path = os.path.join(move_path, os.path.basename(item_path))
+                text_index.move(item_path, new_path)
+                path_index.move(item_path, new_path)
+                self.open_notes.move(item_path, new_path)
+                note_sessions.move(item_path, new_path)
                 if (
                     current_path := self.application_state.current_path
                 ) and current_path.startswith(item_path):
-                    set_title(f"ThoughtBox - {display_path(current_path)} (Moved)")
-                    self.application_state.current_path = None
+                    self.application_state.mark_removed("Moved")
                 self.show_message(
                     title="Move Item",
                     text=f"Item successfully moved to {move_path}.",
@@ -283,10 +338,7 @@ class MenuNav:
         """Creates a folder"""
 
         async def coroutine(self: MenuNav) -> None:
-            has_folders = any(
-                os.path.isdir(os.path.join(NOTES_DIR, f)) for f in os.listdir(NOTES_DIR)
-            )
-            if has_folders:
+            if notes_index.has_subdirs(NOTES_DIR):
                 dialog = ScrollMenuDialog(
                     title="New Folder",
                     text="Choose the location of the new folder.",
@@ -325,6 +377,7 @@ class MenuNav:
 
                 try:
                     os.mkdir(os.path.join(path, folder_name))
+                    self._tree_changed(os.path.join(path, folder_name))
                 except OSError:
                     self.show_message(
                         title="New Folder",
@@ -395,6 +448,11 @@ class MenuNav:
 
                 try:
                     os.rename(path, new_path)
+                    self._tree_changed(path, new_path)
+                    text_index.move(path, new_path)
+                    path_index.move(path, new_path)
+                    self.open_notes.move(path, new_path)
+                    note_sessions.move(path, new_path)
                 except OSError:
                     self.show_message(
                         title="Rename Item",
@@ -404,8 +462,7 @@ class MenuNav:
                     if (
                         current_path := self.application_state.current_path
                     ) and current_path.startswith(path):
-                        set_title(f"ThoughtBox - {display_path(current_path)} (Moved)")
-                        self.application_state.current_path = None
+                        self.application_state.mark_removed("Moved")
                     self.show_message(
                         title="Rename Item",
                         text=f"{path} was successfully renamed to {new_path}.",
@@ -453,35 +510,62 @@ class MenuNav:
             confirm_delete = await self.show_dialog_as_float(dialog)
 
             if confirm_delete:
+                # Deleted items go to the trash, see do_restore_item.
+                operation = self.file_operations.delete(path)
                 try:
-                    if os.path.isdir(path):
-                        shutil.rmtree(path)
-                    elif os.path.isfile(path):
-                        os.remove(path)
-                    else:
-                        raise ValueError(
-                            "Selected path is neither a file nor directory."
-                        )
-                except OSError:
+                    deleted = await self._wait_for_operation("Delete Item", operation)
+                except OSError as e:
                     self.show_message(
                         title="Delete Folder",
-                        text="Failed to delete the folder.",
+                        text=f"Failed to delete the folder.\n{e}",
                     )
                 else:
+                    if not deleted:
+                        return self.show_message(
+                            title="Delete Item", text="The delete was cancelled."
+                        )
+                    self._tree_changed(path)
+                    text_index.remove(path)
+                    path_index.remove(path)
+                    self.open_notes.remove(path)
                     if (
                         current_path := self.application_state.current_path
                     ) and current_path.startswith(path):
-                        set_title(
-                            f"ThoughtBox - {display_path(current_path)} (Deleted)"
-                        )
-                        self.application_state.current_path = None
+                        self.application_state.mark_removed("Deleted")
                     self.show_message(
                         title="Delete Folder",
-                        text=f"{path} was successfully deleted.",
+                        text=f"{path} was successfully deleted.\n"
+                        "Use File > Restore Deleted Item to bring it back.",
                     )
 
         ensure_future(coroutine(self))
 
+    def do_restore_item(self) -> None:
+        """Put the most recently deleted folder/note back where it was"""
+
+        async def coroutine(self: MenuNav) -> None:
+            try:
+                operation, path = self.file_operations.restore()
+                if path is None:
+                    return self.show_message(
+                        title="Restore Deleted Item", text="Nothing to restore."
+                    )
+                restored = await self._wait_for_operation(
+                    "Restore Deleted Item", operation
+                )
+            except OSError as e:
+                return self.show_message(
+                    title="Restore Deleted Item", text=f"Unable to restore: {e}"
+                )
+            if restored:
+                self._tree_changed(path)
+                text_index.refresh(path_index.refresh())
+                self.show_message(
+                    title="Restore Deleted Item", text=f"{path} was restored."
+                )
+
+        ensure_future(coroutine(self))
+
     def do_exit(self) -> None:
         """Exit app, with warning if current file unsaved"""
 
@@ -498,9 +582,9 @@ class MenuNav:
                         "contains unsaved changes. Save before exit?",
                     )
                 )
-                with open(self.application_state.current_path) as f:
-                    written = f.read()
-                unsaved_changes = written != self.text_field.text
+                unsaved_changes = self.application_state.is_modified(
+                    self.text_field.text
+                )
             # If file not previously saved, warn if contains any text
             else:
                 text = "This file has not yet been saved. Save before exit?"
@@ -513,23 +597,45 @@ class MenuNav:
             if choice != "cancel":
                 if choice == "save":
                     # If not yet saved, generate generic name to save to
+                    previous_path = self.application_state.current_path
+                    reserved = None
                     if not current_path_valid:
-                        self.application_state.current_path = os.path.join(
+                        reserved = os.path.join(
                             NOTES_DIR, get_unique_filename(NOTES_DIR)
                         )
-                    self.do_save_file()
+                        self.application_state.current_path = reserved
+                    saved = False
+                    try:
+                        await self.do_save_file()
+                        saved = True
+                    except OSError:
+                        # The error is shown to the user, don't lose the note by exiting.
+                        return
+                    finally:
+                        if reserved and not saved:
+                            # Don't leave an empty untitled note behind.
+                            notes_index.discard_untitled_note(reserved)
+                            self.application_state.current_path = previous_path
+                # The other notes kept in memory are saved without asking, like when they are evicted.
+                saves = [
+                    self._save_kept_note(note)
+                    for note in self.open_notes
+                    if note.status.is_modified(note.document.text)
+                ]
+                try:
+                    await asyncio.gather(*saves)
+                except OSError:
+                    return
+                self.autosaver.cancel()
+                self.watcher.stop()
+                self.render_stats.close()
                 # Exit
-                settings_path = os.path.join(NOTES_DIR, ".user_setting.json")
-                with open(settings_path, "r") as f:
-                    user = json.load(f)
-
-                self.application_state.user_settings[
-                    "last_path"
-                ] = self.application_state.current_path
-
-                user["last_path"] = self.application_state.current_path
-                with open(settings_path, "w") as f:
-                    json.dump(user, f)
+                self.application_state.user_settings.set(
+                    "last_path", self.application_state.current_path
+                )
+                self.application_state.user_settings.flush()
+                self._save_session()
+                note_sessions.flush()
 
                 get_app().exit()
 
@@ -584,11 +690,7 @@ class MenuNav:
                 await self.show_dialog_as_float(color_input_dialog)
 
                 # just loads any style back if any change were saved it will keep them loaded
-                with open(USER_SETTINGS_DIR, "r") as user_file:
-                    user_settings = json.load(user_file)
-
-                style_dict = user_settings["style"]
-                get_app().style = Style.from_dict(style_dict)
+                style_manager.set_base(self.application_state.user_settings["style"])
 
             else:
                 # else canceled
@@ -608,18 +710,17 @@ class MenuNav:
             if not confirm:
                 return
 
-            self.application_state._load_settings(reset_style=True)
+            self.application_state.user_settings.set("style", DEFAULT_STYLE)
             self.show_message(
                 title="Reset Styles", text="Successfully reset color settings."
             )
-            with open(USER_SETTINGS_DIR, "r") as f:
-                styles = json.load(f)["style"]
-            get_app().style = Style.from_dict(styles)
+            style_manager.set_base(DEFAULT_STYLE)
 
         ensure_future(coroutine(self))
 
     def do_find(self) -> None:
         """Find"""
+        self._finish_loading()
         start_search(self.text_field.control)
 
     def do_find_next(self) -> None:
@@ -631,47 +732,134 @@ class MenuNav:
         )
         self.text_field.buffer.cursor_position = cursor_position
 
+    def do_search_notes(self) -> None:
+        """Search the text of every note"""
+
+        async def coroutine(self: MenuNav) -> None:
+            dialog = TextInputDialog(
+                title="Search All Notes", label_text="Enter the words to search for:"
+            )
+            query = await self.show_dialog_as_float(dialog)
+            if not query or query.isspace():
+                return
+
+            hits = await asyncio.wrap_future(text_index.search(query))
+            if not hits:
+                return self.show_message(
+                    title="Search All Notes", text=f"No notes contain '{query}'."
+                )
+            label = f"{len(hits)} notes match '{query}':"
+            count = await asyncio.wrap_future(text_index.count(query))
+            if count > len(hits):
+                label = f"{count} notes match '{query}', the best {len(hits)}:"
+
+            dialog = SearchResultsDialog(
+                title="Search All Notes", label=label, hits=hits
+            )
+            hit = await self.show_dialog_as_float(dialog)
+            if hit:
+                position = await asyncio.wrap_future(text_index.locate(hit.path, query))
+                if self._switch_to_note(hit.path):
+                    self._move_cursor(position)
+
+        ensure_future(coroutine(self))
+
     def do_paste(self) -> None:
         """Paste"""
         self.text_field.buffer.paste_clipboard_data(get_app().clipboard.get_data())
 
     def do_select_all(self) -> None:
         """Select all"""
+        self._finish_loading()
         self.text_field.buffer.cursor_position = 0
         self.text_field.buffer.start_selection()
         self.text_field.buffer.cursor_position = len(self.text_field.buffer.text)
 
+    def do_autosave(self) -> None:
+        """Toggles saving the note automatically after each pause in typing"""
+        self.application_state.autosave = not self.application_state.autosave
+        if not self.application_state.autosave:
+            self.autosaver.cancel()
+        self.show_message(
+            "Autosave",
+            "Autosave is {}.".format(
+                "on" if self.application_state.autosave else "off"
+            ),
+        )
+
     def do_status_bar(self) -> None:
         """Toggles status bar"""
         self.application_state.show_status_bar = (
             not self.application_state.show_status_bar
         )
 
-    def do_convert_to_emoji(self) -> None:
-        """Convert all ascii emoji to unicode emoji"""
-        # save cursor position
-        c_pos = (
-            self.text_field.document.cursor_position_row,
-            self.text_field.document.cursor_position_col,
-        )
-
-        self.text_field.text = emojize(
-            self.text_field.text, use_aliases=True, variant="emoji_type"
-        )
+    def do_render_stats(self) -> None:
+        """Toggles the render stats overlay, and logging every frame"""
+        self.render_stats.toggle()
 
-        # Move cursor back to saved position
-        if c_pos[0] > 0:
-            # Only works if multi-line
-            self.text_field.buffer.cursor_down(c_pos[0])
-        self.text_field.buffer.cursor_right(c_pos[1])
+    def do_convert_to_emoji(self) -> None:
+        """Convert ascii emoji to unicode emoji.
+
+        Converts the selection if there is one, otherwise everything edited since the last conversion.
+        """
+        buffer = self.text_field.buffer
+        text = buffer.text
+        selection = None
+        if buffer.selection_state:
+            selection = buffer.document.selection_range()
+            buffer.exit_selection()
+
+        if edits := self.emoji_converter.edits(text, selection):
+            edit = combine_edits(text, edits)
+            # Make the conversion a single step of the undo history.
+            self.undo_history.save()
+            self.edit_tracker.expect(edit)
+            buffer.document = Document(
+                text[: edit.start] + edit.inserted + text[edit.end :],
+                shift_position(buffer.cursor_position, edits),
+            )
+        if selection is None:
+            self.emoji_converter.converted()
 
     def do_open_link(self) -> None:
         """Validate whether link is internal or external and open the link to the browser (or in the app)"""
-        if word := self.text_field.document.get_word_under_cursor(WORD=True):
+        row, column = self.line_tracker.row_col(self.text_field.buffer.cursor_position)
+        if name := link_at(self.text_field.document.lines[row], column):
+            # [[Note Name]] links to another note.
+            self._open_wiki_link(name)
+        elif word := self.text_field.document.get_word_under_cursor(WORD=True):
             # Validate url (whether internal or external)
             # Then open in new tab
+            import webbrowser
+
             webbrowser.open_new_tab(word)
 
+    def do_backlinks(self) -> None:
+        """List the notes linking to the open note, and open the chosen one at the link"""
+
+        async def coroutine(self: MenuNav) -> None:
+            path = self.application_state.current_path
+            if not path:
+                return self.show_message(
+                    title="Backlinks", text="Save the note to see what links to it."
+                )
+            links = await asyncio.wrap_future(text_index.backlinks(path))
+            if not links:
+                return self.show_message(
+                    title="Backlinks", text=f"No notes link to {display_path(path)}."
+                )
+            dialog = SearchResultsDialog(
+                title="Backlinks",
+                label=f"{len(links)} links to {display_path(path)}:",
+                hits=links,
+            )
+            link = await self.show_dialog_as_float(dialog)
+            if link:
+                if self._switch_to_note(link.path):
+                    self._move_cursor(link.position)
+
+        ensure_future(coroutine(self))
+
     def do_show_shortcuts(self) -> None:
         """Open a popup to show the shortcuts"""
         self.show_message(
@@ -682,6 +870,7 @@ class MenuNav:
                 "CTRL+N: Start a new file\n"
                 "CTRL+S: Save current file\n"
                 "CTRL+O: Open an existing note\n"
+                "CTRL+P: Quick open a note by its path\n"
                 "CTRL+Q: Exit the application\n"
                 "CTRL+A: Select All\n"
                 "CTRL+Z: Undo\n"
@@ -692,16 +881,356 @@ class MenuNav:
         )
 
     ############ HELPER FUNCTIONS #############
-    def _save_file_at_path(self, path: str, text: str) -> None:
-        """Saves text (changes) to a file path"""
-        try:
-            with open(path, "w", encoding="utf8") as f:
-                f.write(text)
-        except IOError as e:
-            self.show_message("Error", "{}".format(e))
-        else:
-            set_title(f"ThoughtBox - {display_path(path)}")
+    def _switch_to_note(self, path: str) -> bool:
+        """Open the note at path in the editor, where the user left it.
+
+        The note in the editor is kept in memory. If the note at path still is, it's
+        shown without reading it from disk again. The note at path is read before leaving
+        the one in the editor, which stays as it was if it can't be.
+        Returns whether the note was opened.
+        """
+        if note := self.open_notes.pop(path):
+            self._save_session()
+            self._stash_note()
             self.application_state.current_path = path
+            self._show_note(note)
+            return True
+        try:
+            text, loader = self._read_note(path)
+        except (OSError, UnicodeDecodeError) as e:
+            self.show_message("Error", f"{display_path(path)} can't be opened.\n{e}")
+            return False
+        self._save_session()
+        self._stash_note()
+        self.application_state.current_path = path
+        self._show_text(text, loader)
+        self._restore_session(path)
+        return True
+
+    def _read_note(self, path: str) -> Tuple[str, Optional[LazyFileLoader]]:
+        """Decode a note, or only the start of a large one with the loader of the rest.
+
+        Raises OSError or UnicodeDecodeError if it can't be read.
+        """
+        if os.path.getsize(path) <= LARGE_FILE_THRESHOLD:
+            return read_note(path), None
+        loader = LazyFileLoader(path)
+        try:
+            return loader.read_chunk(), loader
+        except BaseException:
+            loader.close()
+            raise
+
+    def _open_note(self, path: str) -> None:
+        """Load a note into the text field, leaving it as it was if the note can't be read.
+
+        Large notes are memory-mapped and only decoded up to the visible window.
+        The rest is appended as the user scrolls (see ThoughtBox.load_visible_window).
+        """
+        self._show_text(*self._read_note(path))
+
+    def _show_text(self, text: str, loader: Optional[LazyFileLoader]) -> None:
+        """Put a note read by _read_note in the text field"""
+        self._close_loader()
+        self.lazy_loader = loader
+        self._replace_text(text)
+
+    def _stash_note(self) -> None:
+        """Keep the note in the editor in memory, saving and dropping the least recently used ones"""
+        path = self.application_state.current_path
+        if not path:
+            self._close_loader()
+            return
+        note = OpenNote(
+            path,
+            self.text_field.document,
+            self.undo_history.detach(),
+            self.application_state.note,
+            self.lazy_loader,
+            self.text_field.window.vertical_scroll,
+        )
+        # The kept note owns the loader now.
+        self.lazy_loader = None
+        for evicted in self.open_notes.put(note):
+            if evicted.status.is_modified(evicted.document.text):
+                self._save_kept_note(evicted)
+            evicted.close()
+
+    def _show_note(self, note: OpenNote) -> None:
+        """Put a note kept in memory back in the editor, as it was left"""
+        self.loading_note = True
+        try:
+            self.undo_history.switch(note.document, note.history)
+        finally:
+            self.loading_note = False
+        # Switching isn't an edit, the note's shortcodes were converted or left as they were.
+        self.emoji_converter.converted()
+        self.lazy_loader = note.lazy_loader
+        self.application_state.note = note.status
+        self.autosaver.cancel()
+        self.text_field.window.vertical_scroll = note.vertical_scroll
+
+    def _save_session(self) -> None:
+        """Remember the cursor, scroll position and undo history of the open note.
+
+        The undo history is only kept for fully loaded notes, the others would have to be decoded to diff them.
+        """
+        path = self.application_state.current_path
+        if not path:
+            return
+        undo = []
+        if not self.lazy_loader:
+            undo = self.undo_history.export(SESSION_UNDO_STEPS, SESSION_UNDO_CHARS)
+        session = NoteSession(
+            self.text_field.buffer.cursor_position,
+            self.text_field.window.vertical_scroll,
+            text_hash(self.text_field.text) if undo else "",
+            undo,
+        )
+        note_sessions.save(path, session)
+
+    def _restore_session(self, path: str) -> None:
+        """Put the cursor, scroll position and undo history of the note at path back where they were"""
+        session = note_sessions.load(path)
+        if session is None:
+            return
+        # Decode a large note up to the cursor, not further.
+        while self.lazy_loader and len(self.text_field.text) < session.cursor_position:
+            self._load_more()
+        # The history only applies to the text it was saved with, the note may have changed since.
+        text = self.text_field.text
+        if (
+            session.undo
+            and not self.lazy_loader
+            and session.text_hash == text_hash(text)
+        ):
+            self.undo_history.load(session.undo)
+        self.text_field.buffer.cursor_position = min(session.cursor_position, len(text))
+        self.text_field.window.vertical_scroll = session.vertical_scroll
+
+    def _move_cursor(self, position: int) -> None:
+        """Put the cursor at position in the open note, decoding a large note up to there"""
+        while self.lazy_loader and len(self.text_field.text) < position:
+            self._load_more()
+        if 0 <= position <= len(self.text_field.text):
+            self.text_field.buffer.cursor_position = position
+
+    def _replace_text(self, text: str) -> None:
+        """Replace the whole text of the editor, starting a fresh undo history"""
+        self.edit_tracker.expect(TextEdit(0, self.text_field.text, text))
+        self.loading_note = True
+        try:
+            self.text_field.text = text
+        finally:
+            self.loading_note = False
+        # Shortcodes in a note loaded from disk are the user's to convert, by selecting them.
+        self.emoji_converter.converted()
+        self.undo_history.reset()
+        self.autosaver.cancel()
+        self.application_state.note = NoteStatus()
+        self.application_state.mark_saved(None if self.lazy_loader else text)
+
+    def _append_lazy_chunk(self, chunk: str) -> None:
+        """Append a decoded chunk of a large note without touching the cursor or the undo history"""
+        if self.lazy_loader.exhausted:
+            self.lazy_loader = None
+        if chunk:
+            # The chunk was on disk already, it isn't an edit for the emoji converter either.
+            changed = self.emoji_converter.changed
+            self.loading_note = True
+            try:
+                self.undo_history.extend(chunk)
+            finally:
+                self.loading_note = False
+                self.emoji_converter.changed = changed
+
+    def _load_more(self, everything: bool = False) -> bool:
+        """Decode the next chunk of a lazily loaded note, or all of the rest.
+
+        If the rest can't be read, like when it isn't valid UTF-8, the note is detached
+        from its file, so that saving it can't overwrite what wasn't loaded.
+        Returns whether the chunk was read.
+        """
+        try:
+            if everything:
+                chunk = self.lazy_loader.read_all()
+            else:
+                chunk = self.lazy_loader.read_chunk()
+        except (OSError, UnicodeDecodeError) as e:
+            self.lazy_loader = None
+            path = self.application_state.current_path
+            self.application_state.current_path = None
+            self.show_message(
+                "Error",
+                f"The rest of {display_path(path)} can't be read, so it won't be "
+                f"saved over.\n{e}",
+            )
+            return False
+        self._append_lazy_chunk(chunk)
+        return True
+
+    def _finish_loading(self) -> bool:
+        """Decode the rest of a lazily loaded note, for actions that need the whole text.
+
+        Returns False if it couldn't be read, see _load_more.
+        """
+        if self.lazy_loader:
+            return self._load_more(everything=True)
+        return True
+
+    def _save_kept_note(self, note: OpenNote) -> asyncio.Future:
+        """Save a note kept in memory"""
+        tail = note.lazy_loader.unread() if note.lazy_loader else None
+        return self._save_file_at_path(note.path, note.document.text, note.status, tail)
+
+    def _unread(self) -> Optional[UnreadBytes]:
+        """The part of the open note not decoded yet, to save it without decoding it"""
+        return self.lazy_loader.unread() if self.lazy_loader else None
+
+    def _close_loader(self) -> None:
+        """Drop the lazy loader of the previously opened note"""
+        if self.lazy_loader:
+            self.lazy_loader.close()
+            self.lazy_loader = None
+
+    def _save_file_at_path(
+        self,
+        path: str,
+        text: str,
+        status: Optional[NoteStatus] = None,
+        tail: Optional[UnreadBytes] = None,
+    ) -> asyncio.Future:
+        """Saves text (changes) to a file path
+
+        The file is written atomically on a background thread. The returned future
+        resolves once the note is on disk.
+        Pass the status of the note if it isn't the one in the editor, and the part of a
+        lazily loaded note that wasn't decoded as tail, which is copied as it is.
+        """
+        status = status or self.application_state.note
+        change_count = status.change_count
+        future = asyncio.wrap_future(self.file_writer.write(path, text, tail))
+        # Without the tail, the whole text isn't known here.
+        saved_text = None if tail else text
+
+        def saved(future: asyncio.Future) -> None:
+            """Report errors, and update the state if the note is still open"""
+            if e := future.exception():
+                self.show_message("Error", "{}".format(e))
+                return
+            self._tree_changed(path)
+            text_index.update(path, saved_text)
+            path_index.update(path)
+            status.mark_saved(saved_text, change_count)
+            status.mark_written(future.result())
+            status.removed = None
+            if status is self.application_state.note:
+                self.application_state.current_path = path
+
+        future.add_done_callback(saved)
+        return future
+
+    def _autosave(self) -> None:
+        """Save the open note in the background if it has unsaved changes"""
+        if (
+            self.application_state.autosave
+            and self.application_state.dirty
+            and (path := self.application_state.current_path)
+        ):
+            self._save_file_at_path(path, self.text_field.text, tail=self._unread())
+
+    def _files_changed(self, changes: List[FileChange]) -> None:
+        """Catch up with files changed outside the app, as reported by the watcher"""
+        notes_index.watched = self.watcher.uses_inotify
+        refresh = False
+        for change in changes:
+            self._tree_changed(change.path)
+            if change.is_dir:
+                refresh = True
+            elif is_note(os.path.basename(change.path)):
+                text_index.update(change.path)
+                path_index.update(change.path)
+            # A note kept in memory is read again next time, unless it has unsaved changes.
+            if (note := self.open_notes.get(change.path)) and not note.status.dirty:
+                self.open_notes.remove(note.path)
+        if refresh:
+            # A folder was added, moved or deleted, with whatever is in it.
+            text_index.refresh(path_index.refresh())
+
+        current_path = self.application_state.current_path
+        if current_path and any(
+            os.path.normpath(change.path) == os.path.normpath(current_path)
+            for change in changes
+        ):
+            self._offer_reload()
+
+    def _offer_reload(self) -> None:
+        """Ask whether to reload the open note after it changed on disk"""
+        if self.reload_pending:
+            return
+        self.reload_pending = True
+
+        async def coroutine(self: MenuNav) -> None:
+            path = self.application_state.current_path
+            status = self.application_state.note
+            # Ignore the app's own saves, without reading the note back.
+            try:
+                if status.is_own_write(os.stat(path)):
+                    return
+            except OSError:
+                return
+            text = f"{path} was changed outside ThoughtBox.\nReload it?"
+            if status.dirty:
+                text += " Your unsaved changes will be lost."
+            dialog = ConfirmDialog(title="Note Changed", text=text)
+            if not await self.show_dialog_as_float(dialog):
+                return
+            if status is not self.application_state.note:
+                # Another note was opened in the meantime.
+                return
+            cursor_position = self.text_field.buffer.cursor_position
+            try:
+                self._open_note(path)
+            except (OSError, UnicodeDecodeError) as e:
+                return self.show_message("Error", "{}".format(e))
+            self.text_field.buffer.cursor_position = min(
+                cursor_position, len(self.text_field.text)
+            )
+
+        def done(future: asyncio.Future) -> None:
+            self.reload_pending = False
+
+        ensure_future(coroutine(self)).add_done_callback(done)
+
+    async def _wait_for_operation(self, title: str, operation: FileOperation) -> bool:
+        """Wait for a move or delete, showing its progress if it takes more than a moment.
+
+        Returns whether it completed, raises the OSError that stopped it.
+        """
+        future = asyncio.wrap_future(operation.future)
+        await asyncio.wait([future], timeout=PROGRESS_DIALOG_DELAY)
+        if not future.done():
+            await self.show_dialog_as_float(ProgressDialog(title, operation))
+        return await future
+
+    def _open_wiki_link(self, name: str) -> None:
+        """Switch to the note a [[name]] link points to"""
+
+        async def coroutine(self: MenuNav) -> None:
+            path = await asyncio.wrap_future(text_index.resolve(name))
+            if path is None:
+                return self.show_message(
+                    title="Open Link", text=f"There's no note called '{name}'."
+                )
+            if path != os.path.normpath(self.application_state.current_path or ""):
+                self._switch_to_note(path)
+
+        ensure_future(coroutine(self))
+
+    def _tree_changed(self, *paths: str) -> None:
+        """Invalidate what the indexes of the notes tree know about the given paths"""
+        for path in paths:
+            notes_index.invalidate(path)
 
     def show_message(self, title: str, text: str, centered: bool = True) -> None:
         """Shows About message"""
@@ -731,6 +1260,8 @@ class MenuNav:
         focused_before = app.layout.current_window
         # Focus cursor to the given dialog
         app.layout.focus(dialog)
+        # Draw it now, even if it's shown after awaiting something rather than from a key press.
+        app.invalidate()
         # Wait for the dialog to finish and stores the future's result
         result = await dialog.future
         # Re-focus cursor back to window in temp variable
@@ -771,6 +1302,11 @@ class MenuNav:
             """Open file with Ctrl-O"""
             self.do_scroll_menu()
 
+        @bindings.add("c-p")
+        def quick_open(event: KeyPressEvent) -> None:
+            """Quick open a note with Ctrl-P"""
+            self.do_quick_open()
+
         @bindings.add("c-q")
         def exit_editor(event: KeyPressEvent) -> None:
             """Exit application with Ctrl-Q"""
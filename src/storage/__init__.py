@@ -0,0 +1,37 @@
+from .file_operations import FileOperation, FileOperations
+from .file_writer import BackgroundWriter
+from .link_index import Backlink, LinkIndex
+from .notes_database import NotesDatabase
+from .notes_index import NoteEntry, NotesIndex, notes_index
+from .path_index import PathIndex, path_index
+from .search_index import SearchHit, SearchIndex
+from .sessions import NoteSession, SessionStore, note_sessions, text_hash
+from .settings import SettingsStore, user_settings
+from .text_index import TextIndex, text_index
+from .watcher import FileChange, NotesWatcher
+
+__all__ = [
+    FileOperation,
+    FileOperations,
+    BackgroundWriter,
+    Backlink,
+    LinkIndex,
+    NotesDatabase,
+    NoteEntry,
+    NotesIndex,
+    notes_index,
+    PathIndex,
+    path_index,
+    SearchHit,
+    SearchIndex,
+    NoteSession,
+    SessionStore,
+    note_sessions,
+    text_hash,
+    SettingsStore,
+    user_settings,
+    TextIndex,
+    text_index,
+    FileChange,
+    NotesWatcher,
+]
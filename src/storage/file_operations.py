@@ -0,0 +1,191 @@
+import errno
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from constants import TRASH_DIR, TRASH_KEEP_DAYS
+
+# File in each trash entry holding the path the item was deleted from.
+ORIGIN_FILE = ".origin"
+
+
+class FileOperation:
+    """A move or delete running on the worker thread.
+
+    The dialog showing it reads done and total, which the worker updates as it goes.
+    """
+
+    def __init__(self, description: str):
+        self.description = description
+        self.done = 0
+        # Number of files to copy, 0 until known or if the move doesn't need copying.
+        self.total = 0
+        # Resolves to True once finished, to False if cancelled (and rolled back).
+        self.future: Future = Future()
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Stop copying as soon as possible, removing what was copied."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel was called."""
+        return self._cancelled.is_set()
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the work done, between 0 and 1."""
+        return self.done / self.total if self.total else 0.0
+
+
+class FileOperations:
+    """Moves and deletes files and folders of the notes tree on a worker thread.
+
+    A move within a filesystem is a single rename. Across filesystems, files are copied
+    one by one, which can be cancelled, and the originals removed once all are copied.
+    Deleting moves the item to the trash, so that it can be restored.
+    """
+
+    def __init__(self, trash_dir: str = TRASH_DIR, keep_days: float = TRASH_KEEP_DAYS):
+        self.trash_dir = trash_dir
+        self.keep_days = keep_days
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="thought-box-files"
+        )
+
+    def move(self, path: str, directory: str) -> FileOperation:
+        """Move the file or folder at path into directory."""
+        operation = FileOperation(f"Moving {os.path.basename(path)}")
+        destination = os.path.join(directory, os.path.basename(path))
+        self._submit(operation, self._move, operation, path, destination)
+        return operation
+
+    def delete(self, path: str) -> FileOperation:
+        """Move the file or folder at path to the trash."""
+        operation = FileOperation(f"Deleting {os.path.basename(path)}")
+        self._submit(operation, self._delete, operation, path)
+        return operation
+
+    def restore(self) -> Tuple[FileOperation, Optional[str]]:
+        """Put the most recently deleted item back, with the path it's restored to.
+
+        The path is None if the trash is empty.
+        """
+        operation = FileOperation("Restoring")
+        entry = self._trash_entries()[-1:]
+        if not entry:
+            operation.future.set_result(False)
+            return operation, None
+        with open(os.path.join(entry[0], ORIGIN_FILE), "r") as f:
+            origin = f.read()
+        operation.description = f"Restoring {os.path.basename(origin)}"
+        self._submit(operation, self._restore, operation, entry[0], origin)
+        return operation, origin
+
+    ############ WORKER THREAD ############
+    def _submit(
+        self, operation: FileOperation, function: Callable[..., bool], *args: object
+    ) -> None:
+        def run() -> None:
+            try:
+                operation.future.set_result(function(*args))
+            except BaseException as e:
+                operation.future.set_exception(e)
+
+        self._executor.submit(run)
+
+    def _move(self, operation: FileOperation, path: str, destination: str) -> bool:
+        if os.path.exists(destination):
+            raise FileExistsError(errno.EEXIST, "Already exists", destination)
+        try:
+            os.rename(path, destination)
+            return True
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+        # Another filesystem, copy everything before removing anything.
+        if not os.path.isdir(path):
+            operation.total = 1
+            self._copy(path, destination)
+            operation.done = 1
+            os.remove(path)
+            return True
+
+        folders, files = [], []
+        for directory, _, names in os.walk(path):
+            relative = os.path.relpath(directory, path)
+            folders.append(relative)
+            files.extend(os.path.join(relative, name) for name in names)
+        operation.total = len(files)
+        try:
+            for folder in folders:
+                os.makedirs(os.path.join(destination, folder))
+            for name in files:
+                if operation.cancelled:
+                    shutil.rmtree(destination, ignore_errors=True)
+                    return False
+                self._copy(os.path.join(path, name), os.path.join(destination, name))
+                operation.done += 1
+        except BaseException:
+            shutil.rmtree(destination, ignore_errors=True)
+            raise
+        shutil.rmtree(path)
+        return True
+
+    @staticmethod
+    def _copy(path: str, destination: str) -> None:
+        try:
+            shutil.copy2(path, destination)
+        except BaseException:
+            if os.path.exists(destination):
+                os.remove(destination)
+            raise
+
+    def _delete(self, operation: FileOperation, path: str) -> bool:
+        entry = os.path.join(self.trash_dir, str(time.time_ns()))
+        os.makedirs(entry)
+        with open(os.path.join(entry, ORIGIN_FILE), "w") as f:
+            f.write(path)
+        try:
+            moved = self._move(
+                operation, path, os.path.join(entry, os.path.basename(path))
+            )
+        except BaseException:
+            shutil.rmtree(entry, ignore_errors=True)
+            raise
+        if not moved:
+            shutil.rmtree(entry, ignore_errors=True)
+        self._empty_old_entries()
+        return moved
+
+    def _restore(self, operation: FileOperation, entry: str, origin: str) -> bool:
+        os.makedirs(os.path.dirname(origin) or ".", exist_ok=True)
+        restored = self._move(
+            operation, os.path.join(entry, os.path.basename(origin)), origin
+        )
+        if restored:
+            shutil.rmtree(entry, ignore_errors=True)
+        return restored
+
+    def _trash_entries(self) -> List[str]:
+        """Trash entries, oldest first."""
+        try:
+            names = os.listdir(self.trash_dir)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(self.trash_dir, name)
+            for name in sorted((name for name in names if name.isdigit()), key=int)
+        ]
+
+    def _empty_old_entries(self) -> None:
+        """Delete for good what was moved to the trash more than keep_days ago."""
+        limit = time.time_ns() - int(self.keep_days * 24 * 3600 * 1e9)
+        for entry in self._trash_entries():
+            if int(os.path.basename(entry)) < limit:
+                shutil.rmtree(entry, ignore_errors=True)
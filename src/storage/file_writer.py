@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional
+
+from application.lazy_loader import UnreadBytes
+from utils import atomic_write
+
+
+class _PendingWrite(NamedTuple):
+    text: str
+    tail: Optional[UnreadBytes]
+    future: Future
+
+
+class BackgroundWriter:
+    """Writes files atomically on a worker thread, so saving never blocks the UI.
+
+    Writes to a path that are still waiting for the worker are coalesced:
+    only the most recent text is written, and every caller gets the same future.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="thought-box-writer"
+        )
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingWrite] = {}
+
+    def write(self, path: str, text: str, tail: Optional[UnreadBytes] = None) -> Future:
+        """Queue text to be written to path, followed by the bytes of tail if given.
+
+        The writer closes tail once it's written or replaced by a newer write.
+        Returns a concurrent.futures.Future that resolves to the os.stat_result of the file
+        once it's on disk, or to the OSError that prevented writing it.
+        """
+        with self._lock:
+            if pending := self._pending.get(path):
+                if pending.tail:
+                    pending.tail.close()
+                self._pending[path] = pending._replace(text=text, tail=tail)
+                return pending.future
+            future = Future()
+            self._pending[path] = _PendingWrite(text, tail, future)
+        self._executor.submit(self._write_pending, path)
+        return future
+
+    def submit(self, fn: Callable[..., object], *args: object) -> Future:
+        """Run fn(*args) on the worker thread, once everything queued so far has been written."""
+        # There is a single worker, so this runs after every write submitted before it.
+        return self._executor.submit(fn, *args)
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been written."""
+        self.submit(lambda: None).result()
+
+    def _write_pending(self, path: str) -> None:
+        """Write the latest text queued for path. Runs on the worker thread."""
+        with self._lock:
+            pending = self._pending.pop(path)
+        try:
+            written = atomic_write(path, pending.text, pending.tail)
+        except OSError as e:
+            pending.future.set_exception(e)
+        else:
+            pending.future.set_result(written)
+        finally:
+            if pending.tail:
+                pending.tail.close()
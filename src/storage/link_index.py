@@ -0,0 +1,160 @@
+import os
+import re
+import sqlite3
+from concurrent.futures import Future
+from typing import List, NamedTuple, Optional
+
+from storage.notes_database import NotesDatabase
+
+# [[Note Name]], optionally with a heading or a label: [[Note Name#Heading]], [[Note Name|label]].
+WIKI_LINK_RE = re.compile(r"\[\[([^\[\]\n|#]+)(?:[|#][^\[\]\n]*)?\]\]")
+SNIPPET_WIDTH = 60
+
+
+class Backlink(NamedTuple):
+    """A link to a note, found in another note"""
+
+    path: str
+    # Offset of the link in the linking note.
+    position: int
+    snippet: str
+
+
+def link_name(name: str) -> str:
+    """What a note is called in links: its file name without extension, ignoring case."""
+    name = os.path.basename(name.strip())
+    root, extension = os.path.splitext(name)
+    if extension.lower() in (".md", ".txt"):
+        name = root
+    return name.strip().casefold()
+
+
+def link_at(line: str, column: int) -> Optional[str]:
+    """Name of the note linked to at column of line, if there's a [[link]] there."""
+    for match in WIKI_LINK_RE.finditer(line):
+        if match.start() <= column <= match.end():
+            return match.group(1).strip()
+    return None
+
+
+class LinkIndex(NotesDatabase):
+    """Persistent graph of the [[links]] between notes under the notes directory.
+
+    Notes by name and links by target live in an SQLite database, so resolving a
+    link or finding the links to a note is a single indexed lookup, and updating
+    a note only touches its own links.
+    """
+
+    THREAD_NAME = "thought-box-links"
+
+    def resolve(self, name: str) -> Future:
+        """Path of the note a [[name]] link points to. Resolves to None if there's no such note."""
+        return self._executor.submit(self._resolve, name)
+
+    def backlinks(self, path: str) -> Future:
+        """Links to the note at path from other notes. Resolves to a list of Backlink."""
+        return self._executor.submit(self._backlinks, os.path.normpath(path))
+
+    ############ WORKER THREAD ############
+    def _create_tables(self, db: sqlite3.Connection) -> None:
+        super()._create_tables(db)
+        db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS note_names (
+                note_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS note_names_name ON note_names (name);
+            CREATE TABLE IF NOT EXISTS links (
+                source_id INTEGER NOT NULL,
+                -- link_name of the link, and the link as written.
+                target TEXT NOT NULL,
+                link TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                snippet TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS links_target ON links (target);
+            CREATE INDEX IF NOT EXISTS links_source ON links (source_id);
+            """
+        )
+
+    def _index(self, note_id: int, path: str, text: str) -> None:
+        self.db.execute(
+            "INSERT INTO note_names (note_id, name) VALUES (?, ?)",
+            (note_id, link_name(path)),
+        )
+        self.db.executemany(
+            "INSERT INTO links (source_id, target, link, position, snippet) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    note_id,
+                    link_name(match.group(1)),
+                    match.group(1),
+                    match.start(),
+                    _snippet(text, match),
+                )
+                for match in WIKI_LINK_RE.finditer(text)
+            ),
+        )
+        super()._index(note_id, path, text)
+
+    def _forget(self, note_id: int) -> None:
+        self.db.execute("DELETE FROM note_names WHERE note_id = ?", (note_id,))
+        self.db.execute("DELETE FROM links WHERE source_id = ?", (note_id,))
+        super()._forget(note_id)
+
+    def _moved(self, note_id: int, path: str) -> None:
+        self.db.execute(
+            "UPDATE note_names SET name = ? WHERE note_id = ?",
+            (link_name(path), note_id),
+        )
+        super()._moved(note_id, path)
+
+    def _resolve(self, name: str) -> Optional[str]:
+        paths = [
+            path
+            for path, in self.db.execute(
+                """
+                SELECT notes.path FROM note_names JOIN notes ON notes.id = note_names.note_id
+                WHERE note_names.name = ?
+                ORDER BY length(notes.path), notes.path
+                """,
+                (link_name(name),),
+            )
+        ]
+        # A link like [[folder/Note]] prefers the note in that folder.
+        if folder := os.path.dirname(name.strip()).casefold():
+            for path in paths:
+                directory = os.path.dirname(path).casefold()
+                if directory == folder or directory.endswith(os.sep + folder):
+                    return path
+        return paths[0] if paths else None
+
+    def _backlinks(self, path: str) -> List[Backlink]:
+        rows = self.db.execute(
+            """
+            SELECT notes.path, links.link, links.position, links.snippet
+            FROM links JOIN notes ON notes.id = links.source_id
+            WHERE links.target = ? AND notes.path != ?
+            ORDER BY notes.path, links.position
+            """,
+            (link_name(path), path),
+        ).fetchall()
+        # Other notes of the same name may be the ones linked to.
+        resolved = {}
+        backlinks = []
+        for source, link, position, snippet in rows:
+            if link not in resolved:
+                resolved[link] = self._resolve(link)
+            if resolved[link] == path:
+                backlinks.append(Backlink(source, position, snippet))
+        return backlinks
+
+
+def _snippet(text: str, match: re.Match) -> str:
+    """The text around a link, on its line."""
+    line_start = text.rfind("\n", 0, match.start()) + 1
+    start = max(line_start, match.start() - SNIPPET_WIDTH // 3)
+    line_end = text.find("\n", start)
+    end = min(start + SNIPPET_WIDTH, len(text) if line_end == -1 else line_end)
+    return ("..." if start > line_start else "") + " ".join(text[start:end].split())
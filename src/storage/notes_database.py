@@ -0,0 +1,169 @@
+import os
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from constants import NOTES_DIR
+
+# Version of the layout of the databases. One of another version is deleted and rebuilt.
+DATABASE_VERSION = 3
+
+
+def is_note(name: str) -> bool:
+    """Whether a file name is a note the app can open."""
+    return not name.startswith(".") and name.endswith((".txt", ".md"))
+
+
+def walk_notes(root: str) -> Iterator[str]:
+    """Path of every note under root, except those in hidden folders like the trash."""
+    for directory, folders, files in os.walk(root):
+        folders[:] = [name for name in folders if not name.startswith(".")]
+        for name in files:
+            if is_note(name):
+                yield os.path.normpath(os.path.join(directory, name))
+
+
+class NotesDatabase:
+    """Base of the persistent indexes of every note under the notes directory.
+
+    Keeps the path and mtime of each note in an SQLite database, and reads the notes
+    whose mtime changed. Subclasses add their own tables and fill them in _index,
+    _forget and _moved. All database work happens on a single worker thread. Every
+    public method returns immediately with a concurrent.futures.Future.
+    """
+
+    THREAD_NAME = "thought-box-notes"
+
+    def __init__(self, db_path: str, root: str = NOTES_DIR):
+        self.db_path = db_path
+        self.root = root
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=self.THREAD_NAME
+        )
+        self._db: Optional[sqlite3.Connection] = None
+
+    def refresh(self, notes: Optional[Future] = None) -> Future:
+        """Bring the index in line with the notes on disk, re-reading only notes whose mtime changed.
+
+        Pass the future of a PathIndex.refresh to take its paths instead of walking the notes again.
+        """
+        return self._executor.submit(self._refresh, notes)
+
+    def update(self, path: str, text: Optional[str] = None) -> Future:
+        """(Re-)index a note. Pass its text if known to avoid reading it back."""
+        return self._executor.submit(self._update, os.path.normpath(path), text)
+
+    def remove(self, path: str) -> Future:
+        """Remove a note, or every note in a folder, from the index."""
+        return self._executor.submit(self._remove, os.path.normpath(path))
+
+    def move(self, old_path: str, new_path: str) -> Future:
+        """Follow a note or folder that was moved or renamed."""
+        return self._executor.submit(
+            self._move, os.path.normpath(old_path), os.path.normpath(new_path)
+        )
+
+    ############ WORKER THREAD ############
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Connection to the database, created on first use by the worker thread."""
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path)
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version != DATABASE_VERSION:
+                # It's only a cache of the notes, start over.
+                self._db.close()
+                if os.path.exists(self.db_path):
+                    os.remove(self.db_path)
+                self._db = sqlite3.connect(self.db_path)
+            self._create_tables(self._db)
+            self._db.execute(f"PRAGMA user_version = {DATABASE_VERSION}")
+        return self._db
+
+    def _create_tables(self, db: sqlite3.Connection) -> None:
+        """Create the tables of the index if they don't exist yet."""
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            )
+            """
+        )
+
+    def _index(self, note_id: int, path: str, text: str) -> None:
+        """Index the text of a note, whatever was indexed for it before is forgotten already."""
+
+    def _forget(self, note_id: int) -> None:
+        """Drop what was indexed for a note."""
+
+    def _moved(self, note_id: int, path: str) -> None:
+        """Follow a note moved to path."""
+
+    def _refresh(self, notes: Optional[Future]) -> None:
+        known = dict(self.db.execute("SELECT path, mtime_ns FROM notes"))
+        for path in notes.result() if notes else walk_notes(self.root):
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if known.pop(path, None) != mtime_ns:
+                self._update(path, None, commit=False)
+        for path in known:
+            self._remove(path, commit=False)
+        self.db.commit()
+
+    def _update(self, path: str, text: Optional[str], commit: bool = True) -> None:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if text is None:
+                known = self.db.execute(
+                    "SELECT mtime_ns FROM notes WHERE path = ?", (path,)
+                ).fetchone()
+                if known and known[0] == mtime_ns:
+                    # Already indexed, like a note the app just saved itself.
+                    return
+                with open(path, "r", encoding="utf8", errors="replace") as f:
+                    text = f.read()
+        except OSError:
+            # The note is gone, make sure the index forgets it.
+            self._remove(path, commit=commit)
+            return
+
+        db = self.db
+        row = db.execute("SELECT id FROM notes WHERE path = ?", (path,)).fetchone()
+        if row:
+            note_id = row[0]
+            self._forget(note_id)
+            db.execute(
+                "UPDATE notes SET mtime_ns = ? WHERE id = ?", (mtime_ns, note_id)
+            )
+        else:
+            note_id = db.execute(
+                "INSERT INTO notes (path, mtime_ns) VALUES (?, ?)", (path, mtime_ns)
+            ).lastrowid
+        self._index(note_id, path, text)
+        if commit:
+            db.commit()
+
+    def _notes_under(self, path: str) -> List[tuple]:
+        """(id, path) of the note at path, or of every note in the folder at path."""
+        return self.db.execute(
+            "SELECT id, path FROM notes WHERE path = ? OR substr(path, 1, ?) = ?",
+            (path, len(path) + 1, path + os.sep),
+        ).fetchall()
+
+    def _remove(self, path: str, commit: bool = True) -> None:
+        for note_id, _ in self._notes_under(path):
+            self._forget(note_id)
+            self.db.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+        if commit:
+            self.db.commit()
+
+    def _move(self, old_path: str, new_path: str) -> None:
+        for note_id, path in self._notes_under(old_path):
+            path = new_path + path[len(old_path) :]
+            self.db.execute("UPDATE notes SET path = ? WHERE id = ?", (path, note_id))
+            self._moved(note_id, path)
+        self.db.commit()
@@ -0,0 +1,115 @@
+import os
+import re
+from typing import Dict, NamedTuple, Tuple
+
+UNTITLED_NAME = "Note"
+# "Note.txt", "Note 1.txt", "Note 2.txt"...
+UNTITLED_RE = re.compile(rf"{UNTITLED_NAME}(?: ([1-9][0-9]*))?\.txt")
+
+
+class NoteEntry(NamedTuple):
+    """A file or folder in the notes tree"""
+
+    name: str
+    is_dir: bool
+
+
+class _Listing(NamedTuple):
+    mtime_ns: int
+    entries: Tuple[NoteEntry, ...]
+
+
+class NotesIndex:
+    """Cache of the directory listings of the notes tree.
+
+    Listings are read with os.scandir, which gets the file type along with the name,
+    and are kept until the directory's mtime changes or the app itself invalidates them
+    after moving, renaming, deleting or saving something.
+    """
+
+    def __init__(self):
+        self._listings: Dict[str, _Listing] = {}
+        # Set when something else (like a filesystem watcher) invalidates changed directories.
+        # Cached listings are then trusted without checking the directory's mtime.
+        self.watched = False
+        # Suffix to try next for an untitled note, by directory.
+        self._untitled_suffixes: Dict[str, int] = {}
+
+    def list_dir(self, directory: str) -> Tuple[NoteEntry, ...]:
+        """Entries of directory, sorted by name."""
+        key = os.path.normpath(directory)
+        listing = self._listings.get(key)
+        if listing and self.watched:
+            return listing.entries
+
+        mtime_ns = os.stat(key).st_mtime_ns
+        if listing is None or listing.mtime_ns != mtime_ns:
+            with os.scandir(key) as it:
+                entries = tuple(
+                    sorted(
+                        (NoteEntry(entry.name, entry.is_dir()) for entry in it),
+                        key=lambda entry: entry.name.lower(),
+                    )
+                )
+            listing = self._listings[key] = _Listing(mtime_ns, entries)
+        return listing.entries
+
+    def has_subdirs(self, directory: str) -> bool:
+        """Whether directory contains any folder."""
+        return any(entry.is_dir for entry in self.list_dir(directory))
+
+    def new_untitled_note(self, directory: str) -> str:
+        """Create an empty, uniquely named untitled note in directory and return its name.
+
+        Names count up from the highest numbered untitled note in the directory's listing,
+        which is only scanned the first time. The file is created with O_EXCL, so a name
+        taken in the meantime (e.g. by another instance of the app) is skipped, not reused.
+        """
+        key = os.path.normpath(directory)
+        suffix = self._untitled_suffixes.get(key)
+        if suffix is None:
+            matches = (
+                UNTITLED_RE.fullmatch(entry.name) for entry in self.list_dir(key)
+            )
+            suffix = 1 + max(
+                (int(match.group(1) or 0) for match in matches if match), default=-1
+            )
+
+        while True:
+            name = f"{UNTITLED_NAME} {suffix}.txt" if suffix else f"{UNTITLED_NAME}.txt"
+            try:
+                os.close(
+                    os.open(os.path.join(key, name), os.O_CREAT | os.O_EXCL, 0o666)
+                )
+                break
+            except FileExistsError:
+                suffix += 1
+        self._untitled_suffixes[key] = suffix + 1
+        self.invalidate(os.path.join(key, name))
+        return name
+
+    def discard_untitled_note(self, path: str) -> None:
+        """Delete a note made by new_untitled_note that nothing was saved to, if it's still empty."""
+        try:
+            if os.path.getsize(path) == 0:
+                os.remove(path)
+        except OSError:
+            return
+        self.invalidate(path)
+
+    def invalidate(self, path: str) -> None:
+        """Forget what is cached about path, its parent folder and, for a folder, everything in it."""
+        path = os.path.normpath(path)
+        self._listings.pop(os.path.dirname(path) or ".", None)
+        prefix = path + os.sep
+        for key in [k for k in self._listings if k == path or k.startswith(prefix)]:
+            del self._listings[key]
+
+    def clear(self) -> None:
+        """Forget every cached listing."""
+        self._listings.clear()
+        self._untitled_suffixes.clear()
+
+
+# Shared by every dialog that browses the notes tree.
+notes_index = NotesIndex()
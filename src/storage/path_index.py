@@ -0,0 +1,283 @@
+import heapq
+import os
+import re
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import accumulate
+from operator import itemgetter
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from constants import NOTES_DIR, QUICK_OPEN_BUDGET, QUICK_OPEN_MATCHES
+from storage.notes_database import is_note, walk_notes
+
+# Paths per shard of the index. A search checks the time it took after each shard.
+PATH_INDEX_SHARD_SIZE = 4096
+# Characters after which a match starts a word.
+WORD_SEPARATORS = frozenset(" _-./" + os.sep)
+
+
+class _Shard(NamedTuple):
+    # Index of the first path of the shard.
+    start: int
+    # Lowercase paths, one per line.
+    text: str
+    # Offset of the newline ending each path.
+    ends: Tuple[int, ...]
+
+
+class _Paths(NamedTuple):
+    """Every note path, shortest first, and what searching them needs"""
+
+    paths: Tuple[str, ...]
+    # Paths relative to the root, in lowercase.
+    lowered: Tuple[str, ...]
+    shards: Tuple[_Shard, ...]
+
+
+def _joined(lowered: List[str]) -> Tuple[str, Tuple[int, ...]]:
+    """Text of lowered paths, one per line, and the offset of each line's newline."""
+    return "\n".join(lowered) + "\n", tuple(
+        end - 1 for end in accumulate(len(path) + 1 for path in lowered)
+    )
+
+
+def _normalize(query: str) -> str:
+    """Query as it's matched: lowercase, without whitespace."""
+    return "".join(query.lower().split())
+
+
+def _pattern(query: str) -> "re.Pattern":
+    """Expression matching the lines of which query is a subsequence, from the first character to the newline.
+
+    Each character is looked for past the previous one with a negated class rather
+    than a lazy wildcard, so a line that doesn't match is rejected without backtracking.
+    """
+    parts = [re.escape(query[0])]
+    for char in query[1:]:
+        char = re.escape(char)
+        parts.append(f"[^{char}\n]*{char}")
+    return re.compile("".join(parts) + "[^\n]*")
+
+
+def _score(query: str, path: str) -> Tuple[bool, bool, int, int]:
+    """How well query matches the lowercase path, higher is better.
+
+    Matches within the file name beat matches across folders, then matches starting
+    a word, then the tightest ones, then shorter paths.
+    """
+    name_start = path.rfind(os.sep) + 1
+    for start in (name_start, 0):
+        end = start - 1
+        for char in query:
+            end = path.find(char, end + 1)
+            if end < 0:
+                break
+        else:
+            break
+    # Walk back from the end of the match for the latest start, so the span is the tightest.
+    first = end + 1
+    for char in reversed(query):
+        first = path.rindex(char, start, first)
+    word = first == 0 or path[first - 1] in WORD_SEPARATORS
+    return (start == name_start, word, first - end, -len(path))
+
+
+class PathSearch:
+    """A fuzzy search of the note paths, run a frame's worth at a time.
+
+    Paths are scanned shortest first, shard by shard, with one regular expression per
+    shard, until QUICK_OPEN_MATCHES paths matched or all of them were scanned. Each run
+    stops once its time budget is spent, so the results can be shown and the user can
+    keep typing before the next one. The search for a query extending the previous one
+    only filters the previous matches, then goes on from where that search stopped.
+    """
+
+    def __init__(
+        self, query: str, paths: _Paths, previous: Optional["PathSearch"] = None
+    ):
+        self.query = _normalize(query)
+        self._paths = paths
+        # Shard to scan next, and the offset to scan it from.
+        self._shard = 0
+        self._offset = 0
+        # (score, path index) of every match so far.
+        self._matches: List[Tuple[tuple, int]] = []
+        if not self.query:
+            # Nothing typed yet, show the shortest paths.
+            count = min(len(paths.paths), QUICK_OPEN_MATCHES)
+            self._matches = [((), i) for i in range(count)]
+            self._shard = len(paths.shards)
+            return
+
+        self._pattern = _pattern(self.query)
+        if (
+            previous
+            and previous._paths is paths
+            and previous.query
+            and self.query.startswith(previous.query)
+        ):
+            self._shard = previous._shard
+            self._offset = previous._offset
+            self._filter([i for _, i in previous._matches])
+
+    @property
+    def done(self) -> bool:
+        """Whether the search is over, and the results final"""
+        return len(self._matches) >= QUICK_OPEN_MATCHES or self._shard >= len(
+            self._paths.shards
+        )
+
+    def run(self, budget: float = QUICK_OPEN_BUDGET) -> bool:
+        """Scan for about budget seconds, or until done. Returns whether it's done."""
+        deadline = time.perf_counter() + budget
+        shards = self._paths.shards
+        while not self.done:
+            shard = shards[self._shard]
+            self._offset = self._scan(
+                shard.text, shard.ends, shard.start, self._offset, deadline=deadline
+            )
+            if self._offset is None:
+                self._shard += 1
+                self._offset = 0
+            if time.perf_counter() >= deadline:
+                break
+        return self.done
+
+    def results(self, limit: int) -> List[str]:
+        """Paths of the best limit matches so far, best first"""
+        return [
+            self._paths.paths[i]
+            for _, i in heapq.nlargest(limit, self._matches, key=itemgetter(0))
+        ]
+
+    def _filter(self, indexes: List[int]) -> None:
+        """Keep the paths at indexes that match the query."""
+        lowered = [self._paths.lowered[i] for i in indexes]
+        text, ends = _joined(lowered)
+        self._scan(text, ends, 0, 0, indexes)
+
+    def _scan(
+        self,
+        text: str,
+        ends: Tuple[int, ...],
+        start: int,
+        offset: int,
+        indexes: Optional[List[int]] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[int]:
+        """Add the matching lines of text, from offset. The nth line is path start + n, or indexes[n].
+
+        Returns where to go on from if enough paths matched or the deadline passed,
+        None once text is scanned.
+        """
+        lowered = self._paths.lowered
+        for match in self._pattern.finditer(text, offset):
+            line = bisect_left(ends, match.end())
+            i = start + line if indexes is None else indexes[line]
+            self._matches.append((_score(self.query, lowered[i]), i))
+            if len(self._matches) >= QUICK_OPEN_MATCHES or (
+                deadline and time.perf_counter() > deadline
+            ):
+                return match.end() + 1
+        return None
+
+
+class PathIndex:
+    """In-memory index of the path of every note under the notes directory, for quick-open.
+
+    The set of paths is kept up to date on a worker thread, which publishes a new sorted,
+    sharded copy for searching whenever a note appears or goes away. Searching happens on
+    the caller's thread, on whatever copy was published last.
+    """
+
+    def __init__(self, root: str = NOTES_DIR):
+        self.root = os.path.normpath(root)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="thought-box-paths"
+        )
+        # Worker thread only.
+        self._notes: Set[str] = set()
+        self._paths = _Paths((), (), ())
+
+    def refresh(self) -> Future:
+        """Read the paths of every note on disk. Resolves to them, see NotesDatabase.refresh."""
+        return self._executor.submit(self._refresh)
+
+    def update(self, path: str) -> Future:
+        """Add the note at path, or remove it if it doesn't exist anymore."""
+        return self._executor.submit(self._update, os.path.normpath(path))
+
+    def remove(self, path: str) -> Future:
+        """Remove a note, or every note in a folder."""
+        return self._executor.submit(self._remove, os.path.normpath(path))
+
+    def move(self, old_path: str, new_path: str) -> Future:
+        """Follow a note or folder that was moved or renamed."""
+        return self._executor.submit(
+            self._move, os.path.normpath(old_path), os.path.normpath(new_path)
+        )
+
+    def ready(self) -> Future:
+        """Resolves once the changes asked for so far are searchable."""
+        return self._executor.submit(lambda: None)
+
+    def search(self, query: str, previous: Optional[PathSearch] = None) -> PathSearch:
+        """Start a fuzzy search for query, picking up from the previous search if it helps.
+
+        Nothing is scanned until the search is run.
+        """
+        return PathSearch(query, self._paths, previous)
+
+    def __len__(self) -> int:
+        return len(self._paths.paths)
+
+    ############ WORKER THREAD ############
+    def _refresh(self) -> Tuple[str, ...]:
+        self._notes = set(walk_notes(self.root))
+        self._publish()
+        return self._paths.paths
+
+    def _update(self, path: str) -> None:
+        if is_note(os.path.basename(path)) and os.path.isfile(path):
+            if path not in self._notes:
+                self._notes.add(path)
+                self._publish()
+        else:
+            self._remove(path)
+
+    def _notes_under(self, path: str) -> List[str]:
+        """The note at path, or every note in the folder at path."""
+        prefix = path + os.sep
+        return [note for note in self._notes if note == path or note.startswith(prefix)]
+
+    def _remove(self, path: str) -> None:
+        if notes := self._notes_under(path):
+            self._notes.difference_update(notes)
+            self._publish()
+
+    def _move(self, old_path: str, new_path: str) -> None:
+        if notes := self._notes_under(old_path):
+            self._notes.difference_update(notes)
+            self._notes.update(new_path + note[len(old_path) :] for note in notes)
+            self._publish()
+
+    def _publish(self) -> None:
+        """Replace the searched copy of the paths."""
+        prefix = self.root + os.sep
+        relative = {
+            path: path[len(prefix) :] if path.startswith(prefix) else path
+            for path in self._notes
+        }
+        paths = tuple(sorted(self._notes, key=lambda path: (len(relative[path]), path)))
+        # A newline in a file name would split it over two lines of a shard.
+        lowered = tuple(relative[path].lower().replace("\n", " ") for path in paths)
+        shards = []
+        for start in range(0, len(paths), PATH_INDEX_SHARD_SIZE):
+            text, ends = _joined(list(lowered[start : start + PATH_INDEX_SHARD_SIZE]))
+            shards.append(_Shard(start, text, ends))
+        self._paths = _Paths(paths, lowered, tuple(shards))
+
+
+# Shared index of the note paths, searched by quick-open.
+path_index = PathIndex()
@@ -0,0 +1,162 @@
+import os
+import re
+import sqlite3
+import unicodedata
+from concurrent.futures import Future
+from typing import List, NamedTuple
+
+from storage.notes_database import NotesDatabase
+
+TOKEN_RE = re.compile(r"\w+")
+# Words as FTS5's unicode61 tokenizer splits them, which doesn't keep underscores.
+WORD_RE = re.compile(r"[^\W_]+")
+# Most words in a search result's snippet, and how many of them come before the match.
+SNIPPET_TOKENS = 12
+SNIPPET_CONTEXT = 3
+# Characters around the match looked at to cut a snippet.
+SNIPPET_REACH = 200
+
+
+class SearchHit(NamedTuple):
+    """A note matching a search"""
+
+    path: str
+    # BM25 relevance, higher is better.
+    score: float
+    snippet: str
+
+
+def match_query(query: str) -> str:
+    """FTS5 query for the notes containing every word of query, or "" if it has no words."""
+    return " ".join(f'"{term}"' for term in TOKEN_RE.findall(query))
+
+
+def fold(word: str) -> str:
+    """Word as the index compares it, without case or diacritics."""
+    if word.isascii():
+        return word.lower()
+    return "".join(
+        char
+        for char in unicodedata.normalize("NFKD", word.casefold())
+        if not unicodedata.combining(char)
+    )
+
+
+def first_match(text: str, query: str) -> int:
+    """Offset of the first word of text that is a word of query, or -1."""
+    terms = {fold(term) for term in WORD_RE.findall(query)}
+    for word in WORD_RE.finditer(text):
+        if fold(word.group()) in terms:
+            return word.start()
+    return -1
+
+
+def cut_snippet(text: str, start: int) -> str:
+    """About SNIPPET_TOKENS words of text around the match at start."""
+    low = max(0, start - SNIPPET_REACH)
+    high = start + SNIPPET_REACH
+    # Whole words only, those at the ends of the range may be cut.
+    before = text[low:start].split()[1 if low else 0 :]
+    after = text[start:high].split()
+    if high < len(text) and len(after) > 1:
+        after.pop()
+    if before and after and not text[start - 1].isspace():
+        # The match is inside a word, like "(match".
+        after[0] = before.pop() + after[0]
+    shown_before = before[-SNIPPET_CONTEXT:]
+    shown_after = after[: SNIPPET_TOKENS - len(shown_before)]
+    return "".join(
+        (
+            "..." if low or len(shown_before) < len(before) else "",
+            " ".join(shown_before + shown_after),
+            "..." if high < len(text) or len(shown_after) < len(after) else "",
+        )
+    )
+
+
+class SearchIndex(NotesDatabase):
+    """Persistent full-text index of every note under the notes directory.
+
+    The text of the notes is kept in an SQLite FTS5 table, which finds and ranks matches
+    with BM25, so updating one note or answering a query never reads the notes themselves.
+    Snippets and match offsets come from the stored text of the notes returned only: FTS5's
+    snippet() and highlight() take time quadratic in the matches of a note.
+    """
+
+    THREAD_NAME = "thought-box-search"
+
+    def search(self, query: str, limit: int = 50) -> Future:
+        """Notes containing every word of query, best matches first. Resolves to a list of SearchHit."""
+        return self._executor.submit(self._search, query, limit)
+
+    def count(self, query: str) -> Future:
+        """Resolves to the number of notes containing every word of query."""
+        return self._executor.submit(self._count, query)
+
+    def locate(self, path: str, query: str) -> Future:
+        """Resolves to the offset of the first match of query in the note at path, or -1."""
+        return self._executor.submit(self._locate, os.path.normpath(path), query)
+
+    ############ WORKER THREAD ############
+    def _create_tables(self, db: sqlite3.Connection) -> None:
+        super()._create_tables(db)
+        db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS notes_text USING fts5 (text)")
+
+    def _index(self, note_id: int, path: str, text: str) -> None:
+        self.db.execute(
+            "INSERT INTO notes_text (rowid, text) VALUES (?, ?)", (note_id, text)
+        )
+        super()._index(note_id, path, text)
+
+    def _forget(self, note_id: int) -> None:
+        self.db.execute("DELETE FROM notes_text WHERE rowid = ?", (note_id,))
+        super()._forget(note_id)
+
+    def _search(self, query: str, limit: int) -> List[SearchHit]:
+        match = match_query(query)
+        if not match:
+            return []
+        rows = self.db.execute(
+            """
+            SELECT notes.id, notes.path, -bm25(notes_text)
+            FROM notes_text JOIN notes ON notes.id = notes_text.rowid
+            WHERE notes_text MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (match, limit),
+        ).fetchall()
+        hits = []
+        for note_id, path, score in rows:
+            text = self._text(note_id)
+            start = max(0, first_match(text, query))
+            hits.append(SearchHit(path, score, cut_snippet(text, start)))
+        return hits
+
+    def _count(self, query: str) -> int:
+        match = match_query(query)
+        if not match:
+            return 0
+        return self.db.execute(
+            "SELECT count(*) FROM notes_text WHERE notes_text MATCH ?", (match,)
+        ).fetchone()[0]
+
+    def _locate(self, path: str, query: str) -> int:
+        match = match_query(query)
+        if not match:
+            return -1
+        row = self.db.execute(
+            """
+            SELECT notes_text.rowid
+            FROM notes_text JOIN notes ON notes.id = notes_text.rowid
+            WHERE notes.path = ? AND notes_text MATCH ?
+            """,
+            (path, match),
+        ).fetchone()
+        return first_match(self._text(row[0]), query) if row else -1
+
+    def _text(self, note_id: int) -> str:
+        """Text of a note as it was indexed."""
+        return self.db.execute(
+            "SELECT text FROM notes_text WHERE rowid = ?", (note_id,)
+        ).fetchone()[0]
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from constants import MAX_SESSIONS, NOTES_DIR
+from storage.file_writer import BackgroundWriter
+from utils import atomic_write
+
+# An undo step: the edit (start, removed, inserted) going back to the previous state, and its cursor position.
+UndoStep = Tuple[int, str, str, int]
+
+
+class NoteSession(NamedTuple):
+    """Where the user was in a note when they left it"""
+
+    cursor_position: int
+    vertical_scroll: int
+    # text_hash of the text the undo steps go back from.
+    text_hash: str
+    undo: List[UndoStep]
+
+
+def text_hash(text: str) -> str:
+    """Short, stable hash of a note's text."""
+    return hashlib.blake2b(
+        text.encode("utf8", "surrogatepass"), digest_size=16
+    ).hexdigest()
+
+
+class SessionStore:
+    """Session of every note, one small JSON file per note.
+
+    A session is only read when its note is opened, and written in the background
+    when the note is left. The least recently written sessions are dropped once
+    there are more than MAX_SESSIONS.
+    """
+
+    def __init__(self, directory: str, max_sessions: int = MAX_SESSIONS):
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self._writer = BackgroundWriter()
+        # Sessions saved but maybe not yet written, by session file.
+        # Written sessions are dropped from it on the writer thread.
+        self._lock = threading.Lock()
+        self._pending: Dict[str, NoteSession] = {}
+
+    def load(self, path: str) -> Optional[NoteSession]:
+        """Session of the note at path, None if there's none."""
+        session_path = self._session_path(path)
+        with self._lock:
+            session = self._pending.get(session_path)
+        if session:
+            return session
+        try:
+            with open(session_path, "r") as f:
+                data = json.load(f)
+            return NoteSession(
+                data["cursor_position"],
+                data["vertical_scroll"],
+                data["text_hash"],
+                [tuple(step) for step in data["undo"]],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: str, session: NoteSession) -> None:
+        """Remember the session of the note at path."""
+        os.makedirs(self.directory, exist_ok=True)
+        session_path = self._session_path(path)
+        with self._lock:
+            self._pending[session_path] = session
+        data = dict(session._asdict(), path=os.path.abspath(path))
+        future = self._writer.write(session_path, json.dumps(data))
+
+        def written(future: Future) -> None:
+            """Forget the pending session, unless a newer one was saved meanwhile. Runs on the writer thread."""
+            with self._lock:
+                if self._pending.get(session_path) is session:
+                    del self._pending[session_path]
+            self._prune()
+
+        future.add_done_callback(written)
+
+    def move(self, old_path: str, new_path: str) -> Future:
+        """Move the sessions of the note or folder at old_path to new_path, in the background.
+
+        Runs once the sessions saved so far are written, so none of them is left behind.
+        """
+        return self._writer.submit(
+            self._move, os.path.abspath(old_path), os.path.abspath(new_path)
+        )
+
+    def flush(self) -> None:
+        """Block until every session saved so far is on disk."""
+        self._writer.flush()
+
+    ############ INTERNALS ############
+    def _session_path(self, path: str) -> str:
+        name = hashlib.blake2b(
+            os.path.abspath(path).encode("utf8", "surrogatepass"), digest_size=20
+        )
+        return os.path.join(self.directory, name.hexdigest() + ".json")
+
+    def _move(self, old_path: str, new_path: str) -> None:
+        """Rewrite the sessions of notes under old_path for their new path. Runs on the writer thread."""
+        try:
+            with os.scandir(self.directory) as it:
+                session_paths = [
+                    entry.path for entry in it if entry.name.endswith(".json")
+                ]
+        except OSError:
+            return
+        for session_path in session_paths:
+            try:
+                with open(session_path, "r") as f:
+                    data = json.load(f)
+                path = data["path"]
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            if not isinstance(path, str) or (
+                path != old_path and not path.startswith(old_path + os.sep)
+            ):
+                continue
+            data["path"] = new_path + path[len(old_path) :]
+            try:
+                atomic_write(self._session_path(data["path"]), json.dumps(data))
+                os.remove(session_path)
+            except OSError:
+                pass
+
+    def _prune(self) -> None:
+        """Drop the oldest sessions if there are too many."""
+        with os.scandir(self.directory) as it:
+            entries = [entry for entry in it if entry.name.endswith(".json")]
+        if len(entries) <= self.max_sessions:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[: len(entries) - self.max_sessions]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+# Sessions of the notes, kept in the notes directory next to the settings.
+note_sessions = SessionStore(os.path.join(NOTES_DIR, ".sessions"))
@@ -0,0 +1,113 @@
+import copy
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+
+from constants import (
+    DEFAULT_STYLE,
+    NOTES_DIR,
+    SETTINGS_WRITE_DELAY,
+    USER_SETTINGS_DIR,
+    WELCOME_PAGE,
+)
+from storage.file_writer import BackgroundWriter
+
+# What a setting can be: anything JSON can hold.
+Setting = Union[None, bool, int, float, str, List["Setting"], Dict[str, "Setting"]]
+
+
+class SettingsStore:
+    """The one owner of the user settings file.
+
+    Settings are read from disk once and served from memory. Changes are
+    batched: they are written back atomically on a background thread
+    SETTINGS_WRITE_DELAY seconds after the last one, or right away by flush().
+    """
+
+    def __init__(
+        self, path: str = USER_SETTINGS_DIR, delay: float = SETTINGS_WRITE_DELAY
+    ):
+        self.path = path
+        self.delay = delay
+        self._settings: Optional[Dict[str, Setting]] = None
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._writer = BackgroundWriter()
+
+    def __getitem__(self, key: str) -> Setting:
+        return self.settings[key]
+
+    def get(self, key: str, default: Setting = None) -> Setting:
+        """Value of a setting, or default if it isn't set."""
+        return self.settings.get(key, default)
+
+    def set(self, key: str, value: Setting) -> None:
+        """Change a setting and schedule writing it to disk."""
+        with self._lock:
+            if self.settings.get(key) == value:
+                return
+            self.settings[key] = copy.deepcopy(value)
+            self._schedule_write()
+
+    @property
+    def settings(self) -> Dict[str, Setting]:
+        """All settings. Loaded from disk on first use, using defaults for anything missing."""
+        with self._lock:
+            if self._settings is None:
+                self._settings = self._load()
+            return self._settings
+
+    def flush(self) -> None:
+        """Write pending changes now, and wait until they are on disk."""
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            self._timer = None
+            future = self._write()
+        future.result()
+
+    ############ INTERNALS ############
+    def _load(self) -> Dict[str, Setting]:
+        """Read the settings file, filling in defaults for missing settings."""
+        try:
+            with open(self.path, "r") as f:
+                settings = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # If the file is missing or empty, use the default settings and write them to disk.
+            settings = {}
+
+        changed = False
+        if "last_path" not in settings:
+            settings["last_path"] = os.path.join(NOTES_DIR, WELCOME_PAGE)
+            changed = True
+        if type(settings.get("style")) is not dict:
+            settings["style"] = dict(DEFAULT_STYLE)
+            changed = True
+        if changed:
+            self._settings = settings
+            self._schedule_write()
+        return settings
+
+    def _schedule_write(self) -> None:
+        """(Re)start the countdown to writing the settings to disk."""
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.delay, self._timer_fired)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timer_fired(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._write()
+
+    def _write(self) -> Future:
+        """Queue the current settings for an atomic write. Returns the writer's future."""
+        return self._writer.write(self.path, json.dumps(self._settings))
+
+
+# Shared by everything that reads or changes a user setting.
+user_settings = SettingsStore()
@@ -0,0 +1,19 @@
+import os
+
+from constants import NOTES_DIR
+from storage.link_index import LinkIndex
+from storage.search_index import SearchIndex
+
+
+class TextIndex(SearchIndex, LinkIndex):
+    """Full-text search and [[links]] of every note, in one database.
+
+    A note that changed is read once, on a single worker thread, for both.
+    """
+
+    THREAD_NAME = "thought-box-text"
+
+
+# Shared index of the text of every note, kept in the notes directory next to the settings.
+# Named like the search index it replaces, which is then rebuilt rather than left behind.
+text_index = TextIndex(os.path.join(NOTES_DIR, ".search_index.sqlite3"))
@@ -0,0 +1,252 @@
+import asyncio
+import contextvars
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from constants import NOTES_DIR, WATCH_DEBOUNCE, WATCH_POLL_INTERVAL
+
+# inotify(7) event masks.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+)
+# wd, mask, cookie, len, followed by len bytes of NUL-padded name.
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileChange(NamedTuple):
+    """Something at path was created, changed, moved or deleted"""
+
+    path: str
+    is_dir: bool
+
+
+# Called on the event loop with the changes collected.
+OnChange = Callable[[List[FileChange]], None]
+
+
+def _hidden(name: str) -> bool:
+    """Hidden files are the app's own (settings, indexes, temporary files of atomic writes)."""
+    return name.startswith(".")
+
+
+class _Inotify:
+    """Thin ctypes wrapper around the Linux inotify API, watching a tree of folders."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        # Folder watched by each watch descriptor.
+        self._folders: Dict[int, str] = {}
+
+    def watch_tree(self, root: str) -> None:
+        """Watch root and every folder in it, except hidden ones."""
+        for directory, folders, _ in os.walk(root):
+            folders[:] = [name for name in folders if not _hidden(name)]
+            wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    # Already gone again.
+                    continue
+                raise OSError(error, os.strerror(error), directory)
+            self._folders[wd] = directory
+
+    def read(self) -> Tuple[List[FileChange], bool]:
+        """Changes queued by the kernel, and whether some were lost to an overflow."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        changes = []
+        overflow = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self._folders.pop(wd, None)
+                continue
+            directory = self._folders.get(wd)
+            if directory is None or (name and _hidden(name)):
+                continue
+            path = os.path.join(directory, name) if name else directory
+            is_dir = bool(mask & IN_ISDIR)
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                # A new folder, watch it and everything already in it.
+                self.watch_tree(path)
+            changes.append(FileChange(path, is_dir))
+        return changes, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class NotesWatcher:
+    """Notices files changed in the notes tree by something else than the app, like sync tools.
+
+    Uses inotify on Linux, and scans the tree every WATCH_POLL_INTERVAL seconds elsewhere
+    (or when inotify is out of watches). Changes are collected on a background thread
+    for WATCH_DEBOUNCE seconds, then handed to a callback on the event loop.
+    """
+
+    def __init__(
+        self,
+        root: str = NOTES_DIR,
+        poll_interval: float = WATCH_POLL_INTERVAL,
+        debounce: float = WATCH_DEBOUNCE,
+    ):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        # Whether changes are reported by the kernel. If not, they may be reported late.
+        self.uses_inotify = False
+        self._inotify: Optional[_Inotify] = None
+        self._stop = threading.Event()
+        self._wake_read, self._wake_write = os.pipe()
+        self._thread: Optional[threading.Thread] = None
+        self._context: Optional[contextvars.Context] = None
+
+    def start(
+        self,
+        on_change: OnChange,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        """Start watching.
+
+        on_change is called on loop (the running one by default), in the context start
+        was called from, so it can use the current application.
+        """
+        loop = loop or asyncio.get_event_loop()
+        self._context = contextvars.copy_context()
+        try:
+            self._inotify = _Inotify()
+            self._inotify.watch_tree(self.root)
+            self.uses_inotify = True
+            target = self._watch
+        except (OSError, AttributeError):
+            # Not Linux, or out of watches.
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+            target = self._poll
+        self._thread = threading.Thread(
+            target=target,
+            args=(loop, on_change),
+            name="thought-box-watcher",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the background thread to finish. Stopping again does nothing."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        os.write(self._wake_write, b"\0")
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+    ############ WATCHER THREAD ############
+    def _deliver(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        on_change: OnChange,
+        changes: Dict[str, FileChange],
+    ) -> bool:
+        """Hand changes over to the event loop. False once the loop is gone."""
+        if not changes:
+            return True
+        try:
+            loop.call_soon_threadsafe(
+                on_change, list(changes.values()), context=self._context
+            )
+        except RuntimeError:
+            return False
+        return True
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, on_change: OnChange) -> None:
+        inotify = self._inotify
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([inotify.fd, self._wake_read], [], [])
+                changes: Dict[str, FileChange] = {}
+                # Collect what else happens shortly after, a save is often several events.
+                while inotify.fd in ready and not self._stop.is_set():
+                    batch, overflow = inotify.read()
+                    if overflow:
+                        batch.append(FileChange(self.root, True))
+                    for change in batch:
+                        changes[change.path] = change
+                    ready, _, _ = select.select([inotify.fd], [], [], self.debounce)
+                if not self._deliver(loop, on_change, changes):
+                    break
+        except OSError:
+            # Out of watches for a new folder, keep going by scanning instead.
+            if not self._stop.is_set():
+                self.uses_inotify = False
+                self._poll(loop, on_change)
+        finally:
+            inotify.close()
+
+    def _poll(self, loop: asyncio.AbstractEventLoop, on_change: OnChange) -> None:
+        known = self._scan()
+        while not self._stop.wait(self.poll_interval):
+            current = self._scan()
+            changes = {
+                path: FileChange(path, is_dir)
+                for path, (is_dir, *_) in current.items()
+                if known.get(path) != current[path]
+            }
+            changes.update(
+                (path, FileChange(path, is_dir))
+                for path, (is_dir, *_) in known.items()
+                if path not in current
+            )
+            known = current
+            if not self._deliver(loop, on_change, changes):
+                break
+
+    def _scan(self) -> Dict[str, tuple]:
+        """(is_dir, mtime_ns, size) of everything in the tree, except hidden files."""
+        found = {}
+        for directory, folders, files in os.walk(self.root):
+            folders[:] = [name for name in folders if not _hidden(name)]
+            for name in folders + files:
+                if _hidden(name):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (name in folders, stat.st_mtime_ns, stat.st_size)
+        return found
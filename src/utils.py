@@ -1,5 +1,10 @@
+import contextlib
 import os
+import shutil
+import uuid
+from typing import Optional
 
+from application.lazy_loader import UnreadBytes
 from constants import NOTES_DIR
 
 
@@ -9,14 +14,47 @@ def display_path(path: str) -> str:
 
 
 def get_unique_filename(path: str) -> str:
-    """Get a unique filename for a given path."""
-    map_of_all_filenames = {i: True for i in os.listdir(path)}
-    default_filename = "Note"
+    """Get a unique filename for a given path.
 
-    suffix = 0
-    candidate_file_name = default_filename
-    while candidate_file_name + ".txt" in map_of_all_filenames:
-        suffix += 1
-        candidate_file_name = default_filename + " " + str(suffix)
+    The file is created empty to reserve the name, see NotesIndex.new_untitled_note.
+    """
+    # storage imports utils, so import it here.
+    from storage import notes_index
 
-    return candidate_file_name + ".txt"
+    return notes_index.new_untitled_note(path)
+
+
+def read_note(path: str) -> str:
+    """Whole text of the note at path."""
+    with open(path, "r") as f:
+        return f.read()
+
+
+def atomic_write(
+    path: str, text: str, tail: Optional[UnreadBytes] = None
+) -> os.stat_result:
+    """Write text, followed by the bytes of tail if given, to path so that the file is never left half-written.
+
+    The text goes to a hidden temporary file in the same directory, which is synced to disk
+    and then renamed over the destination. Returns the stat of the file written.
+    """
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(temp_path, "x", encoding="utf8") as f:
+            f.write(text)
+            f.flush()
+            if tail:
+                tail.copy_to(f.buffer)
+                f.buffer.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        # Taken before the rename, so it can't be the stat of someone else's write.
+        written = os.stat(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+    return written
@@ -0,0 +1,41 @@
+import os
+import sys
+from typing import Iterator
+
+import pytest
+from pytest import MonkeyPatch
+
+# The application is run as `python3 src/application_entry.py`, so its modules import each other
+# relative to src/. Mirror that for the tests.
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture
+def thought_box(tmp_path: str, monkeypatch: MonkeyPatch) -> Iterator[object]:
+    """A ThoughtBox without a terminal, keeping its notes in tmp_path."""
+    from prompt_toolkit.application import create_app_session
+    from prompt_toolkit.input import create_pipe_input
+    from prompt_toolkit.output import DummyOutput
+
+    from application.editor import ThoughtBox
+    from constants import NOTES_DIR
+    from storage import path_index, text_index, user_settings
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(NOTES_DIR)
+    os.makedirs("src")
+    os.symlink(os.path.join(SRC_DIR, "assets"), os.path.join("src", "assets"))
+    with create_pipe_input() as pipe, create_app_session(
+        input=pipe, output=DummyOutput()
+    ):
+        tb = ThoughtBox()
+        try:
+            yield tb
+        finally:
+            # Let the background work finish while the notes are still the working directory.
+            tb.autosaver.cancel()
+            tb.file_writer.flush()
+            user_settings.flush()
+            text_index.refresh().result()
+            path_index.ready().result()
@@ -0,0 +1,30 @@
+import json
+
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+
+from application.emoji_completer import EmojiCompleter
+
+
+def test_completes_typed_shortcode(tmp_path: str) -> None:
+    """Shortcodes starting with what was typed are offered, and the index is cached on disk."""
+    cache_path = str(tmp_path / ".emoji_index.json")
+    completer = EmojiCompleter(cache_path)
+
+    def complete(text: str) -> list:
+        document = Document(text, len(text))
+        return list(completer.get_completions(document, CompleteEvent()))
+
+    completions = complete("so :smil")
+    assert completions
+    assert all(c.display_text.split(" ")[1].startswith(":smil") for c in completions)
+    assert completions[0].start_position == -len(":smil")
+    # Too short, or not a shortcode.
+    assert complete("so :s") == []
+    assert complete("10:30") == []
+
+    with open(cache_path) as f:
+        cached = json.load(f)
+    assert cached["shortcodes"] == sorted(cached["shortcodes"])
+    # A new completer uses the cache.
+    assert EmojiCompleter(cache_path).complete(":smil")
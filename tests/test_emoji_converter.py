@@ -0,0 +1,55 @@
+import os
+
+from application.edit_tracker import combine_edits, shift_position
+from application.editor import ThoughtBox
+from application.emoji_converter import EMOJI_VARIANT, EmojiConverter, find_emoji
+from application.piece_table import TextEdit
+from constants import NOTES_DIR
+
+SMILE = "\U0001f604" + EMOJI_VARIANT
+
+
+def test_find_emoji() -> None:
+    """Known shortcodes are replaced, a colon of an unknown one can open the next."""
+    text = "at 10:30:smile: :nope: :smile:"
+    edits = find_emoji(text)
+    assert [edit.start for edit in edits] == [8, 23]
+    assert all(edit.inserted == SMILE for edit in edits)
+
+    edit = combine_edits(text, edits)
+    converted = text[: edit.start] + edit.inserted + text[edit.end :]
+    assert converted == f"at 10:30{SMILE} :nope: {SMILE}"
+    # The cursor after both shortcodes moves with the text.
+    assert shift_position(len(text), edits) == len(converted)
+    assert shift_position(10, edits) == 8 + len(SMILE)
+
+
+def test_only_changed_lines_are_converted() -> None:
+    """Without a selection, only the lines edited since the last conversion are searched."""
+    text = ":smile:\n:smile:\n"
+    converter = EmojiConverter()
+    converter.track(TextEdit(0, "", text))
+    assert len(converter.edits(text)) == 2
+    converter.converted()
+
+    converter.track(TextEdit(len(text), "", ":smile:"))
+    text += ":smile:"
+    assert [edit.start for edit in converter.edits(text)] == [16]
+    assert len(converter.edits(text, (0, 3))) == 1
+
+
+def test_opening_a_note_is_not_a_change(thought_box: ThoughtBox) -> None:
+    """Notes loaded into the editor leave nothing for the next conversion to scan."""
+    tb = thought_box
+    os.makedirs(os.path.join(NOTES_DIR, "folder"))
+    first = os.path.join(NOTES_DIR, "first.md")
+    second = os.path.join(NOTES_DIR, "folder", "second.md")
+    for path in (first, second):
+        with open(path, "w") as f:
+            f.write(":smile:\n" * 10)
+
+    tb._switch_to_note(first)
+    assert tb.emoji_converter.changed is None
+    tb._switch_to_note(second)
+    tb._switch_to_note(first)
+    assert tb.emoji_converter.changed is None
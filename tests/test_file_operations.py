@@ -0,0 +1,71 @@
+import errno
+import os
+import shutil
+import threading
+
+from pytest import MonkeyPatch
+
+from storage import FileOperations
+
+
+def make_tree(root: str) -> None:
+    """A folder of notes, with a subfolder, in root."""
+    (root / "folder" / "sub").mkdir(parents=True)
+    for i in range(5):
+        (root / "folder" / f"note{i}.md").write_text(f"note {i}")
+    (root / "folder" / "sub" / "deep.md").write_text("deep")
+
+
+def test_delete_goes_to_trash_and_restores(tmp_path: str) -> None:
+    """A deleted folder can be put back as it was."""
+    make_tree(tmp_path)
+    operations = FileOperations(str(tmp_path / ".trash"))
+    assert operations.delete(str(tmp_path / "folder")).future.result() is True
+    assert not (tmp_path / "folder").exists()
+
+    operation, path = operations.restore()
+    assert path == str(tmp_path / "folder")
+    assert operation.future.result() is True
+    assert (tmp_path / "folder" / "sub" / "deep.md").read_text() == "deep"
+    assert operations.restore()[1] is None
+
+
+def test_move_across_filesystems_copies_and_can_be_cancelled(
+    tmp_path: str, monkeypatch: MonkeyPatch
+) -> None:
+    """Without rename, files are copied one by one. Cancelling leaves the source alone."""
+    make_tree(tmp_path)
+    (tmp_path / "elsewhere").mkdir()
+
+    def cross_device(source: str, destination: str) -> None:
+        """Rename failing like it does across filesystems."""
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    # The first copy waits until the move is cancelled, so cancelling doesn't race the worker.
+    copying = threading.Event()
+    cancelled = threading.Event()
+    copy2 = shutil.copy2
+
+    def copy_once_cancelled(source: str, destination: str) -> str:
+        """Copy, after waiting for the test to cancel the move."""
+        copying.set()
+        cancelled.wait()
+        return copy2(source, destination)
+
+    monkeypatch.setattr(os, "rename", cross_device)
+    monkeypatch.setattr(shutil, "copy2", copy_once_cancelled)
+    operations = FileOperations(str(tmp_path / ".trash"))
+
+    operation = operations.move(str(tmp_path / "folder"), str(tmp_path / "elsewhere"))
+    copying.wait()
+    operation.cancel()
+    cancelled.set()
+    assert operation.future.result() is False
+    assert not (tmp_path / "elsewhere" / "folder").exists()
+    assert (tmp_path / "folder" / "note0.md").exists()
+
+    operation = operations.move(str(tmp_path / "folder"), str(tmp_path / "elsewhere"))
+    assert operation.future.result() is True
+    assert (operation.done, operation.total) == (6, 6)
+    assert (tmp_path / "elsewhere" / "folder" / "sub" / "deep.md").read_text() == "deep"
+    assert not (tmp_path / "folder").exists()
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from application.lazy_loader import LazyFileLoader
+from utils import atomic_write
+
+
+def read_chunks(loader: LazyFileLoader) -> str:
+    """Decode the whole file one chunk at a time."""
+    text = ""
+    while not loader.exhausted:
+        text += loader.read_chunk()
+    return text
+
+
+def test_characters_split_between_chunks(tmp_path: str) -> None:
+    """A character cut by the end of a chunk is decoded with the next one."""
+    path = tmp_path / "note.md"
+    text = "héllo wörld " * 20 + "\r\nnext line ✓"
+    path.write_bytes(text.encode("utf8"))
+    assert read_chunks(LazyFileLoader(str(path), chunk_size=7)) == text.replace(
+        "\r\n", "\n"
+    )
+
+
+def test_invalid_utf8_is_an_error(tmp_path: str) -> None:
+    """Bytes that aren't UTF-8 raise rather than being replaced, like opening a small note."""
+    path = tmp_path / "latin1.txt"
+    path.write_bytes("first line\n".encode("utf8") + "café\n".encode("latin1"))
+    loader = LazyFileLoader(str(path), chunk_size=11)
+    assert loader.read_chunk() == "first line\n"
+    with pytest.raises(UnicodeDecodeError):
+        loader.read_chunk()
+
+
+def test_truncated_file_is_an_error(tmp_path: str) -> None:
+    """A file truncated while mapped isn't read past its new end."""
+    path = tmp_path / "note.md"
+    path.write_text("line\n" * 100)
+    loader = LazyFileLoader(str(path), chunk_size=50)
+    loader.read_chunk()
+    os.truncate(path, 10)
+    with pytest.raises(OSError):
+        loader.read_chunk()
+
+
+def test_unread_bytes_are_saved_as_they_are(tmp_path: str) -> None:
+    """The part not decoded is copied byte for byte after the text, even once the note is replaced."""
+    path = tmp_path / "note.md"
+    data = "héllo\n".encode("utf8") * 10 + b"caf\xe9\r\n" * 10
+    path.write_bytes(data)
+    loader = LazyFileLoader(str(path), chunk_size=2)
+    # The chunk ends in the middle of the "é".
+    text = loader.read_chunk()
+    assert text == "h"
+    tail = loader.unread()
+    loader.close()
+
+    atomic_write(str(path), "edited " + text, tail)
+    assert path.read_bytes() == b"edited " + data
+    # Another save still copies the bytes of the file as it was mapped.
+    atomic_write(str(path), text, tail)
+    assert path.read_bytes() == data
+    tail.close()
+
+
+def test_unread_bytes_of_a_truncated_file_are_an_error(tmp_path: str) -> None:
+    """The rest of a file changed since it was mapped isn't saved in place of the note."""
+    path = tmp_path / "note.md"
+    path.write_text("line\n" * 100)
+    loader = LazyFileLoader(str(path), chunk_size=50)
+    loader.read_chunk()
+    tail = loader.unread()
+    os.truncate(path, 10)
+    with pytest.raises(OSError):
+        atomic_write(str(tmp_path / "copy.md"), "", tail)
+    assert not (tmp_path / "copy.md").exists()
+    tail.close()
+    loader.close()
@@ -0,0 +1,74 @@
+import random
+
+import prompt_toolkit.document
+from prompt_toolkit.buffer import Buffer
+from prompt_toolkit.document import Document
+from pytest import MonkeyPatch
+
+from application import line_index
+from application.edit_tracker import EditTracker
+from application.line_index import LineIndex, LineTracker
+from application.piece_table import TextEdit
+
+
+def test_index_follows_edits(monkeypatch: MonkeyPatch) -> None:
+    """After any edit, the index has the same lines as splitting the new text."""
+    monkeypatch.setattr(line_index, "LINE_INDEX_BLOCK_SIZE", 4)
+    rng = random.Random(7)
+    text = "\n".join("x" * rng.randrange(5) for _ in range(50))
+    index = LineIndex.from_text(text)
+    for _ in range(500):
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.randrange(12))
+        inserted = "".join(rng.choice("ab\n") for _ in range(rng.randrange(8)))
+        index = index.apply(TextEdit(start, text[start:end], inserted))
+        text = text[:start] + inserted + text[end:]
+
+        expected = Document(text)
+        assert list(index) == list(expected._line_start_indexes)
+        position = rng.randrange(len(text) + 1)
+        assert index.row_col(position) == expected.translate_index_to_position(position)
+
+
+def test_tracker_shares_the_index_with_documents() -> None:
+    """The buffer's Documents find lines through the index, without splitting the text."""
+    buffer = Buffer()
+    buffer.text = "one\ntwo\nthree"
+    tracker = LineTracker(buffer, EditTracker(buffer))
+    buffer.cursor_position = 5
+    buffer.insert_text("\nnew")
+
+    document = buffer.document
+    assert document._cache.line_indexes is tracker.index
+    assert document.lines[:] == ["one", "t", "newwo", "three"]
+    assert document.lines[2] == "newwo"
+    assert (document.cursor_position_row, document.cursor_position_col) == (2, 3)
+    assert tracker.row_col(buffer.cursor_position) == (2, 3)
+
+
+def test_tracker_leaves_documents_alone_if_their_cache_changed(
+    monkeypatch: MonkeyPatch,
+) -> None:
+    """If Documents don't cache their lines as expected, they compute them themselves."""
+
+    class SlottedCache:
+        """A cache laid out differently from the one the tracker knows."""
+
+        __slots__ = ("lines", "line_indexes", "__weakref__")
+
+        def __init__(self):
+            self.lines = None
+            self.line_indexes = None
+
+    monkeypatch.setattr(prompt_toolkit.document, "_DocumentCache", SlottedCache)
+    buffer = Buffer()
+    buffer.text = "a cache\nlaid out\ndifferently"
+    tracker = LineTracker(buffer, EditTracker(buffer))
+    buffer.cursor_position = 2
+    buffer.insert_text("\n")
+
+    document = buffer.document
+    assert isinstance(document._cache, SlottedCache)
+    assert document._cache.line_indexes is None
+    assert document.lines == ["a ", "cache", "laid out", "differently"]
+    assert tracker.row_col(buffer.cursor_position) == (1, 0)
@@ -0,0 +1,59 @@
+import os
+
+from storage import Backlink, LinkIndex
+from storage.link_index import link_at
+
+
+def test_links_resolve_and_follow_moves(tmp_path: str) -> None:
+    """Links resolve by note name, and backlinks follow notes being edited, moved and removed."""
+    notes = tmp_path / "notes"
+    (notes / "folder").mkdir(parents=True)
+    (notes / "Ideas.md").write_text("See [[Plans]] and [[plans#Later|the plans]].")
+    (notes / "folder" / "plans.txt").write_text("No links here. [[Missing]]")
+    index = LinkIndex(str(tmp_path / "links.sqlite3"), root=str(notes))
+    index.refresh().result()
+
+    plans = os.path.normpath(notes / "folder" / "plans.txt")
+    ideas = os.path.normpath(notes / "Ideas.md")
+    assert index.resolve("Plans").result() == plans
+    assert index.resolve("folder/plans.txt").result() == plans
+    assert index.resolve("Missing").result() is None
+    assert index.backlinks(plans).result() == [
+        Backlink(ideas, 4, "See [[Plans]] and [[plans#Later|the plans]]."),
+        Backlink(ideas, 18, "See [[Plans]] and [[plans#Later|the plans]]."),
+    ]
+
+    index.update(ideas, "Nothing anymore.").result()
+    assert index.backlinks(plans).result() == []
+
+    index.update(ideas, "[[Plans]]").result()
+    moved = os.path.normpath(notes / "Plans.md")
+    os.rename(plans, moved)
+    index.move(plans, moved).result()
+    assert index.resolve("plans").result() == moved
+    assert [link.path for link in index.backlinks(moved).result()] == [ideas]
+
+    index.remove(str(notes)).result()
+    assert index.resolve("plans").result() is None
+
+
+def test_link_at_cursor() -> None:
+    """The link under the cursor is found, brackets included."""
+    line = "a [[First]] b [[Second|label]]"
+    assert link_at(line, 2) == "First"
+    assert link_at(line, 12) is None
+    assert link_at(line, 20) == "Second"
+
+
+def test_backlinks_only_list_links_to_that_note(tmp_path: str) -> None:
+    """Of two notes with the same name, each only gets the links resolving to it."""
+    (tmp_path / "work").mkdir()
+    (tmp_path / "Plans.md").write_text("[[Plans]] and [[work/plans]]")
+    (tmp_path / "work" / "plans.md").write_text("Back to [[plans]].")
+    index = LinkIndex(str(tmp_path / ".links.sqlite3"), root=str(tmp_path))
+    index.refresh().result()
+
+    top = os.path.normpath(tmp_path / "Plans.md")
+    work = os.path.normpath(tmp_path / "work" / "plans.md")
+    assert index.backlinks(top).result() == [Backlink(work, 8, "Back to [[plans]].")]
+    assert [link.position for link in index.backlinks(work).result()] == [14]
@@ -0,0 +1,51 @@
+from prompt_toolkit.document import Document
+from prompt_toolkit.lexers import PygmentsLexer
+from pygments.lexers.markup import MarkdownLexer
+
+from application.markdown_lexer import CachedMarkdownLexer
+
+
+def visible(fragments: list) -> list:
+    """Fragments that show some text."""
+    return [fragment for fragment in fragments if fragment[1]]
+
+
+NOTE = """# Title
+Some *emphasis* and `code`
+Setext heading
+--------------
+- a list item with **bold**
+
+```python
+def f():
+    return "# not a heading"
+```
+> a quote
+"""
+
+
+def test_same_highlighting_as_pygments() -> None:
+    """Lexing block by block gives the same result as lexing the whole note."""
+    document = Document(NOTE)
+    expected = PygmentsLexer(MarkdownLexer).lex_document(document)
+    lexer = CachedMarkdownLexer()
+    # Look lines up from the bottom, so that nothing is lexed from the top.
+    get_line = lexer.lex_document(document)
+    for i in reversed(range(document.line_count)):
+        assert visible(get_line(i)) == visible(expected(i)), i
+
+
+def test_edit_only_lexes_changed_block() -> None:
+    """Unchanged blocks come from the cache after an edit."""
+    lexer = CachedMarkdownLexer()
+    before = Document(NOTE)
+    get_line = lexer.lex_document(before)
+    for i in range(before.line_count):
+        get_line(i)
+    cached = len(lexer._blocks)
+
+    after = Document(NOTE.replace("# Title", "# New title"))
+    get_line = lexer.lex_document(after)
+    for i in range(after.line_count):
+        get_line(i)
+    assert len(lexer._blocks) == cached + 1
@@ -0,0 +1,96 @@
+import asyncio
+import os
+
+from pytest import MonkeyPatch
+
+from application import editor
+from application.editor import ThoughtBox
+from constants import LARGE_FILE_THRESHOLD, NOTES_DIR
+from utils import display_path
+
+
+def test_a_note_that_cant_be_opened_is_not_saved_over(thought_box: ThoughtBox) -> None:
+    """Failing to open a note leaves the one in the editor, which saves to its own file."""
+    tb = thought_box
+    first = os.path.join(NOTES_DIR, "first.md")
+    latin = os.path.join(NOTES_DIR, "latin.md")
+    large = os.path.join(NOTES_DIR, "large.md")
+    with open(first, "w") as f:
+        f.write("first")
+    with open(latin, "wb") as f:
+        f.write("café".encode("latin-1"))
+    with open(large, "wb") as f:
+        f.write("é".encode("latin-1") * (LARGE_FILE_THRESHOLD + 1))
+
+    # Typing and messages start tasks, which need the event loop.
+    async def edit_and_save() -> None:
+        """Edit the first note, fail to open the others, then save."""
+        assert tb._switch_to_note(first)
+        tb.text_field.buffer.insert_text("edited ")
+        for path in (latin, large):
+            assert not tb._switch_to_note(path)
+            assert tb.application_state.current_path == first
+            assert tb.application_state.dirty
+            assert tb.open_notes.get(first) is None
+            assert tb.lazy_loader is None
+
+        await tb.do_save_file()
+        with open(first) as f:
+            assert f.read() == "edited first"
+        with open(latin, "rb") as f:
+            assert f.read() == "café".encode("latin-1")
+
+    asyncio.run(edit_and_save())
+
+
+def test_saving_a_large_note_does_not_decode_it(thought_box: ThoughtBox) -> None:
+    """The part of a large note not loaded yet is saved without being loaded."""
+    tb = thought_box
+    path = os.path.join(NOTES_DIR, "large.md")
+    data = b"line\n" * (LARGE_FILE_THRESHOLD // 4)
+    with open(path, "wb") as f:
+        f.write(data)
+
+    async def edit_and_save() -> None:
+        """Edit the start of the note and save it."""
+        assert tb._switch_to_note(path)
+        loaded = len(tb.text_field.text)
+        tb.text_field.buffer.insert_text("edited ")
+        await tb.do_save_file()
+        assert len(tb.text_field.text) == loaded + len("edited ")
+        assert tb.lazy_loader
+        assert not tb.application_state.dirty
+
+    asyncio.run(edit_and_save())
+    with open(path, "rb") as f:
+        assert f.read() == b"edited " + data
+
+
+def test_title_shows_a_moved_note_until_it_is_saved(
+    thought_box: ThoughtBox, monkeypatch: MonkeyPatch
+) -> None:
+    """A note whose file was moved keeps its old path, marked as moved, in the title."""
+    tb = thought_box
+    path = os.path.join(NOTES_DIR, "moved.md")
+    with open(path, "w") as f:
+        f.write("moved")
+    titles = []
+    monkeypatch.setattr(editor, "set_title", titles.append)
+
+    async def move_and_save() -> None:
+        """Open the note, lose its path, then save it elsewhere."""
+        assert tb._switch_to_note(path)
+        tb.application_state.mark_removed("Moved")
+        tb.set_title_bar(tb.application)
+        assert titles[-1] == f"ThoughtBox - {display_path(path)} (Moved)"
+        tb.text_field.buffer.insert_text("still ")
+        tb.set_title_bar(tb.application)
+        assert titles[-1] == f"ThoughtBox - {display_path(path)} (Moved) *"
+
+        saved = os.path.join(NOTES_DIR, "saved.md")
+        await tb._save_file_at_path(saved, tb.text_field.text)
+        tb.set_title_bar(tb.application)
+        assert titles[-1] == f"ThoughtBox - {display_path(saved)}"
+        assert tb.application_state.note.removed is None
+
+    asyncio.run(move_and_save())
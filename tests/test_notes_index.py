@@ -0,0 +1,59 @@
+import os
+
+from storage import NoteEntry, NotesIndex
+
+
+def test_list_dir_and_invalidate(tmp_path: str) -> None:
+    """Listings are cached until invalidated or the directory changes."""
+    (tmp_path / "b.md").write_text("b")
+    (tmp_path / "A folder").mkdir()
+    index = NotesIndex()
+
+    assert index.list_dir(str(tmp_path)) == (
+        NoteEntry("A folder", True),
+        NoteEntry("b.md", False),
+    )
+    assert index.has_subdirs(str(tmp_path))
+
+    # A watched index trusts its cache until it's told about the change.
+    index.watched = True
+    os.rename(tmp_path / "b.md", tmp_path / "c.md")
+    assert NoteEntry("b.md", False) in index.list_dir(str(tmp_path))
+    index.invalidate(str(tmp_path / "c.md"))
+    assert NoteEntry("c.md", False) in index.list_dir(str(tmp_path))
+
+
+def test_invalidate_folder_drops_descendants(tmp_path: str) -> None:
+    """Invalidating a folder forgets the listings of everything inside it."""
+    inner = tmp_path / "outer" / "inner"
+    inner.mkdir(parents=True)
+    index = NotesIndex()
+    index.watched = True
+    index.list_dir(str(inner))
+
+    (inner / "note.txt").write_text("")
+    index.invalidate(str(tmp_path / "outer"))
+    assert index.list_dir(str(inner)) == (NoteEntry("note.txt", False),)
+
+
+def test_new_untitled_note_counts_up(tmp_path: str) -> None:
+    """Untitled notes are numbered after the highest existing one, skipping taken names."""
+    (tmp_path / "Note.txt").write_text("")
+    (tmp_path / "Note 7.txt").write_text("")
+    index = NotesIndex()
+
+    assert index.new_untitled_note(str(tmp_path)) == "Note 8.txt"
+    assert (tmp_path / "Note 8.txt").exists()
+    # Taken behind the index's back, like by another instance of the app.
+    (tmp_path / "Note 9.txt").write_text("")
+    assert index.new_untitled_note(str(tmp_path)) == "Note 10.txt"
+
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert index.new_untitled_note(str(empty)) == "Note.txt"
+    assert index.new_untitled_note(str(empty)) == "Note 1.txt"
+
+    index.discard_untitled_note(str(empty / "Note 1.txt"))
+    (empty / "Note.txt").write_text("saved")
+    index.discard_untitled_note(str(empty / "Note.txt"))
+    assert index.list_dir(str(empty)) == (NoteEntry("Note.txt", False),)
@@ -0,0 +1,38 @@
+from prompt_toolkit.document import Document
+
+from application.open_notes import OpenNote, OpenNotes
+from application.piece_table import PieceTable
+from application.state import NoteStatus
+from application.undo import HistoryState
+
+
+def make_note(path: str, text: str) -> OpenNote:
+    """A note kept in memory, with text and a fresh undo history."""
+    history = HistoryState(PieceTable(text), 0, [], [])
+    return OpenNote(path, Document(text), history, NoteStatus(), None, 0)
+
+
+def test_least_recently_used_notes_are_evicted() -> None:
+    """Notes past the count or size limit are evicted oldest first."""
+    notes = OpenNotes(max_notes=2, max_chars=100)
+    assert notes.put(make_note("a.md", "a")) == []
+    assert notes.put(make_note("b.md", "b")) == []
+    assert [note.path for note in notes.put(make_note("c.md", "c"))] == ["a.md"]
+    assert notes.pop("a.md") is None
+    assert notes.pop("./b.md").document.text == "b"
+
+    evicted = notes.put(make_note("big.md", "x" * 150))
+    assert [note.path for note in evicted] == ["c.md"]
+    assert len(notes) == 1
+
+
+def test_move_and_remove_follow_folders() -> None:
+    """Notes in a moved folder are found at their new path, and dropped with a deleted one."""
+    notes = OpenNotes()
+    notes.put(make_note("dir/a.md", "a"))
+    notes.put(make_note("other.md", "o"))
+    notes.move("dir", "new")
+    assert notes.pop("dir/a.md") is None
+    assert notes.pop("new/a.md").path == "new/a.md"
+    notes.remove("other.md")
+    assert len(notes) == 0
@@ -0,0 +1,73 @@
+import importlib
+import os
+import random
+
+from pytest import MonkeyPatch
+
+from storage import PathIndex
+
+# storage.path_index is also the name of the shared index, so get the module itself.
+path_index_module = importlib.import_module("storage.path_index")
+
+
+def test_paths_follow_the_notes(tmp_path: str) -> None:
+    """Quick-open finds notes by a subsequence of their path, best match first."""
+    notes = tmp_path / "notes"
+    (notes / "meetings").mkdir(parents=True)
+    (notes / ".trash").mkdir()
+    (notes / "meetings" / "notes.md").write_text("")
+    (notes / "meeting notes.txt").write_text("")
+    (notes / "mountains.md").write_text("")
+    (notes / "image.png").write_text("")
+    (notes / ".trash" / "meeting notes.md").write_text("")
+    index = PathIndex(str(notes))
+    index.refresh().result()
+
+    def search(query: str) -> list:
+        search = index.search(query)
+        search.run(budget=1)
+        return [os.path.relpath(path, notes) for path in search.results(10)]
+
+    assert search("mtgnot") == [
+        "meeting notes.txt",
+        os.path.join("meetings", "notes.md"),
+    ]
+    assert search("MOUNT") == ["mountains.md"]
+    assert search("zz") == []
+    assert len(search("")) == 3
+
+    os.rename(notes / "meetings", notes / "archive")
+    index.move(str(notes / "meetings"), str(notes / "archive")).result()
+    (notes / "mountains.md").unlink()
+    index.update(str(notes / "mountains.md")).result()
+    assert search("notes") == [
+        os.path.join("archive", "notes.md"),
+        "meeting notes.txt",
+    ]
+
+    index.remove(str(notes / "archive")).result()
+    assert search("") == ["meeting notes.txt"]
+
+
+def test_search_runs_in_steps(tmp_path: str, monkeypatch: MonkeyPatch) -> None:
+    """Searching shard by shard, and from the previous query, finds what a single pass does."""
+    monkeypatch.setattr(path_index_module, "PATH_INDEX_SHARD_SIZE", 7)
+    monkeypatch.setattr(path_index_module, "QUICK_OPEN_MATCHES", 20)
+    rng = random.Random(3)
+    index = PathIndex(str(tmp_path))
+    index._notes = {
+        str(tmp_path / "".join(rng.choice("ab/") for _ in range(12))) + ".md"
+        for _ in range(200)
+    }
+    index._publish()
+
+    previous = None
+    for end in range(1, 8):
+        query = "abbabaa"[:end]
+        search = index.search(query, previous)
+        while not search.run(budget=0):
+            pass
+        expected = index.search(query)
+        expected.run(budget=1)
+        assert search.results(100) == expected.results(100)
+        previous = search
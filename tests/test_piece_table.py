@@ -0,0 +1,79 @@
+import random
+
+from pytest import MonkeyPatch
+
+from application import piece_table
+from application.edit_tracker import diff_text
+from application.piece_table import PieceTable, TextEdit, diff_snapshots
+
+
+def test_insert_and_delete_match_str(monkeypatch: MonkeyPatch) -> None:
+    """Random edits on a piece table give the same text as the same edits on a str."""
+    # Small blocks, so that edits split, merge and span them.
+    monkeypatch.setattr(piece_table, "PIECE_BLOCK_SIZE", 4)
+    rng = random.Random(0)
+    text = "hello world\n" * 50
+    table = PieceTable(text)
+    for _ in range(500):
+        position = rng.randint(0, len(text))
+        if rng.random() < 0.6:
+            data = rng.choice(["a", "bc", "\n", "x" * 5000])
+            table.insert(position, data)
+            text = text[:position] + data + text[position:]
+        else:
+            end = position + rng.randint(0, rng.choice([20, 2000]))
+            table.delete(position, end)
+            text = text[:position] + text[end:]
+        assert len(table) == len(text)
+        around = max(0, position - 10)
+        assert table.get_text(around, position + 10) == text[around : position + 10]
+    assert table.text == text
+    assert "".join(table.chunks()) == text
+    table.restore(PieceTable(text).snapshot())
+    assert table.get_text(10, 200) == text[10:200]
+
+
+def test_typing_extends_a_single_piece() -> None:
+    """Consecutive typed characters don't grow the piece table."""
+    table = PieceTable("abc")
+    for i, char in enumerate("hello"):
+        table.insert(1 + i, char)
+    assert table.text == "ahellobc"
+    assert len(table.snapshot()) == 3
+
+
+def test_snapshot_survives_edits() -> None:
+    """Restoring a snapshot brings the old text back."""
+    table = PieceTable("one two three")
+    snapshot = table.snapshot()
+    table.delete(3, 7)
+    table.insert(0, "zero ")
+    table.restore(snapshot)
+    assert table.text == "one two three"
+
+
+def test_diff_text() -> None:
+    """diff_text finds the smallest replaced range."""
+    assert diff_text("hello world", "hello brave world") == TextEdit(6, "", "brave ")
+    assert diff_text("aaaa", "aa") == TextEdit(2, "aa", "")
+    assert diff_text("abc", "xbc") == TextEdit(0, "a", "x")
+
+
+def test_diff_snapshots() -> None:
+    """The diff of two snapshots turns the old text into the new one."""
+    rng = random.Random(1)
+    table = PieceTable("hello world\n" * 20)
+    for _ in range(200):
+        old = table.snapshot()
+        old_text = table.text
+        for _ in range(rng.randint(1, 3)):
+            position = rng.randint(0, len(table))
+            if rng.random() < 0.6:
+                table.insert(position, rng.choice(["a", "bc", "\n"]))
+            else:
+                table.delete(position, position + rng.randint(0, 5))
+        edit = diff_snapshots(old, table.snapshot())
+        assert old_text[: edit.start] == table.text[: edit.start]
+        assert old_text[edit.start : edit.end] == edit.removed
+        patched = old_text[: edit.start] + edit.inserted + old_text[edit.end :]
+        assert patched == table.text
@@ -0,0 +1,25 @@
+import asyncio
+import gc
+
+from custom_types import ProgressDialog
+from storage import FileOperation
+
+
+def test_dialog_leaves_a_failure_to_the_caller() -> None:
+    """The dialog closes when its operation fails, without asyncio logging the error."""
+    unhandled = []
+
+    async def fail() -> None:
+        """Fail an operation while its dialog follows it."""
+        loop = asyncio.get_event_loop()
+        loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+        operation = FileOperation("Moving")
+        dialog = ProgressDialog("Move Item", operation)
+        loop.call_later(0.05, operation.future.set_exception, OSError("disk full"))
+        assert await dialog.future is None
+        # Futures log an exception nobody retrieved when they're collected.
+        del dialog, operation
+        gc.collect()
+
+    asyncio.run(fail())
+    assert unhandled == []
@@ -0,0 +1,27 @@
+import asyncio
+
+from custom_types import QuickOpenDialog
+from storage import PathIndex
+
+
+def test_choosing_twice_keeps_the_first_choice(tmp_path: str) -> None:
+    """Enter then a click, or a click then Cancel, closes the dialog once."""
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "first.md").write_text("")
+    (notes / "second.md").write_text("")
+    index = PathIndex(str(notes))
+    index.refresh().result()
+
+    async def choose() -> str:
+        """Activate the highlighted note twice, then cancel."""
+        dialog = QuickOpenDialog(index)
+        while not dialog.paths:
+            await asyncio.sleep(0)
+        dialog.list.control.activate()
+        dialog.list.control.select(1)
+        dialog.list.control.activate()
+        dialog.cancel_button.handler()
+        return await dialog.future
+
+    assert asyncio.run(choose()) == str(notes / "first.md")
@@ -0,0 +1,35 @@
+import json
+
+from prompt_toolkit.application import Application
+from prompt_toolkit.input import DummyInput
+from prompt_toolkit.output import DummyOutput
+
+from application.render_stats import RenderStats
+
+
+def test_frames_are_measured_and_logged(tmp_path: str) -> None:
+    """A frame counts the bytes written while drawing it and the invalidations asking for it."""
+    app = Application(input=DummyInput(), output=DummyOutput())
+    stats = RenderStats(str(tmp_path / "render.jsonl"))
+    stats.attach(app)
+
+    # Nothing is measured until turned on.
+    app.before_render.fire()
+    app.output.write("ignored")
+    app.after_render.fire()
+    assert not stats.frames
+
+    stats.toggle()
+    app.invalidate()
+    app.before_render.fire()
+    app.output.write("héllo")
+    app.output.write_raw("\x1b[0m")
+    app.after_render.fire()
+    stats.toggle()
+
+    frame = stats.frames[-1]
+    assert frame.bytes == 10
+    assert frame.causes == {"test_render_stats.test_frames_are_measured_and_logged": 1}
+    assert "10 bytes" in stats.summary()
+    logged = json.loads((tmp_path / "render.jsonl").read_text())
+    assert logged["bytes"] == 10
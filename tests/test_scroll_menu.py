@@ -0,0 +1,33 @@
+import asyncio
+import os
+
+from prompt_toolkit.layout.containers import Float
+from pytest import MonkeyPatch
+
+from application.editor import ThoughtBox
+from constants import NOTES_DIR
+from custom_types import scroll_menu
+from custom_types.scroll_menu import ScrollMenuDialog
+from utils import display_path
+
+
+def test_opening_a_folder_drops_the_preview_still_loading(
+    thought_box: ThoughtBox, monkeypatch: MonkeyPatch
+) -> None:
+    """A preview of the folder left doesn't replace the header of the folder opened."""
+    folder = os.path.join(NOTES_DIR, "folder")
+    os.mkdir(folder)
+    with open(os.path.join(NOTES_DIR, "note.md"), "w") as f:
+        f.write("preview")
+
+    async def preview_then_open() -> None:
+        """Highlight the note, and open the folder before its preview is read."""
+        dialog = ScrollMenuDialog("Open", "", NOTES_DIR)
+        thought_box.root_container.floats.append(Float(content=dialog))
+        monkeypatch.setattr(scroll_menu, "get_app", lambda: thought_box.application)
+        dialog._display_content("note.md", NOTES_DIR, False)
+        dialog._display_content("folder", NOTES_DIR, True)
+        await asyncio.sleep(0.1)
+        assert dialog.text.startswith(f"Selected path: {display_path(folder)}\n")
+
+    asyncio.run(preview_then_open())
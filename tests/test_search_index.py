@@ -0,0 +1,63 @@
+import os
+
+from storage import SearchIndex
+
+
+def make_index(tmp_path: str) -> SearchIndex:
+    """An index over a small notes tree in tmp_path."""
+    notes = tmp_path / "notes"
+    (notes / "folder").mkdir(parents=True)
+    (notes / "apples.md").write_text("Apples and pears.\nApples are red. Apples!")
+    (notes / "folder" / "pears.txt").write_text("A note about pears only.")
+    (notes / ".hidden.md").write_text("apples")
+    index = SearchIndex(str(tmp_path / "index.sqlite3"), root=str(notes))
+    index.refresh().result()
+    return index
+
+
+def test_search_ranks_and_snippets(tmp_path: str) -> None:
+    """Every word has to match, and notes using them more rank higher."""
+    index = make_index(tmp_path)
+
+    hits = index.search("pears").result()
+    assert [os.path.basename(hit.path) for hit in hits] == ["pears.txt", "apples.md"]
+    assert "pears" in hits[0].snippet
+
+    hits = index.search("red apples").result()
+    assert [os.path.basename(hit.path) for hit in hits] == ["apples.md"]
+    assert hits[0].snippet == "Apples and pears. Apples are red. Apples!"
+    assert index.search("bananas").result() == []
+    assert index.count("pears").result() == 2
+    assert len(index.search("pears", limit=1).result()) == 1
+
+
+def test_locate_first_match(tmp_path: str) -> None:
+    """The first match is found in the text as saved, whatever lowercasing does to it."""
+    index = make_index(tmp_path)
+    note = tmp_path / "notes" / "apples.md"
+    assert index.locate(str(note), "red").result() == 29
+
+    note.write_text("İİ pears")
+    index.update(str(note)).result()
+    assert index.locate(str(note), "PEARS").result() == 3
+    assert index.locate(str(note), "apples").result() == -1
+
+
+def test_incremental_updates(tmp_path: str) -> None:
+    """Saving, moving and deleting notes keeps the index in sync."""
+    index = make_index(tmp_path)
+    notes = tmp_path / "notes"
+
+    (notes / "apples.md").write_text("Now about bananas.")
+    index.update(str(notes / "apples.md")).result()
+    assert index.search("apples").result() == []
+    assert len(index.search("bananas").result()) == 1
+
+    os.rename(notes / "folder", notes / "renamed")
+    index.move(str(notes / "folder"), str(notes / "renamed")).result()
+    (hit,) = index.search("pears").result()
+    assert hit.path == os.path.join(str(notes), "renamed", "pears.txt")
+
+    os.remove(notes / "renamed" / "pears.txt")
+    index.remove(str(notes / "renamed")).result()
+    assert index.search("pears").result() == []
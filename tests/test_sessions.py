@@ -0,0 +1,72 @@
+from prompt_toolkit.buffer import Buffer
+
+from application.edit_tracker import EditTracker
+from application.undo import UndoHistory
+from storage import NoteSession, SessionStore
+
+
+def make_history(text: str) -> UndoHistory:
+    """The undo history of a buffer holding text."""
+    buffer = Buffer()
+    buffer.text = text
+    return UndoHistory(buffer, EditTracker(buffer))
+
+
+def test_undo_export_and_load() -> None:
+    """An exported undo history, loaded on the same text, undoes the same changes."""
+    history = make_history("one two three")
+    buffer = history.buffer
+    texts = [buffer.text]
+    for position, insert in [(3, " and a half"), (0, "zero "), (9, "!")]:
+        history.save()
+        buffer.cursor_position = position
+        buffer.insert_text(insert)
+        texts.append(buffer.text)
+    history.save()
+
+    restored = make_history(buffer.text)
+    restored.load(history.export(max_steps=10, max_chars=1000))
+    for text in reversed(texts[:-1]):
+        restored.undo()
+        assert restored.buffer.text == text
+    restored.redo()
+    assert restored.buffer.text == texts[1]
+
+    assert len(history.export(max_steps=2, max_chars=1000)) == 2
+    # Steps that don't fit the text are ignored.
+    other = make_history("something else entirely")
+    other.load(history.export(max_steps=10, max_chars=1000))
+    other.undo()
+    assert other.buffer.text == "something else entirely"
+
+
+def test_store_round_trip(tmp_path: str) -> None:
+    """Sessions are found again by path, and the oldest are dropped."""
+    store = SessionStore(str(tmp_path / "sessions"), max_sessions=2)
+    session = NoteSession(5, 2, "hash", [(0, "a", "bc", 1)])
+    store.save("note.md", session)
+    store.flush()
+    assert store.load("note.md") == session
+    assert store.load("other.md") is None
+
+    store.save("b.md", session)
+    store.flush()
+    store.save("c.md", session)
+    store.flush()
+    assert len(list((tmp_path / "sessions").iterdir())) == 2
+
+
+def test_store_moves_sessions_with_their_notes(tmp_path: str) -> None:
+    """Moving a note or its folder takes the sessions along."""
+    store = SessionStore(str(tmp_path / "sessions"))
+    session = NoteSession(5, 2, "hash", [(0, "a", "bc", 1)])
+    store.save("folder/note.md", session)
+    store.save("folder-2/note.md", session)
+    store.move("folder", "moved/folder").result()
+    assert store.load("folder/note.md") is None
+    assert store.load("moved/folder/note.md") == session
+    assert store.load("folder-2/note.md") == session
+
+    store.move("moved/folder/note.md", "renamed.md").result()
+    assert store.load("moved/folder/note.md") is None
+    assert store.load("renamed.md") == session
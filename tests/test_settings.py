@@ -0,0 +1,33 @@
+import json
+
+from constants import DEFAULT_STYLE
+from storage import SettingsStore
+
+
+def test_changes_are_batched(tmp_path: str) -> None:
+    """Settings are served from memory and written once, when flushed or after the delay."""
+    path = tmp_path / ".user_setting.json"
+    path.write_text(json.dumps({"last_path": "a.md", "style": {"menu": "bg:#000000"}}))
+    store = SettingsStore(str(path), delay=60)
+
+    store.set("last_path", "b.md")
+    store.set("last_path", "c.md")
+    assert store["last_path"] == "c.md"
+    assert json.loads(path.read_text())["last_path"] == "a.md"
+
+    store.flush()
+    assert json.loads(path.read_text()) == {
+        "last_path": "c.md",
+        "style": {"menu": "bg:#000000"},
+    }
+
+
+def test_defaults_fill_missing_file(tmp_path: str) -> None:
+    """A missing or broken settings file falls back to the defaults and is repaired."""
+    path = tmp_path / ".user_setting.json"
+    path.write_text("")
+    store = SettingsStore(str(path), delay=60)
+
+    assert store["style"] == DEFAULT_STYLE
+    store.flush()
+    assert json.loads(path.read_text())["style"] == DEFAULT_STYLE
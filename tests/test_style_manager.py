@@ -0,0 +1,20 @@
+from prompt_toolkit.styles import Attrs
+
+from application.style_manager import StyleManager
+
+
+def test_preview_overrides_one_class() -> None:
+    """Previews win over the base style, and compiled styles are reused."""
+    manager = StyleManager({"menu": "bg:#000000", "button": "#ffffff"})
+    base = manager.style
+    assert manager.style is base
+
+    manager.preview("menu", "bg:#ff0000")
+    attrs: Attrs = manager.style.get_attrs_for_style_str("class:menu")
+    assert attrs.bgcolor == "ff0000"
+    assert manager.style.get_attrs_for_style_str("class:button").color == "ffffff"
+
+    manager.clear_preview()
+    assert manager.style is base
+    manager.set_base({"menu": "bg:#000000", "button": "#ffffff"})
+    assert manager.style is base
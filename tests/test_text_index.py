@@ -0,0 +1,31 @@
+import os
+from typing import IO
+
+from pytest import MonkeyPatch
+
+from storage import PathIndex, TextIndex, notes_database
+
+
+def test_text_index_reads_each_note_once(
+    tmp_path: str, monkeypatch: MonkeyPatch
+) -> None:
+    """Searching and links share one database, filled from the paths the path index found."""
+    (tmp_path / "Ideas.md").write_text("Garden [[Plans]]")
+    (tmp_path / "Plans.md").write_text("Dig the garden.")
+    paths = PathIndex(str(tmp_path))
+    index = TextIndex(str(tmp_path / ".text.sqlite3"), root=str(tmp_path))
+    opened = []
+
+    def counted_open(path: str, *args: object, **kwargs: object) -> IO:
+        """Open, remembering which notes were read."""
+        opened.append(path)
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(notes_database, "open", counted_open, raising=False)
+    index.refresh(paths.refresh()).result()
+
+    ideas = os.path.normpath(tmp_path / "Ideas.md")
+    plans = os.path.normpath(tmp_path / "Plans.md")
+    assert sorted(opened) == [ideas, plans]
+    assert len(index.search("garden").result()) == 2
+    assert [link.path for link in index.backlinks(plans).result()] == [ideas]
@@ -0,0 +1,61 @@
+from prompt_toolkit.buffer import Buffer
+
+from application.edit_tracker import EditTracker
+from application.undo import UndoHistory
+from constants import UNDO_MAX_CHARS
+
+
+def make_history(text: str, max_chars: int = UNDO_MAX_CHARS) -> UndoHistory:
+    """The undo history of a buffer holding text."""
+    buffer = Buffer()
+    buffer.text = text
+    return UndoHistory(buffer, EditTracker(buffer), max_chars)
+
+
+def test_undo_and_redo_go_through_every_state() -> None:
+    """Steps made of edits or checkpoints are undone and redone to the exact same texts."""
+    history = make_history("x" * 10000)
+    buffer = history.buffer
+    texts = [buffer.text]
+    for position in range(0, 10000, 1000):
+        history.save()
+        buffer.cursor_position = position
+        buffer.insert_text("typed")
+        buffer.delete_before_cursor(2)
+        texts.append(buffer.text)
+    # Deleting almost everything is kept as a checkpoint, not as the deleted text.
+    history.save()
+    buffer.cursor_position = 0
+    buffer.delete(9000)
+    texts.append(buffer.text)
+    history.save()
+    history.save()
+    assert history._size < 1000
+
+    for text in reversed(texts[:-1]):
+        history.undo()
+        assert buffer.text == text
+    for text in texts[1:]:
+        history.redo()
+        assert buffer.text == text
+
+
+def test_oldest_steps_are_dropped_past_the_budget() -> None:
+    """The history stays within its budget by forgetting the oldest steps."""
+    history = make_history("", max_chars=300)
+    buffer = history.buffer
+    for _ in range(100):
+        history.save()
+        buffer.insert_text("word ")
+        buffer.cursor_position = 0
+    history.save()
+    assert history._size <= 300
+
+    steps = 0
+    text = None
+    while buffer.text != text:
+        text = buffer.text
+        history.undo()
+        steps += 1
+    assert 1 < steps < 100
+    assert buffer.text.startswith("word ")
@@ -0,0 +1,35 @@
+import asyncio
+import os
+
+from storage import NotesWatcher
+
+
+def test_changes_are_reported_on_the_event_loop(tmp_path: str) -> None:
+    """Creating a note and a folder is reported, hidden files aren't."""
+    (tmp_path / "folder").mkdir()
+
+    async def watch() -> set:
+        changes = set()
+        watcher = NotesWatcher(str(tmp_path), poll_interval=0.05, debounce=0.05)
+        watcher.start(changes.update)
+        # Let the polling fallback take its first scan.
+        await asyncio.sleep(0.1)
+        (tmp_path / "folder" / "note.md").write_text("hello")
+        (tmp_path / ".hidden").write_text("settings")
+        (tmp_path / "new").mkdir()
+        for _ in range(50):
+            await asyncio.sleep(0.05)
+            if len(changes) >= 2:
+                break
+        watcher.stop()
+        # Stopping twice is harmless.
+        watcher.stop()
+        return {
+            (os.path.relpath(change.path, tmp_path), change.is_dir)
+            for change in changes
+        }
+
+    changes = asyncio.run(watch())
+    assert (os.path.join("folder", "note.md"), False) in changes
+    assert ("new", True) in changes
+    assert not any(path == ".hidden" for path, _ in changes)